@@ -0,0 +1,90 @@
+"""Feature filters as regexes on the label arrays vs. integer predicates on featureIds.
+
+For each collection size, seeds synthetic homestays into BENCH_MONGODB_URI,
+applies the managed indexes, runs the feature ID backfill and then times
+`count_documents` + the first page `find` for every generated request twice:
+with the filter from `build_enhanced_mongodb_filter` (regex path) and with the
+same filter after `FeatureCatalog.rewrite` (ID path). Requests without feature
+criteria are skipped, since both paths would run the same query.
+
+Usage:
+    BENCH_MONGODB_URI=mongodb://localhost:27017/HomestayBench \\
+        python benchmarks/bench_feature_ids.py --docs 10000 100000 --requests 100 --repeat 3
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+
+from common import Stopwatch, print_table, summarize
+from diff_filter_optimizer import leaf_count, open_collection
+from synthetic import generate_filter_requests, seed_collection
+
+from src.homestay import tools
+from src.homestay.feature_catalog import FeatureCatalog
+from src.homestay.indexes import ensure_indexes
+
+
+async def run_query(collection, mongo_filter, sort_criteria):
+    await collection.count_documents(mongo_filter)
+    await collection.find(mongo_filter, tools.SEARCH_PROJECTION).sort(sort_criteria).limit(100).to_list(length=None)
+
+
+async def bench_size(backend: str, docs: int, requests: int, repeat: int):
+    collection = open_collection(backend)
+    catalog_collection = collection.database["Feature Catalog Bench"]
+    print(f"Seeding {docs} synthetic homestays ({backend}) ...")
+    await seed_collection(collection, docs)
+    await catalog_collection.delete_many({})
+    with contextlib.redirect_stdout(io.StringIO()):
+        if backend == "mongo":
+            await ensure_indexes(collection)
+        catalog = FeatureCatalog(catalog_collection, collection)
+        await catalog.load()
+    with Stopwatch() as sw:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await catalog.backfill(batch_size=1000)
+    print(f"Backfilled featureIds in {sw.elapsed_ms / 1000:.1f}s")
+
+    cases = []
+    for filter_request in generate_filter_requests(requests):
+        with contextlib.redirect_stdout(io.StringIO()):
+            regex_filter = await tools.build_enhanced_mongodb_filter(filter_request)
+        id_filter = catalog.rewrite(regex_filter)
+        if id_filter == regex_filter:
+            continue  # no feature criteria
+        sort_criteria = tools.build_sort_criteria(filter_request)
+        try:
+            await run_query(collection, regex_filter, sort_criteria)
+        except Exception:
+            continue  # invalid regex from the builder; not comparable
+        cases.append((sort_criteria, regex_filter, id_filter))
+
+    rows = {}
+    for label, index in (("regex", 1), ("feature ids", 2)):
+        latencies = []
+        for _ in range(repeat):
+            for case in cases:
+                with Stopwatch() as sw:
+                    await run_query(collection, case[index], case[0])
+                latencies.append(sw.elapsed_ms)
+        row = summarize(latencies)
+        row["predicates"] = round(sum(leaf_count(case[index]) for case in cases) / max(len(cases), 1), 1)
+        rows[label] = row
+    print_table(f"{len(cases)} feature requests x {repeat}, {docs} docs (count + first page)", rows)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["mongo", "mongomock"], default="mongo")
+    parser.add_argument("--docs", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for docs in args.docs:
+        await bench_size(args.backend, docs, args.requests, args.repeat)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Query execution time of unoptimized vs. optimized search filters.
+
+Seeds a synthetic collection into BENCH_MONGODB_URI and, for a mix of generated
+requests, times `count_documents` + the first page `find` for the filter built
+with `build_enhanced_mongodb_filter(optimize=False)` and `optimize=True`.
+
+Usage:
+    BENCH_MONGODB_URI=mongodb://localhost:27017/HomestayBench \\
+        python benchmarks/bench_filter_optimizer.py --docs 20000 --requests 100 --repeat 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+
+from common import Stopwatch, print_table, summarize
+from diff_filter_optimizer import leaf_count, open_collection
+from synthetic import generate_filter_requests, seed_collection
+
+from src.homestay import tools
+
+
+async def run_query(collection, mongo_filter, sort_criteria):
+    await collection.count_documents(mongo_filter)
+    await collection.find(mongo_filter, tools.SEARCH_PROJECTION).sort(sort_criteria).limit(100).to_list(length=None)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["mongo", "mongomock"], default="mongo")
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the existing collection")
+    args = parser.parse_args()
+
+    collection = open_collection(args.backend)
+    if not args.no_seed:
+        print(f"Seeding {args.docs} synthetic homestays ({args.backend}) ...")
+        await seed_collection(collection, args.docs)
+
+    cases = []
+    for filter_request in generate_filter_requests(args.requests):
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw = await tools.build_enhanced_mongodb_filter(filter_request, optimize=False)
+            optimized = await tools.build_enhanced_mongodb_filter(filter_request, optimize=True)
+        try:
+            await run_query(collection, raw, tools.build_sort_criteria(filter_request))
+        except Exception:
+            continue  # invalid regex from the builder; not comparable
+        cases.append((filter_request, raw, optimized))
+
+    rows = {}
+    for label, index in (("unoptimized", 1), ("optimized", 2)):
+        latencies = []
+        for _ in range(args.repeat):
+            for case in cases:
+                with Stopwatch() as sw:
+                    await run_query(collection, case[index], tools.build_sort_criteria(case[0]))
+                latencies.append(sw.elapsed_ms)
+        row = summarize(latencies)
+        row["predicates"] = round(sum(leaf_count(case[index]) for case in cases) / max(len(cases), 1), 1)
+        rows[label] = row
+
+    print_table(f"{len(cases)} requests x {args.repeat}, {args.docs} docs (count + first page)", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""NL keyword extraction: per-keyword substring scan vs. the Aho-Corasick automaton.
+
+The substring scan is the previous `_extract_features_from_text` (every keyword
+of every category tested against every comma/'and'/'with' part and the full
+text). The automaton is `EnhancedFeatureSearchHelper.KEYWORD_AUTOMATON`.
+
+The corpus is the fixed queries from bench_query_pipeline.py plus --queries
+generated ones (keywords, plurals and distractor words such as 'mushroom' or
+'waterfall' inside filler sentences). Queries where the two disagree are
+listed with --show-diff; they should only differ on word-boundary cases.
+
+Usage:
+    python benchmarks/bench_keyword_automaton.py --queries 2000 --repeat 5
+"""
+import argparse
+import random
+import re
+from typing import Dict, List, Set
+
+from common import Stopwatch, print_table, summarize
+from bench_query_pipeline import NL_QUERIES
+
+from src.homestay.models import EnhancedFeatureSearchHelper
+
+helper = EnhancedFeatureSearchHelper
+CATEGORIES = {
+    "attractions": helper.ATTRACTION_KEYWORDS,
+    "infrastructure": helper.INFRASTRUCTURE_KEYWORDS,
+    "tourism": helper.TOURISM_KEYWORDS,
+}
+TEMPLATES = [
+    "homestay with {a}, {b} and {c}",
+    "looking for {a} and if possible {b}",
+    "need {a} with {b} in {place}",
+    "{a} or {b} near {place}",
+    "community homestay in {place} with {a}s and {b}",
+    "somewhere with {a}, {b}, {c} and {d}",
+]
+PLACES = ["Chitwan", "Pokhara", "Bardiya", "Malangwa", "Kaski", "Bandipur", "Sauraha"]
+DISTRACTORS = ["mushroom", "waterfall", "tourist", "greenroom", "organics", "lakeside", "trekker", "mobiles"]
+
+
+def substring_scan(text: str) -> Dict[str, Set[str]]:
+    found: Dict[str, Set[str]] = {}
+    text = text.strip()
+    parts = re.split(r'(?:,\s*|\s+and\s+|\s+with\s+)(?![^/]*\s)', text)
+    for part in parts + [text]:
+        part = part.strip()
+        if not part:
+            continue
+        for category, keywords in CATEGORIES.items():
+            for keyword, values in keywords.items():
+                if keyword in part:
+                    found.setdefault(category, set()).update(values)
+    return found
+
+
+def generate_queries(count: int, seed: int = 11) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = [keyword for keywords in CATEGORIES.values() for keyword in keywords] + DISTRACTORS
+    return [
+        rng.choice(TEMPLATES).format(place=rng.choice(PLACES), **{k: rng.choice(vocabulary) for k in "abcd"})
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000, help="Generated queries added to the fixed corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--show-diff", action="store_true", help="Print the queries the two methods disagree on")
+    args = parser.parse_args()
+
+    corpus = [query.lower() for query in NL_QUERIES + generate_queries(args.queries)]
+    automaton = helper.KEYWORD_AUTOMATON
+    methods = {"substring scan": substring_scan, "automaton": automaton.categorize}
+
+    rows = {}
+    for label, extract in methods.items():
+        latencies = []
+        for _ in range(args.repeat):
+            for query in corpus:
+                with Stopwatch() as sw:
+                    extract(query)
+                latencies.append(sw.elapsed_ms * 1000)
+        row = summarize(latencies)
+        rows[label] = {"n": row["n"], "mean_us": row["mean_ms"], "p50_us": row["p50_ms"],
+                       "p95_us": row["p95_ms"], "p99_us": row["p99_ms"]}
+    print_table(f"{len(corpus)} queries x {args.repeat}, {automaton.keyword_count} keywords (microseconds)", rows)
+
+    differing = [query for query in corpus if substring_scan(query) != automaton.categorize(query)]
+    print(f"\n{len(differing)} of {len(corpus)} queries extract different features")
+    if args.show_diff:
+        for query in differing:
+            only_scan = {c: v - automaton.categorize(query).get(c, set()) for c, v in substring_scan(query).items()}
+            print(f"  {query!r}: substring-only {({c: sorted(v) for c, v in only_scan.items() if v})}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""MongoDB lifecycle benchmark: per-session connect/ping/disconnect vs. the shared pool.
+
+"before" reproduces what the homestay MCP server used to do in stateless mode:
+every tool call ran the FastMCP lifespan, i.e. a new AsyncIOMotorClient, a `ping`
+and a `close()` around the query. "after" uses the process-wide `db_instance`
+owned by the FastAPI lifespan.
+
+Usage (needs a reachable mongod, defaults to MONGODB_URI):
+    python benchmarks/bench_mongo_lifecycle.py --calls 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+
+from common import MONGODB_URI, Stopwatch, print_table, summarize
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from src.homestay.database import HomestayDatabase, PoolMetricsListener
+
+COLLECTION = "Homestays Collection"
+QUERY = {"status": "approved"}
+
+
+def _db_name(uri: str) -> str:
+    return uri.split("?")[0].rsplit("/", 1)[-1] or "HomestayDB"
+
+
+async def run_before(calls: int, concurrency: int):
+    """Old behaviour: one client + ping + disconnect per tool call"""
+    listener = PoolMetricsListener()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_call():
+        async with semaphore:
+            with Stopwatch() as sw:
+                client = AsyncIOMotorClient(MONGODB_URI, event_listeners=[listener])
+                try:
+                    await client.admin.command("ping")
+                    await client[_db_name(MONGODB_URI)][COLLECTION].count_documents(QUERY)
+                finally:
+                    client.close()
+            latencies.append(sw.elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    return latencies, listener.snapshot(), elapsed
+
+
+async def run_after(calls: int, concurrency: int):
+    """New behaviour: shared, pre-warmed pool owned by the app lifespan"""
+    db = HomestayDatabase()
+    await db.connect()
+    db._pool_listener.reset()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_call():
+        async with semaphore:
+            with Stopwatch() as sw:
+                await db.ensure_connected()
+                await db.homestays.count_documents(QUERY)
+            latencies.append(sw.elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    metrics = db.pool_metrics()
+    await db.disconnect()
+    return latencies, metrics, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = {}
+    for label, runner in (("before (per-call)", run_before), ("after (shared)", run_after)):
+        latencies, pool, elapsed = await runner(args.calls, args.concurrency)
+        row = summarize(latencies)
+        row["calls/s"] = round(len(latencies) / elapsed, 1)
+        row["conns_opened"] = pool["connections_created"]
+        row["wait_max_ms"] = pool["wait_time_max_ms"]
+        rows[label] = row
+
+    print_table(f"{args.calls} calls, concurrency={args.concurrency}, uri={MONGODB_URI}", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""Officer API client benchmark: fresh httpx.AsyncClient per call vs. the shared pool.
+
+Starts the stub Next.js API from `stub_next_api.py` in process (or targets
+`--base-url`) and calls `list_officers` through both client strategies.
+
+Usage:
+    python benchmarks/bench_officer_http.py --calls 500 --concurrency 10
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common import Stopwatch, print_table, summarize
+from stub_next_api import serve_in_background
+
+
+async def run_fresh_clients(base_url: str, calls: int, concurrency: int):
+    """Old behaviour: `async with httpx.AsyncClient()` inside every tool call"""
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_call():
+        async with semaphore:
+            with Stopwatch() as sw:
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(
+                        f"{base_url}/api/admin/officer/list?adminUsername=admin",
+                        headers={"Cookie": "auth_token=bench"},
+                        timeout=30.0,
+                    )
+                    response.json()
+            latencies.append(sw.elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    return latencies, time.perf_counter() - started, None
+
+
+async def run_shared_client(calls: int, concurrency: int):
+    """New behaviour: the tools themselves, running on the shared `officer_api` pool"""
+    from src.officer.http_client import officer_api
+    from src.officer.tools import list_officers
+
+    await officer_api.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_call():
+        async with semaphore:
+            with Stopwatch() as sw:
+                await list_officers("admin", "bench")
+            latencies.append(sw.elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    metrics = officer_api.pool_metrics()
+    await officer_api.close()
+    return latencies, elapsed, metrics
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--base-url", default=None, help="Use an already running API instead of the stub")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Stub server think time")
+    args = parser.parse_args()
+
+    base_url = args.base_url or serve_in_background(delay_ms=args.delay_ms)
+    # tools.py reads NEXT_API_BASE at import time
+    os.environ["NEXT_API_BASE"] = base_url
+    import src.officer.tools as officer_tools
+    officer_tools.API_BASE_URL = base_url
+
+    fresh, fresh_elapsed, _ = await run_fresh_clients(base_url, args.calls, args.concurrency)
+    shared, shared_elapsed, pool = await run_shared_client(args.calls, args.concurrency)
+
+    rows = {
+        "fresh client/call": {**summarize(fresh), "calls/s": round(len(fresh) / fresh_elapsed, 1)},
+        "shared pool": {**summarize(shared), "calls/s": round(len(shared) / shared_elapsed, 1)},
+    }
+    print_table(f"{args.calls} list_officers calls, concurrency={args.concurrency}, {base_url}", rows)
+    saved = rows["fresh client/call"]["mean_ms"] - rows["shared pool"]["mean_ms"]
+    print(f"\nLatency saved per call (mean): {saved:.3f} ms")
+    print(f"Shared pool after run: {pool}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,235 @@
+"""Offline micro-benchmarks for the homestay query pipeline (no database needed).
+
+Times the CPU-bound stages a search goes through before any Mongo round trip:
+
+    nl_processing      EnhancedFeatureSearchHelper.enhanced_natural_query_processing
+    keyword_mapping    EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values
+    basic_filters      build_basic_filters
+    enhanced_filter    build_enhanced_mongodb_filter
+
+over a fixed corpus of English, Nepali and misspelled queries plus generated
+filter requests. Reports ops/sec and, from a separate tracemalloc pass, the
+average peak allocation per call and the memory still held after a pass.
+
+Results can be saved as a JSON baseline and later compared against it; the
+comparison exits non-zero when a stage got slower (or allocates more) than
+--tolerance allows.
+
+Usage:
+    python benchmarks/bench_query_pipeline.py
+    python benchmarks/bench_query_pipeline.py --save benchmarks/baselines/query_pipeline.json
+    python benchmarks/bench_query_pipeline.py --compare benchmarks/baselines/query_pipeline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from common import ROOT, print_table
+from synthetic import generate_filter_requests
+
+from src.homestay import tools
+from src.homestay.models import EnhancedFeatureSearchHelper, HomestayFilterRequest
+
+# What users actually type: English, Nepali, mixed, and common misspellings
+NL_QUERIES = [
+    "homestay with hiking and bird watching in Chitwan",
+    "community homestay near lake with wifi and clean drinking water",
+    "private homestay in Pokhara with boating and organic food",
+    "homestays with cultural program, local dishes and welcome ceremony",
+    "jungle safari and wildlife near Bardiya national park",
+    "homestay in Malangwa with toilet and solar lighting",
+    "treking routes with viewpoint tower and guest room",
+    "homestya near natinal park with bird wathign spot",
+    "fshing and local diseshad in Sarlahi",
+    "Malangawa homestay with transportation and health post",
+    "rating above 4 homestay with museum or cultural center",
+    "cheap homestay with internet or mobile communication in Kaski",
+    "चितवनमा जंगल सफारी भएको होमस्टे",
+    "पोखरामा डुंगा सयर र अर्गानिक खाना",
+    "मलंगवा नगरपालिकामा सामुदायिक होमस्टे",
+    "Bandipur homestay with sunrise viewing point and traditional dishes",
+    "eco-tourism, adventure sports and jungle walk in Sauraha",
+    "homestay with souvenir gift and farewell program",
+]
+
+KEYWORD_INPUTS = [
+    (["hiking"], "attractions"),
+    (["trek", "lake", "safari"], "attractions"),
+    (["bird wathign spot", "natinal park"], "attractions"),
+    (["museum", "cultural center", "organic"], "attractions"),
+    (["wifi"], "infrastructure"),
+    (["drinking water", "toilet", "solar"], "infrastructure"),
+    (["transportation", "health post", "security"], "infrastructure"),
+    (["welcome", "local food"], "tourism"),
+    (["cultural program", "souvenir", "cuisine"], "tourism"),
+    (["Trekking, Climbing & Hiking Routes/ट्रेकिङ, आरोहण तथा हाइकिङ मार्गहरू"], "attractions"),
+]
+
+
+def build_request_corpus(generated: int) -> List[HomestayFilterRequest]:
+    """NL-derived requests (as the search tool builds them) plus generated structured ones"""
+    requests = []
+    for query in NL_QUERIES:
+        extracted = EnhancedFeatureSearchHelper.enhanced_natural_query_processing(query)
+        fields = {k: v for k, v in extracted.items() if k in HomestayFilterRequest.__fields__ and v}
+        requests.append(HomestayFilterRequest(status="approved", **fields))
+    requests.extend(generate_filter_requests(generated))
+    return requests
+
+
+def _run_sync(calls: List[Callable[[], Any]]):
+    for call in calls:
+        call()
+
+
+async def _run_async(calls: List[Callable[[], Any]]):
+    for call in calls:
+        await call()
+
+
+def measure(calls: List[Callable[[], Any]], is_async: bool, min_time: float) -> Dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    run_pass = (lambda: loop.run_until_complete(_run_async(calls))) if is_async else (lambda: _run_sync(calls))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_pass()  # warm caches (compiled regexes, lru_caches) as a running server would have them
+
+            passes, elapsed = 0, 0.0
+            gc.collect()
+            started = time.perf_counter()
+            while elapsed < min_time or passes < 3:
+                run_pass()
+                passes += 1
+                elapsed = time.perf_counter() - started
+
+            # Allocation pass: tracemalloc slows everything down, so it is not timed
+            gc.collect()
+            tracemalloc.start()
+            baseline_current, _ = tracemalloc.get_traced_memory()
+            peaks = []
+            for call in calls:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                if is_async:
+                    loop.run_until_complete(call())
+                else:
+                    call()
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0] - baseline_current
+            tracemalloc.stop()
+    finally:
+        loop.close()
+
+    ops = passes * len(calls)
+    return {
+        "calls": len(calls),
+        "ops_per_sec": round(ops / elapsed, 1),
+        "us_per_op": round(elapsed * 1e6 / ops, 2),
+        "alloc_peak_kib": round(sum(peaks) / len(peaks) / 1024, 2),
+        "retained_kib": round(retained / 1024, 2),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> int:
+    """Print current vs. baseline and return the number of regressions"""
+    print(f"\nBaseline: {baseline.get('created_at')} @ {baseline.get('git_rev')} "
+          f"(python {baseline.get('python')}), tolerance {tolerance:.0%}")
+    rows, regressions = {}, 0
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        speed = current["ops_per_sec"] / previous["ops_per_sec"] if previous["ops_per_sec"] else 1.0
+        alloc = (current["alloc_peak_kib"] / previous["alloc_peak_kib"]) if previous["alloc_peak_kib"] else 1.0
+        verdict = "ok"
+        if speed < 1 - tolerance:
+            verdict = "SLOWER"
+        elif alloc > 1 + tolerance:
+            verdict = "MORE ALLOC"
+        regressions += verdict != "ok"
+        rows[name] = {
+            "ops/s before": previous["ops_per_sec"],
+            "ops/s now": current["ops_per_sec"],
+            "speed": f"{speed:.2f}x",
+            "alloc": f"{alloc:.2f}x",
+            "verdict": verdict,
+        }
+    print_table("comparison with baseline", rows)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to run each benchmark for")
+    parser.add_argument("--requests", type=int, default=200, help="Generated filter requests in the corpus")
+    parser.add_argument("--only", action="append", help="Run only the named benchmark(s)")
+    parser.add_argument("--save", help="Write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="Compare against a JSON baseline; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown/allocation growth")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        requests = build_request_corpus(args.requests)
+    helper = EnhancedFeatureSearchHelper
+    benchmarks = {
+        "nl_processing": ([lambda q=q: helper.enhanced_natural_query_processing(q) for q in NL_QUERIES], False),
+        "keyword_mapping": ([lambda k=k, c=c: helper.map_simple_keywords_to_database_values(k, c)
+                             for k, c in KEYWORD_INPUTS], False),
+        "basic_filters": ([lambda r=r: tools.build_basic_filters(r) for r in requests], True),
+        "enhanced_filter": ([lambda r=r: tools.build_enhanced_mongodb_filter(r) for r in requests], True),
+    }
+
+    results = {}
+    for name, (calls, is_async) in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(calls, is_async, args.min_time)
+    print_table(f"query pipeline ({len(NL_QUERIES)} NL queries, {len(requests)} filter requests)", results)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            exit_code = 1 if compare(results, json.load(f), args.tolerance) else 0
+
+    if args.save:
+        baseline = {
+            "benchmark": "query_pipeline",
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_rev": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": {"nl_queries": len(NL_QUERIES), "keyword_inputs": len(KEYWORD_INPUTS),
+                       "filter_requests": len(requests)},
+            "results": results,
+        }
+        save_path = Path(args.save)
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nSaved baseline to {save_path}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Shared helpers for the benchmark scripts in this directory."""
+import os
+import sys
+import math
+import time
+import statistics
+from pathlib import Path
+from typing import Dict, List, Any
+
+# Allow `python benchmarks/<script>.py` from the repository root
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+
+load_dotenv(ROOT / ".env")
+
+MONGODB_URI = os.getenv("BENCH_MONGODB_URI") or os.getenv("MONGODB_URI", "mongodb://localhost:27017/HomestayDB")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `samples` (pct in 0-100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, Any]:
+    """p50/p95/p99/mean summary for a list of latencies in milliseconds"""
+    return {
+        "n": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, Any]]):
+    """Print `{label: {metric: value}}` as an aligned table"""
+    print(f"\n=== {title} ===")
+    if not rows:
+        return
+    columns = list(next(iter(rows.values())).keys())
+    label_width = max(len(label) for label in rows) + 2
+    print("".ljust(label_width) + "".join(c.rjust(16) for c in columns))
+    for label, values in rows.items():
+        print(label.ljust(label_width) + "".join(str(values.get(c, "")).rjust(16) for c in columns))
+
+
+class Stopwatch:
+    """`with Stopwatch() as sw: ...` then read `sw.elapsed_ms`"""
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000.0
+        return False
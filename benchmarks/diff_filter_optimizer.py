@@ -0,0 +1,100 @@
+"""Differential check: optimized and unoptimized search filters must return the same homestays.
+
+Builds each generated request (plus its relaxed variant) with
+`build_enhanced_mongodb_filter(optimize=False)` and `optimize=True`, runs both
+against a synthetic collection and compares the matched `homestayId`s. Exits
+non-zero on any mismatch.
+
+Usage:
+    BENCH_MONGODB_URI=mongodb://localhost:27017/HomestayBench \\
+        python benchmarks/diff_filter_optimizer.py --docs 5000 --requests 500
+    # Without a mongod (needs `pip install mongomock-motor`):
+    python benchmarks/diff_filter_optimizer.py --backend mongomock
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+
+from common import MONGODB_URI
+from synthetic import generate_filter_requests, seed_collection
+
+from src.homestay import tools
+
+
+def leaf_count(mongo_filter) -> int:
+    """Number of field predicates in a query document"""
+    if isinstance(mongo_filter, list):
+        return sum(leaf_count(part) for part in mongo_filter)
+    if not isinstance(mongo_filter, dict):
+        return 0
+    return sum(leaf_count(value) if key in ("$and", "$or") else 1 for key, value in mongo_filter.items())
+
+
+def open_collection(backend: str):
+    if backend == "mongomock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--backend mongomock needs `pip install mongomock-motor`")
+        return AsyncMongoMockClient()["HomestayBench"]["Homestays Collection"]
+    from motor.motor_asyncio import AsyncIOMotorClient
+    db_name = MONGODB_URI.split("?")[0].rsplit("/", 1)[-1] or "HomestayBench"
+    return AsyncIOMotorClient(MONGODB_URI)[db_name]["Homestays Collection"]
+
+
+async def matched_ids(collection, mongo_filter):
+    cursor = collection.find(mongo_filter, {"homestayId": 1, "_id": 0})
+    return sorted(doc["homestayId"] for doc in await cursor.to_list(length=None))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["mongo", "mongomock"], default="mongo")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    collection = open_collection(args.backend)
+    print(f"Seeding {args.docs} synthetic homestays ({args.backend}) ...")
+    await seed_collection(collection, args.docs)
+
+    checked = mismatches = errors = 0
+    leaves_before = leaves_after = 0
+    for filter_request in generate_filter_requests(args.requests, args.seed):
+        for request in (filter_request, tools.build_relaxed_request(filter_request)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                raw = await tools.build_enhanced_mongodb_filter(request, optimize=False)
+                optimized = await tools.build_enhanced_mongodb_filter(request, optimize=True)
+            leaves_before += leaf_count(raw)
+            leaves_after += leaf_count(optimized)
+            outcomes = []
+            for mongo_filter in (raw, optimized):
+                try:
+                    outcomes.append(await matched_ids(collection, mongo_filter))
+                except Exception as e:
+                    # Some builder patterns are not valid regexes; the optimizer must not change that
+                    outcomes.append(f"error: {type(e).__name__}")
+            expected, actual = outcomes
+            if isinstance(expected, str) and expected == actual:
+                errors += 1
+                continue
+            checked += 1
+            if expected != actual:
+                mismatches += 1
+                summary = [len(o) if isinstance(o, list) else o for o in outcomes]
+                print(f"MISMATCH ({summary[0]} vs {summary[1]}) for {request.dict(exclude_none=True)}")
+                print("  raw:      " + json.dumps(raw, ensure_ascii=False, default=str)[:500])
+                print("  optimized:" + json.dumps(optimized, ensure_ascii=False, default=str)[:500])
+
+    print(f"\nChecked {checked} filters, {mismatches} mismatches, {errors} skipped (invalid in both forms)")
+    print(f"Field predicates: {leaves_before} -> {leaves_after} "
+          f"({100.0 * (leaves_before - leaves_after) / max(leaves_before, 1):.1f}% fewer)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
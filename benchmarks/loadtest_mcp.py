@@ -0,0 +1,295 @@
+"""End-to-end load test over the real streamable-HTTP MCP transport.
+
+Starts the full app (`main.py`) backed by a seeded synthetic dataset, plus the
+stub Next.js officer API, each in its own process. Then hundreds of simulated
+agents open MCP sessions to `/homestay/mcp` and `/officer/mcp` and call tools
+following a weighted mix until the run duration is up. Reports throughput and
+p50/p95/p99 latency per tool.
+
+Backends:
+    --backend mongo       a local mongod at BENCH_MONGODB_URI (seeded with --docs homestays)
+    --backend mongomock   in-process stand-in inside the server (`pip install mongomock-motor`);
+                          no change streams, collation or explain, so use it for
+                          transport/CPU capacity, not query-plan numbers
+    --target URL          drive an already running server instead (nothing is started or seeded)
+
+Usage:
+    BENCH_MONGODB_URI=mongodb://localhost:27017/HomestayBench \\
+        python benchmarks/loadtest_mcp.py --docs 20000 --agents 200 --duration 60
+    python benchmarks/loadtest_mcp.py --backend mongomock --docs 2000 --agents 50 --duration 20 \\
+        --mix search_homestays=70,get_homestay_statistics=10,list_officers=20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from common import MONGODB_URI, ROOT, print_table, summarize
+from stub_next_api import free_port
+from synthetic import LOCATIONS, generate_filter_requests, seed_collection
+from bench_query_pipeline import NL_QUERIES
+
+DEFAULT_MIX = ("search_homestays=55,search_homestays_batch=5,explain_homestay_search=2,"
+               "get_homestay_statistics=8,list_officers=20,create_officer=5,update_officer_status=5")
+
+OFFICER_TOOLS = {"list_officers", "create_officer", "update_officer_status", "delete_officer",
+                 "update_officer_permissions"}
+
+# search_homestays parameters that HomestayFilterRequest fields map onto directly
+_SEARCH_PARAMS = ("province", "district", "municipality", "any_local_attractions", "local_attractions",
+                  "any_infrastructure", "infrastructure", "any_tourism_services", "tourism_services",
+                  "min_average_rating", "logical_operator", "homestay_type")
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+class ArgumentFactory:
+    """Realistic tool arguments: NL descriptions, structured filters and officer payloads"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.structured = [
+                {k: v for k, v in request.dict(exclude_none=True).items() if k in _SEARCH_PARAMS}
+                for request in generate_filter_requests(500, seed)
+            ]
+
+    def search(self) -> Dict[str, Any]:
+        rng = self.rng
+        if rng.random() < 0.4:
+            args: Dict[str, Any] = {"natural_language_description": rng.choice(NL_QUERIES)}
+        else:
+            args = dict(rng.choice(self.structured))
+        args["limit"] = rng.choice([10, 20, 50])
+        return args
+
+    def __call__(self, tool: str) -> Dict[str, Any]:
+        rng = self.rng
+        if tool in ("search_homestays", "explain_homestay_search"):
+            args = self.search()
+            if tool == "explain_homestay_search":
+                args["dry_run"] = True
+            return args
+        if tool == "search_homestays_batch":
+            district = rng.choice(LOCATIONS)[1][0]
+            return {"searches": [{"district": district, "any_local_attractions": [keyword], "limit": 10}
+                                 for keyword in rng.sample(["hiking", "lake", "safari", "museum", "boating"], 3)]}
+        if tool == "get_homestay_statistics":
+            return {}
+        auth = {"admin_username": f"admin{rng.randint(1, 20)}", "auth_token": "loadtest"}
+        if tool == "create_officer":
+            n = rng.randint(1, 10**6)
+            return {**auth, "officer_data": {"username": f"officer{n}", "password": "secret",
+                                             "email": f"officer{n}@example.com", "contactNumber": "9800000000"}}
+        if tool in ("update_officer_status", "delete_officer"):
+            args = {**auth, "officer_id": f"{rng.getrandbits(96):024x}"}
+            if tool == "update_officer_status":
+                args["is_active"] = rng.random() < 0.5
+            return args
+        if tool == "update_officer_permissions":
+            return {**auth, "officer_id": f"{rng.getrandbits(96):024x}", "permissions": {"homestayApproval": True}}
+        return auth
+
+
+# ---------------------------------------------------------------------------
+# Server side (`serve` subcommand, runs in its own process)
+# ---------------------------------------------------------------------------
+
+def serve(args):
+    """Run main.app on --port over a seeded dataset"""
+    os.environ["NEXT_API_BASE"] = args.next_api
+    if args.backend == "mongomock":
+        from mongomock_motor import AsyncMongoMockClient
+        from src.homestay import database, tools
+
+        client = AsyncMongoMockClient()
+        # The stand-in has no change streams, collation, explain or partial indexes
+        os.environ.setdefault("HOMESTAY_ENSURE_INDEXES", "false")
+        os.environ.setdefault("HOMESTAY_VERIFY_QUERY_PLANS", "false")
+        tools.SEARCH_COLLATION = None
+
+        async def open_standin(self, mongodb_uri: str):
+            self._client = client
+            self._db = client["HomestayDB"]
+            self._connected = True
+
+        database.HomestayDatabase._open = open_standin
+        collection = client["HomestayDB"]["Homestays Collection"]
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        os.environ["MONGODB_URI"] = MONGODB_URI
+        db_name = MONGODB_URI.split("?")[0].rsplit("/", 1)[-1] or "HomestayDB"
+        collection = AsyncIOMotorClient(MONGODB_URI)[db_name]["Homestays Collection"]
+
+    if args.docs:
+        print(f"Seeding {args.docs} synthetic homestays ({args.backend}) ...", flush=True)
+        asyncio.new_event_loop().run_until_complete(seed_collection(collection, args.docs))
+
+    import uvicorn
+    import main as app_module
+    # The server logs every search to stdout; keep that off the load-test console
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+    uvicorn.run(app_module.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def start_process(argv: List[str], ready_url: str, timeout: float = 120.0) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, *argv], cwd=ROOT)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"{' '.join(argv)} exited with {process.returncode}")
+        try:
+            httpx.get(ready_url, timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.25)
+    process.terminate()
+    sys.exit(f"{' '.join(argv)} did not come up within {timeout:.0f}s")
+
+
+# ---------------------------------------------------------------------------
+# Load generator
+# ---------------------------------------------------------------------------
+
+async def run_agent(agent_id: int, base_url: str, mix: List[Tuple[str, float]], deadline: float,
+                    think_ms: float, results: Dict[str, List[float]], errors: Dict[str, int]):
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    rng = random.Random(agent_id)
+    make_args = ArgumentFactory(agent_id)
+    tools, weights = zip(*mix)
+
+    async with contextlib.AsyncExitStack() as stack:
+        sessions = {}
+        for server in ("homestay", "officer"):
+            read, write, _ = await stack.enter_async_context(streamablehttp_client(f"{base_url}/{server}/mcp"))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            sessions[server] = session
+
+        while time.perf_counter() < deadline:
+            tool = rng.choices(tools, weights)[0]
+            session = sessions["officer" if tool in OFFICER_TOOLS else "homestay"]
+            started = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, make_args(tool))
+                failed = result.isError
+            except Exception:
+                failed = True
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            results.setdefault(tool, []).append(elapsed_ms)
+            if failed:
+                errors[tool] = errors.get(tool, 0) + 1
+            if think_ms:
+                await asyncio.sleep(rng.expovariate(1000.0 / think_ms))
+
+
+async def drive(args, base_url: str):
+    # One INFO line per HTTP request from httpx/MCP would drown the report
+    for name in ("httpx", "mcp"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    mix = parse_mix(args.mix)
+    results: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+
+    # Ramp agents up over --ramp seconds so the server is not hit by hundreds of handshakes at once
+    deadline = time.perf_counter() + args.ramp + args.duration
+    agents = []
+    for agent_id in range(args.agents):
+        agents.append(asyncio.create_task(
+            run_agent(agent_id, base_url, mix, deadline, args.think_ms, results, errors)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.agents)
+    measured_from = time.perf_counter()
+    outcomes = await asyncio.gather(*agents, return_exceptions=True)
+    wall = time.perf_counter() - measured_from + args.ramp
+
+    failed_agents = [o for o in outcomes if isinstance(o, BaseException)]
+    if failed_agents:
+        print(f"⚠️ {len(failed_agents)} agents failed to connect or crashed, e.g.: {failed_agents[0]!r}")
+
+    rows = {}
+    for tool, latencies in sorted(results.items()):
+        row = summarize(latencies)
+        row["errors"] = errors.get(tool, 0)
+        row["calls/s"] = round(len(latencies) / wall, 1)
+        rows[tool] = row
+    all_latencies = [ms for latencies in results.values() for ms in latencies]
+    total = summarize(all_latencies)
+    total["errors"] = sum(errors.values())
+    total["calls/s"] = round(len(all_latencies) / wall, 1)
+    rows["ALL"] = total
+    print_table(f"{args.agents} agents, {wall:.0f}s, mix {args.mix}", rows)
+
+    with contextlib.suppress(httpx.HTTPError):
+        scrape = httpx.get(f"{base_url}/metrics", timeout=5.0).text
+        roundtrips = [line for line in scrape.splitlines()
+                      if line.startswith(("mcp_tool_mongo_roundtrips_sum", "mcp_tool_mongo_roundtrips_count"))]
+        if roundtrips:
+            print("\nServer-side Mongo round trips (from /metrics):")
+            print("\n".join(f"  {line}" for line in roundtrips))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "serve"])
+    parser.add_argument("--backend", choices=["mongo", "mongomock"], default="mongo")
+    parser.add_argument("--docs", type=int, default=5000, help="Synthetic homestays to seed (0 keeps existing data)")
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which agents connect")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="Mean pause between an agent's calls")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="tool=weight,... (tool names as exposed over MCP)")
+    parser.add_argument("--stub-delay-ms", type=float, default=20.0, help="Stub Next.js API think time")
+    parser.add_argument("--target", help="Base URL of an already running server")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--next-api", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--verbose", action="store_true", help="Show server stdout")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args)
+        return
+
+    processes = []
+    try:
+        base_url = args.target
+        if not base_url:
+            stub_port, app_port = free_port(), args.port or free_port()
+            stub_url = f"http://127.0.0.1:{stub_port}"
+            processes.append(start_process(
+                ["benchmarks/stub_next_api.py", "--port", str(stub_port), "--delay-ms", str(args.stub_delay_ms)],
+                f"{stub_url}/docs"))
+            base_url = f"http://127.0.0.1:{app_port}"
+            serve_argv = ["benchmarks/loadtest_mcp.py", "serve", "--backend", args.backend, "--docs", str(args.docs),
+                          "--port", str(app_port), "--next-api", stub_url]
+            if args.verbose:
+                serve_argv.append("--verbose")
+            processes.append(start_process(serve_argv, f"{base_url}/metrics"))
+        asyncio.run(drive(args, base_url))
+    finally:
+        for process in processes:
+            process.terminate()
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Minimal stand-in for the Next.js officer API used by `src/officer/tools.py`.
+
+Run standalone (`python benchmarks/stub_next_api.py --port 3999`) or start it in
+process with `serve_in_background()`. `--delay-ms` adds server think time.
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+def create_app(delay_ms: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    officers: Dict[str, Dict[str, Any]] = {}
+
+    def _officer(payload: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            "_id": uuid.uuid4().hex[:24],
+            "username": payload.get("username", "officer"),
+            "email": payload.get("email", "officer@example.com"),
+            "contactNumber": payload.get("contactNumber", "9800000000"),
+            "role": "officer",
+            "permissions": payload.get("permissions") or {},
+            "isActive": payload.get("isActive", True),
+            "parentAdmin": payload.get("adminUsername", "admin"),
+            "createdAt": now,
+            "updatedAt": now,
+        }
+
+    async def _think():
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000.0)
+
+    @app.post("/api/admin/officer/create")
+    async def create(request: Request):
+        await _think()
+        officer = _officer(await request.json())
+        officers[officer["_id"]] = officer
+        return {"success": True, "officer": officer}
+
+    @app.get("/api/admin/officer/list")
+    async def list_(adminUsername: str):
+        await _think()
+        if not officers:
+            for i in range(5):
+                officer = _officer({"username": f"officer{i}", "adminUsername": adminUsername})
+                officers[officer["_id"]] = officer
+        return {"success": True, "officers": list(officers.values())}
+
+    @app.post("/api/admin/officer/update-status")
+    async def update_status(request: Request):
+        await _think()
+        body = await request.json()
+        return {"success": True, "message": f"Officer {body.get('officerId')} updated"}
+
+    @app.post("/api/admin/officer/delete")
+    async def delete(request: Request):
+        await _think()
+        body = await request.json()
+        officers.pop(body.get("officerId"), None)
+        return {"success": True, "message": "Officer deleted"}
+
+    @app.put("/api/admin/officer/update-permissions")
+    async def update_permissions(request: Request):
+        await _think()
+        body = await request.json()
+        officer = officers.get(body.get("officerId")) or _officer({"adminUsername": body.get("adminUsername")})
+        officer["permissions"] = body.get("permissions") or {}
+        return {"success": True, "officer": officer}
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_background(port: int = 0, delay_ms: float = 0.0) -> str:
+    """Start the stub in a daemon thread and return its base URL"""
+    port = port or free_port()
+    config = uvicorn.Config(create_app(delay_ms), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.02)
+    return f"http://127.0.0.1:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Next.js officer API")
+    parser.add_argument("--port", type=int, default=3999)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.delay_ms), host="127.0.0.1", port=args.port, log_level="warning")
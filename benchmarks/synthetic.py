@@ -0,0 +1,131 @@
+"""Synthetic homestay documents shaped like `Homestays Collection` records.
+
+Addresses are bilingual (`{"en": ..., "ne": ...}`), features use the exact
+registration-form strings the query builder maps keywords to, and ratings /
+dates are spread realistically so sorting and range filters behave like prod.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+import common  # noqa: F401  (puts the repository on sys.path)
+
+from src.homestay.models import EnhancedFeatureSearchHelper, HomestayFilterRequest, LocalAttractionCategories
+
+# (province, district, municipality) triples with Nepali names
+LOCATIONS = [
+    (("Madhesh Province", "मधेश प्रदेश"), ("Sarlahi", "सर्लाही"), ("Malangwa Municipality", "मलंगवा नगरपालिका")),
+    (("Madhesh Province", "मधेश प्रदेश"), ("Dhanusha", "धनुषा"), ("Janakpurdham Sub-Metropolitan City", "जनकपुरधाम उपमहानगरपालिका")),
+    (("Bagmati Province", "बागमती प्रदेश"), ("Chitwan", "चितवन"), ("Ratnanagar Municipality", "रत्ननगर नगरपालिका")),
+    (("Bagmati Province", "बागमती प्रदेश"), ("Kathmandu", "काठमाडौं"), ("Kathmandu Metropolitan City", "काठमाडौं महानगरपालिका")),
+    (("Bagmati Province", "बागमती प्रदेश"), ("Nuwakot", "नुवाकोट"), ("Bidur Municipality", "विदुर नगरपालिका")),
+    (("Gandaki Province", "गण्डकी प्रदेश"), ("Kaski", "कास्की"), ("Pokhara Metropolitan City", "पोखरा महानगरपालिका")),
+    (("Gandaki Province", "गण्डकी प्रदेश"), ("Lamjung", "लमजुङ"), ("Besisahar Municipality", "बेसीशहर नगरपालिका")),
+    (("Gandaki Province", "गण्डकी प्रदेश"), ("Tanahun", "तनहुँ"), ("Bandipur Rural Municipality", "बन्दीपुर गाउँपालिका")),
+    (("Koshi Province", "कोशी प्रदेश"), ("Udayapur", "उदयपुर"), ("Triyuga Municipality", "त्रियुगा नगरपालिका")),
+    (("Koshi Province", "कोशी प्रदेश"), ("Ilam", "इलाम"), ("Ilam Municipality", "इलाम नगरपालिका")),
+    (("Lumbini Province", "लुम्बिनी प्रदेश"), ("Rupandehi", "रुपन्देही"), ("Lumbini Sanskritik Municipality", "लुम्बिनी सांस्कृतिक नगरपालिका")),
+    (("Lumbini Province", "लुम्बिनी प्रदेश"), ("Bardiya", "बर्दिया"), ("Thakurbaba Municipality", "ठाकुरबाबा नगरपालिका")),
+    (("Karnali Province", "कर्णाली प्रदेश"), ("Jumla", "जुम्ला"), ("Chandannath Municipality", "चन्दननाथ नगरपालिका")),
+    (("Sudurpashchim Province", "सुदूरपश्चिम प्रदेश"), ("Kailali", "कैलाली"), ("Dhangadhi Sub-Metropolitan City", "धनगढी उपमहानगरपालिका")),
+]
+
+ATTRACTIONS = sorted({
+    value
+    for group in ("NATURAL", "CULTURAL", "PRODUCTS", "FOREST", "WILDLIFE", "ADVENTURE")
+    for value in getattr(LocalAttractionCategories, group)
+})
+INFRASTRUCTURE = sorted({v for values in EnhancedFeatureSearchHelper.INFRASTRUCTURE_KEYWORDS.values() for v in values})
+TOURISM_SERVICES = sorted({v for values in EnhancedFeatureSearchHelper.TOURISM_KEYWORDS.values() for v in values})
+
+_NEPALI_DIGITS = str.maketrans("0123456789", "०१२३४५६७८९")
+
+NAME_PARTS = ["Himalayan", "Green", "Tharu", "Sunrise", "River", "Jungle", "Lakeside", "Mountain",
+              "Heritage", "Village", "Community", "Peaceful", "Everest", "Lotus", "Rhino"]
+
+
+def generate_homestays(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yield `count` homestay documents (deterministic for a given seed)"""
+    rng = random.Random(seed)
+    epoch = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        province, district, municipality = rng.choice(LOCATIONS)
+        status = rng.choices(["approved", "pending", "rejected"], weights=[80, 15, 5])[0]
+        rating = rng.choice([None] * 2 + [round(rng.uniform(2.5, 5.0), 1) for _ in range(8)])
+        created = epoch + timedelta(minutes=rng.randint(0, 60 * 24 * 900))
+        village = f"{rng.choice(NAME_PARTS)} Gaun"
+        ward = rng.randint(1, 15)
+        yield {
+            "homestayId": f"homestay{i:06d}",
+            "homeStayName": f"{rng.choice(NAME_PARTS)} {rng.choice(NAME_PARTS)} Homestay {i}",
+            "villageName": village,
+            "homeStayType": rng.choices(["community", "private"], weights=[60, 40])[0],
+            "status": status,
+            "adminUsername": rng.choice(["admin", "madhesh_admin", "gandaki_admin"]),
+            "address": {
+                "province": {"en": province[0], "ne": province[1]},
+                "district": {"en": district[0], "ne": district[1]},
+                "municipality": {"en": municipality[0], "ne": municipality[1]},
+                "ward": {"en": str(ward), "ne": str(ward).translate(_NEPALI_DIGITS)},
+                "city": village,
+                "tole": f"Tole {rng.randint(1, 30)}",
+            },
+            "features": {
+                "localAttractions": rng.sample(ATTRACTIONS, rng.randint(0, 6)),
+                "infrastructure": rng.sample(INFRASTRUCTURE, rng.randint(0, 4)),
+                "tourismServices": rng.sample(TOURISM_SERVICES, rng.randint(0, 4)),
+            },
+            "homeCount": rng.randint(1, 20),
+            "roomCount": rng.randint(1, 40),
+            "bedCount": rng.randint(1, 80),
+            "averageRating": rating,
+            "isVerified": rng.random() < 0.4,
+            "isFeatured": rng.random() < 0.1,
+            "isAdmin": False,
+            "createdAt": created,
+            "updatedAt": created + timedelta(days=rng.randint(0, 60)),
+        }
+
+
+async def seed_collection(collection, count: int, seed: int = 42, batch_size: int = 5000) -> int:
+    """Replace the contents of `collection` with `count` synthetic homestays"""
+    await collection.delete_many({})
+    batch: List[Dict[str, Any]] = []
+    inserted = 0
+    for doc in generate_homestays(count, seed):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+def generate_filter_requests(count: int, seed: int = 7) -> Iterator[HomestayFilterRequest]:
+    """Yield `count` varied search requests against the synthetic data (deterministic for a given seed)"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        fields: Dict[str, Any] = {"logical_operator": rng.choice(["AND", "OR", "MIXED"])}
+        province, district, municipality = rng.choice(LOCATIONS)
+        if rng.random() < 0.4:
+            fields["province"] = province[0].split()[0]
+        if rng.random() < 0.3:
+            fields["district"] = district[0]
+        if rng.random() < 0.2:
+            # Include typo-prone spellings so the fuzzy location patterns are exercised
+            fields["municipality"] = rng.choice([municipality[0].split()[0], "Malangawa", municipality[1].split()[0]])
+        for must, any_field, values in (("local_attractions", "any_local_attractions", ATTRACTIONS),
+                                        ("infrastructure", "any_infrastructure", INFRASTRUCTURE),
+                                        ("tourism_services", "any_tourism_services", TOURISM_SERVICES)):
+            if rng.random() < 0.35:
+                fields[must] = rng.sample(values, rng.randint(1, 3))
+            if rng.random() < 0.35:
+                fields[any_field] = rng.sample(values, rng.randint(1, 4))
+        if rng.random() < 0.25:
+            fields["min_average_rating"] = rng.choice([3.0, 3.5, 4.0, 4.5])
+        if rng.random() < 0.1:
+            fields["homestay_name"] = f"{rng.choice(NAME_PARTS)} Homestay"
+        yield HomestayFilterRequest(**fields)
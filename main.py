@@ -1,26 +1,68 @@
 
 import contextlib
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 import os
-from src.officer import officer_mcp
-from src.homestay import homestay_mcp
+from src.officer import officer_mcp, officer_api
+from src.homestay import homestay_mcp, db_instance
+from src.homestay import lifecycle as homestay_lifecycle
+from src.homestay.cache import search_cache, homestay_cache, negative_cache
+from src.homestay.columnar import columnar_index
+from src.homestay.feature_catalog import feature_catalog
+from src.homestay.spelling import spelling_index
+from src.homestay.diagnostics import zero_result_diagnostics
+from src.metrics import metrics
+from src.logs import configure_logging, shutdown_logging, get_logger
 from dotenv import load_dotenv
 
 load_dotenv()
+
+log = get_logger("main")
+
 # Prefer HOST/PORT for alignment with common envs; fall back to MCP_HOST/MCP_PORT for backward compatibility
 HOST = os.getenv("HOST") or os.getenv("MCP_HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT") or os.getenv("MCP_PORT", "8080"))
 
 
-# Create a combined lifespan to manage both session managers
+# Create a combined lifespan to manage both session managers and the shared
+# MongoDB client / Next.js API client (one pool per process, not per MCP session)
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
     async with contextlib.AsyncExitStack() as stack:
+        configure_logging()
+        stack.callback(shutdown_logging)  # registered first so it flushes after everything else shut down
+
+        await db_instance.connect()
+        stack.push_async_callback(db_instance.disconnect)
+        log.info("database.connected")
+
+        await homestay_lifecycle.startup()
+        stack.push_async_callback(homestay_lifecycle.shutdown)
+
+        await officer_api.start()
+        stack.push_async_callback(officer_api.close)
+
         await stack.enter_async_context(officer_mcp.session_manager.run())
         await stack.enter_async_context(homestay_mcp.session_manager.run())
         yield
 
 app = FastAPI(lifespan=lifespan)
+
+metrics.add_collector("mongo_pool", db_instance.pool_metrics)
+metrics.add_collector("next_api_pool", officer_api.pool_metrics)
+metrics.add_collector("search_cache", search_cache.metrics)
+metrics.add_collector("homestay_cache", homestay_cache.metrics)
+metrics.add_collector("negative_cache", negative_cache.metrics)
+metrics.add_collector("columnar_search", columnar_index.stats)
+metrics.add_collector("feature_catalog", feature_catalog.stats)
+metrics.add_collector("spelling_index", spelling_index.stats)
+metrics.add_collector("zero_result_diagnostics", zero_result_diagnostics.stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    """Tool/stage latency histograms, call counters and Mongo round trips (Prometheus text format)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 app.mount("/officer", officer_mcp.streamable_http_app())
 app.mount("/homestay", homestay_mcp.streamable_http_app())
 
@@ -0,0 +1,167 @@
+import os
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+from .database import db_instance
+from .indexes import SEARCH_COLLATION
+
+# Counters reported by get_homestay_statistics when the collection is empty
+EMPTY_STATS = {
+    "total_homestays": 0,
+    "approved_homestays": 0,
+    "pending_homestays": 0,
+    "rejected_homestays": 0,
+    "community_homestays": 0,
+    "private_homestays": 0,
+    "verified_homestays": 0,
+    "featured_homestays": 0,
+    "avg_rating": 0,
+    "avg_rooms": 0,
+    "avg_beds": 0,
+}
+
+
+def search_projection(sort_criteria: List[Tuple[str, int]]) -> Dict[str, Any]:
+    """Result fields plus the sort keys needed to issue a next-page cursor"""
+    projection = {"homestayId": 1, "homeStayName": 1}
+    projection.update({field: 1 for field, _ in sort_criteria})
+    return projection
+
+
+class HomestayBackend(Protocol):
+    """Read side of homestay search, independent of where the documents live.
+
+    Filters are the Mongo filter documents built in tools.py; a backend either
+    evaluates them natively or translates them.
+    """
+    name: str
+    # Strict + relaxed count/page in one `$facet` aggregation (see execute_facet_search)
+    supports_facet: bool
+    # Accepts the feature index's `_id: {$in: [...]}` rewrite; others get the logical filter
+    uses_feature_index: bool
+
+    async def count(self, query_filter: Dict[str, Any]) -> int: ...
+
+    async def estimated_count(self) -> int: ...
+
+    async def find_page(self, query_filter: Dict[str, Any], sort_criteria: List[Tuple[str, int]],
+                        skip: int, limit: int) -> List[Dict[str, Any]]: ...
+
+    async def find_documents(self, query_filter: Dict[str, Any], fields: List[str]) -> List[Dict[str, Any]]: ...
+
+    async def aggregate_stats(self) -> Dict[str, Any]: ...
+
+
+class MotorBackend:
+    """The `Homestays Collection` on the shared Motor client"""
+    name = "mongo"
+    supports_facet = True
+    uses_feature_index = True
+
+    def __init__(self):
+        self.collation: Optional[Dict[str, Any]] = SEARCH_COLLATION
+
+    @property
+    def collection(self):
+        collection = db_instance.homestays
+        if collection is None or not db_instance.is_connected:
+            raise Exception("Database not connected. Please ensure the server is properly initialized.")
+        return collection
+
+    async def count(self, query_filter: Dict[str, Any]) -> int:
+        return await self.collection.count_documents(query_filter, collation=self.collation)
+
+    async def estimated_count(self) -> int:
+        return await self.collection.estimated_document_count()
+
+    async def find_page(self, query_filter: Dict[str, Any], sort_criteria: List[Tuple[str, int]],
+                        skip: int, limit: int) -> List[Dict[str, Any]]:
+        cursor = self.collection.find(query_filter, search_projection(sort_criteria), collation=self.collation)
+        return await cursor.sort(sort_criteria).skip(skip).limit(limit).to_list(length=None)
+
+    async def find_documents(self, query_filter: Dict[str, Any], fields: List[str]) -> List[Dict[str, Any]]:
+        # Exact-match lookups: no search collation, so the collation-free `mcp_homestayId` index applies
+        projection = {field: 1 for field in fields}
+        return await self.collection.find(query_filter, projection).to_list(length=None)
+
+    async def aggregate_stats(self) -> Dict[str, Any]:
+        pipeline = [
+            {
+                "$facet": {
+                    "summary": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "total_homestays": {"$sum": 1},
+                                "approved_homestays": {
+                                    "$sum": {"$cond": [{"$eq": ["$status", "approved"]}, 1, 0]}
+                                },
+                                "pending_homestays": {
+                                    "$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}
+                                },
+                                "rejected_homestays": {
+                                    "$sum": {"$cond": [{"$eq": ["$status", "rejected"]}, 1, 0]}
+                                },
+                                "community_homestays": {
+                                    "$sum": {"$cond": [{"$eq": ["$homeStayType", "community"]}, 1, 0]}
+                                },
+                                "private_homestays": {
+                                    "$sum": {"$cond": [{"$eq": ["$homeStayType", "private"]}, 1, 0]}
+                                },
+                                "verified_homestays": {
+                                    "$sum": {"$cond": [{"$eq": ["$isVerified", True]}, 1, 0]}
+                                },
+                                "featured_homestays": {
+                                    "$sum": {"$cond": [{"$eq": ["$isFeatured", True]}, 1, 0]}
+                                },
+                                "avg_rating": {"$avg": "$averageRating"},
+                                "avg_rooms": {"$avg": "$roomCount"},
+                                "avg_beds": {"$avg": "$bedCount"}
+                            }
+                        }
+                    ],
+                    "provinces": [
+                        {"$group": {"_id": {"$ifNull": ["$address.province.en", "$address.province.ne"]}, "count": {"$sum": 1}}},
+                        {"$match": {"_id": {"$nin": [None, ""]}}},
+                        {"$sort": {"count": -1}},
+                    ],
+                    "districts": [
+                        {"$group": {"_id": {"$ifNull": ["$address.district.en", "$address.district.ne"]}, "count": {"$sum": 1}}},
+                        {"$match": {"_id": {"$nin": [None, ""]}}},
+                        {"$sort": {"count": -1}},
+                    ],
+                }
+            }
+        ]
+        result = await self.collection.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {}
+
+        if facets.get("summary"):
+            stats = facets["summary"][0]
+            stats.pop("_id", None)
+        else:
+            stats = dict(EMPTY_STATS)
+        stats["province_distribution"] = {row["_id"]: row["count"] for row in facets.get("provinces", [])}
+        stats["district_distribution"] = {row["_id"]: row["count"] for row in facets.get("districts", [])}
+        return stats
+
+
+_backends: Dict[str, HomestayBackend] = {}
+
+
+def search_backend_name() -> str:
+    """'mongo' (default) or 'sqlite' (local replica, see sqlite_backend.py)"""
+    name = os.getenv("HOMESTAY_SEARCH_BACKEND", "mongo").lower()
+    return name if name in ("mongo", "sqlite") else "mongo"
+
+
+def search_backend() -> HomestayBackend:
+    """The configured backend (one instance per process)"""
+    name = search_backend_name()
+    backend = _backends.get(name)
+    if backend is None:
+        if name == "sqlite":
+            from .sqlite_backend import SQLiteBackend
+            backend = SQLiteBackend(os.getenv("HOMESTAY_SQLITE_PATH", "homestays.sqlite3"))
+        else:
+            backend = MotorBackend()
+        _backends[name] = backend
+    return backend
@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from .models import HomestayFilterRequest
+from .change_feed import change_feed
+
+
+def _canonical_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple, set)):
+        items = {json.dumps(_canonical_value(v), sort_keys=True, ensure_ascii=False) for v in value if v not in (None, "")}
+        return sorted(items)
+    if isinstance(value, dict):
+        return {k: _canonical_value(v) for k, v in sorted(value.items()) if v is not None}
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def canonical_request_key(filter_request: HomestayFilterRequest) -> str:
+    """Stable hash of a normalized filter request (None fields dropped, lists sorted and deduped)"""
+    normalized = _canonical_value(filter_request.dict(exclude_none=True))
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AsyncResultCache:
+    """Async LRU cache with a memory budget, optional TTL and singleflight coalescing.
+
+    Identical concurrent lookups share one computation. Entries expire after
+    `ttl_seconds` only when a TTL is in effect (`ttl_provider()` returns a number);
+    otherwise they live until evicted or invalidated.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl_provider: Callable[[], Optional[float]],
+                 size_of: Callable[[Any], int]):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._ttl_provider = ttl_provider
+        self._size_of = size_of
+        self._entries: "OrderedDict[str, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, size, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _store(self, key: str, value: Any):
+        size = self._size_of(value)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        ttl = self._ttl_provider()
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (value, size, expires_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        # The computation runs in its own task shared by every caller, so cancelling
+        # whichever caller started it (a client disconnect) doesn't fail the others
+        task = asyncio.ensure_future(self._compute_and_store(key, compute))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generation
+        value = await compute()
+        # Don't cache a result computed across an invalidation; it may be stale
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark retrieved so a failure nobody is left waiting for doesn't log a warning
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate_all(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._generation += 1
+        self.invalidations += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self._ttl_provider(),
+        }
+
+
+class DocumentCache(AsyncResultCache):
+    """Per-document read-through LRU keyed by a business key (e.g. `homestayId`).
+
+    `get_many` serves what it can from memory and loads all misses with a single
+    fetch. Change-stream events drop just the affected document; the `_id` ->
+    key map covers deletes, whose events carry only the `_id`.
+    """
+
+    def __init__(self, name: str, key_field: str, max_bytes: int, ttl_provider: Callable[[], Optional[float]],
+                 size_of: Callable[[Any], int]):
+        super().__init__(name, max_bytes, ttl_provider, size_of)
+        self.key_field = key_field
+        self._keys_by_id: Dict[Any, str] = {}
+
+    def _drop(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._keys_by_id.pop(entry[0].get("_id"), None)
+        super()._drop(key)
+
+    async def get_many(self, keys: Iterable[str],
+                       fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Documents for `keys` (absent ones are left out); misses are loaded by one `fetch(missing)`"""
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            hit, value = self._lookup(key)
+            if hit:
+                self.hits += 1
+                found[key] = value
+            else:
+                self.misses += 1
+                missing.append(key)
+        if missing:
+            generation = self._generation
+            fetched = await fetch(missing)
+            # A change that arrived while fetching may not be reflected in what came back
+            if generation == self._generation:
+                for key, value in fetched.items():
+                    self._store(key, value)
+                    if key in self._entries:
+                        self._keys_by_id[value.get("_id")] = key
+            found.update(fetched)
+        return found
+
+    def invalidate(self, key: Optional[str]):
+        self._generation += 1
+        if key is not None and key in self._entries:
+            self._drop(key)
+            self.invalidations += 1
+
+    def invalidate_all(self):
+        super().invalidate_all()
+        self._keys_by_id.clear()
+
+    def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback"""
+        operation = change.get("operationType")
+        if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.invalidate_all()
+            return
+        _id = (change.get("documentKey") or {}).get("_id")
+        self.invalidate(self._keys_by_id.get(_id))
+        full_document = change.get("fullDocument") or {}
+        self.invalidate(full_document.get(self.key_field))
+
+
+def _search_cache_ttl() -> Optional[float]:
+    """No TTL while change streams invalidate the cache; fixed TTL otherwise"""
+    if change_feed.available:
+        return None
+    return float(os.getenv("HOMESTAY_SEARCH_CACHE_TTL_SECONDS", "60"))
+
+
+def _response_size(response: Any) -> int:
+    try:
+        return len(response.json())
+    except Exception:
+        return 4096
+
+
+def search_cache_enabled() -> bool:
+    return os.getenv("HOMESTAY_SEARCH_CACHE", "true").lower() in ("1", "true", "yes")
+
+
+# Global search result cache
+search_cache = AsyncResultCache(
+    name="search",
+    max_bytes=int(os.getenv("HOMESTAY_SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_provider=_search_cache_ttl,
+    size_of=_response_size,
+)
+
+
+class NegativeResultCache:
+    """Bounded set of search filters known to match no homestay.
+
+    Keys are 16-byte digests of the exact filter (scoped by backend). Each maps to
+    the collection size seen at the time, so a hit answers with no round trip. Any
+    write can make an empty filter match, so every change clears the set; a result
+    computed across a change is not recorded (see `generation`).
+    """
+
+    def __init__(self, max_entries: int, ttl_provider: Callable[[], Optional[float]]):
+        self.max_entries = max_entries
+        self._ttl_provider = ttl_provider
+        self._entries: "OrderedDict[bytes, Tuple[int, Optional[float]]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(scope: str, mongo_filter: Dict[str, Any]) -> bytes:
+        payload = json.dumps([scope, mongo_filter], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+    def lookup(self, scope: str, mongo_filter: Dict[str, Any]) -> Optional[int]:
+        """Total collection count if `mongo_filter` is known to match nothing, else None"""
+        key = self.key(scope, mongo_filter)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def add(self, scope: str, mongo_filter: Dict[str, Any], total_count: int, generation: int):
+        """Record an empty filter, unless the collection changed since `generation` was read"""
+        if generation != self.generation:
+            return
+        key = self.key(scope, mongo_filter)
+        ttl = self._ttl_provider()
+        self._entries[key] = (total_count, time.monotonic() + ttl if ttl else None)
+        self._entries.move_to_end(key)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_all(self):
+        self._entries.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback: any write may give a known-empty filter a match"""
+        self.invalidate_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self._ttl_provider(),
+        }
+
+
+def negative_cache_enabled() -> bool:
+    return os.getenv("HOMESTAY_NEGATIVE_CACHE", "true").lower() in ("1", "true", "yes")
+
+
+def _negative_cache_ttl() -> Optional[float]:
+    if change_feed.available:
+        return None
+    return float(os.getenv("HOMESTAY_NEGATIVE_CACHE_TTL_SECONDS", "60"))
+
+
+# Global cache of filters known to return nothing (skips straight to the relaxed search)
+negative_cache = NegativeResultCache(
+    max_entries=int(os.getenv("HOMESTAY_NEGATIVE_CACHE_MAX_ENTRIES", "10000")),
+    ttl_provider=_negative_cache_ttl,
+)
+
+
+def _document_cache_ttl() -> Optional[float]:
+    if change_feed.available:
+        return None
+    return float(os.getenv("HOMESTAY_DOCUMENT_CACHE_TTL_SECONDS", "60"))
+
+
+def _document_size(document: Dict[str, Any]) -> int:
+    return len(json.dumps(document, ensure_ascii=False, default=str))
+
+
+# Global per-homestay document cache (get_homestays_by_ids)
+homestay_cache = DocumentCache(
+    name="homestay_documents",
+    key_field="homestayId",
+    max_bytes=int(os.getenv("HOMESTAY_DOCUMENT_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_provider=_document_cache_ttl,
+    size_of=_document_size,
+)
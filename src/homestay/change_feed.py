@@ -0,0 +1,136 @@
+import os
+import asyncio
+import inspect
+from typing import Any, Callable, Dict, List, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from .database import db_instance
+from ..logs import get_logger
+
+log = get_logger("homestay.change_feed")
+
+ChangeCallback = Callable[[Dict[str, Any]], Any]
+ResyncCallback = Callable[[], Any]
+
+# Server error codes meaning "change streams are not supported on this deployment"
+_UNSUPPORTED_CODES = {40573, 40324, 136}
+
+
+class HomestayChangeFeed:
+    """Single change stream on `Homestays Collection` fanned out to in-process subscribers.
+
+    Subscribers register an ``on_change(change)`` callback and an optional
+    ``on_resync()`` (sync or async) that reloads their state from scratch. Resync
+    runs whenever the stream is opened without a resume token, and periodically
+    when the deployment has no replica set (change streams unavailable). Call
+    `pin_start()` before subscribers load their state so writes made while they
+    load are delivered once the feed starts, rather than needing a resync.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self.available: Optional[bool] = None  # None until the stream has been tried
+        self.version = 0  # bumped on every observed write (or resync)
+
+    def subscribe(self, on_change: ChangeCallback, on_resync: Optional[ResyncCallback] = None, name: str = ""):
+        """Register a consumer for collection changes"""
+        self._subscribers.append({"name": name or getattr(on_change, "__qualname__", "subscriber"),
+                                  "on_change": on_change, "on_resync": on_resync})
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def pin_start(self):
+        """Record the stream position now, so `start()` resumes from here instead of from when it runs"""
+        collection = db_instance.homestays
+        if collection is None or self.is_running:
+            return
+        try:
+            async with collection.watch(full_document="updateLookup") as stream:
+                # The initial aggregate's post-batch resume token (MongoDB 4.0.7+)
+                self._resume_token = stream.resume_token
+        except PyMongoError:
+            # No change streams (or no token): the first open resyncs instead
+            self._resume_token = None
+
+    async def start(self):
+        """Start watching in the background (idempotent)"""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._run(), name="homestay-change-feed")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+
+    async def _dispatch(self, change: Dict[str, Any]):
+        self.version += 1
+        for subscriber in self._subscribers:
+            try:
+                result = subscriber["on_change"](change)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                log.warning("change_feed.subscriber_failed", subscriber=subscriber["name"], error=str(e))
+
+    async def resync(self):
+        """Ask every subscriber to rebuild its state from the collection"""
+        self.version += 1
+        for subscriber in self._subscribers:
+            if subscriber["on_resync"] is None:
+                continue
+            try:
+                result = subscriber["on_resync"]()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                log.warning("change_feed.resync_failed", subscriber=subscriber["name"], error=str(e))
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            collection = db_instance.homestays
+            if collection is None:
+                await asyncio.sleep(backoff)
+                continue
+            try:
+                async with collection.watch(full_document="updateLookup", resume_after=self._resume_token) as stream:
+                    if self._resume_token is None:
+                        # Nothing to resume from: subscribers may have missed writes since they loaded
+                        await self.resync()
+                    self.available = True
+                    backoff = 1.0
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        await self._dispatch(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _UNSUPPORTED_CODES or "replica set" in str(e).lower():
+                    log.warning("change_feed.unavailable", error=str(e), fallback="periodic resync")
+                    self.available = False
+                    await self._poll_forever()
+                    return
+                log.warning("change_feed.error", error=str(e), retry_seconds=backoff)
+                self._resume_token = None
+            except PyMongoError as e:
+                log.warning("change_feed.interrupted", error=str(e), retry_seconds=backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    async def _poll_forever(self):
+        interval = float(os.getenv("HOMESTAY_CHANGE_POLL_SECONDS", "300"))
+        while True:
+            await asyncio.sleep(interval)
+            await self.resync()
+
+
+# Global change feed instance
+change_feed = HomestayChangeFeed()
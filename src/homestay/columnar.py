@@ -0,0 +1,659 @@
+import os
+import re
+import time
+import asyncio
+import bisect
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from bson.regex import Regex
+from .database import db_instance
+from .change_feed import change_feed
+from ..logs import get_logger
+
+log = get_logger("homestay.columnar")
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install 'homestay-mcp[columnar]'
+    np = None
+
+# Fields a search can filter or sort on, by storage kind
+SCALAR_FIELDS = (
+    "status", "homeStayType", "adminUsername", "isVerified", "isFeatured", "isAdmin",
+    "homestayId", "homeStayName", "villageName", "address.city",
+    "address.province.en", "address.province.ne", "address.district.en", "address.district.ne",
+    "address.municipality.en", "address.municipality.ne", "address.ward.en", "address.ward.ne",
+)
+NUMBER_FIELDS = ("averageRating",)
+DATE_FIELDS = ("createdAt",)
+ARRAY_FIELDS = ("features.localAttractions", "features.infrastructure", "features.tourismServices")
+
+SNAPSHOT_PROJECTION = {field: 1 for field in SCALAR_FIELDS + NUMBER_FIELDS + DATE_FIELDS + ARRAY_FIELDS}
+
+_REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE, "u": 0}
+_MISSING = object()
+# Per-column memo of predicate results over the distinct values (a snapshot never changes)
+_TABLE_CACHE_SIZE = 1024
+
+
+class _Unsupported(Exception):
+    """The filter uses something the snapshot cannot evaluate exactly; the caller falls back to Mongo"""
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            # Mongo would match through the array; such documents make the column inexact
+            raise _Unsupported(path)
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _same(stored: Any, target: Any, fold: bool) -> bool:
+    """Mongo equality between a stored scalar and a query value (strings casefolded under the collation)"""
+    if stored is _MISSING:
+        stored = None
+    if stored is None or target is None:
+        return stored is None and target is None
+    if isinstance(stored, bool) or isinstance(target, bool):
+        return isinstance(stored, bool) and isinstance(target, bool) and stored == target
+    if isinstance(stored, (int, float)) and isinstance(target, (int, float)):
+        return stored == target
+    if isinstance(stored, str) and isinstance(target, str):
+        return stored.casefold() == target.casefold() if fold else stored == target
+    return type(stored) is type(target) and stored == target
+
+
+def _compile_regex(pattern: Any, options: str = "") -> "re.Pattern":
+    if isinstance(pattern, Regex):
+        return pattern.try_compile()
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    if not isinstance(pattern, str):
+        raise _Unsupported("$regex")
+    flags = 0
+    for option in options or "":
+        if option not in _REGEX_FLAGS:
+            raise _Unsupported(f"$options {option}")
+        flags |= _REGEX_FLAGS[option]
+    try:
+        return re.compile(pattern, flags)
+    except re.error as e:
+        raise _Unsupported(f"$regex {pattern}") from e
+
+
+def _is_regex(value: Any) -> bool:
+    return isinstance(value, (Regex, re.Pattern))
+
+
+def _predicate_key(operand: Any, fold: bool) -> Tuple[Any, ...]:
+    if _is_regex(operand):
+        pattern = _compile_regex(operand)
+        return ("regex", pattern.pattern, pattern.flags)
+    return ("eq", type(operand), operand, fold)
+
+
+def _epoch(value: datetime) -> float:
+    # Mongo hands out naive UTC datetimes
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _DictColumn:
+    """Dictionary-encoded scalar: one int32 code per homestay, code 0 = field missing"""
+    kind = "scalar"
+
+    def __init__(self, raw: List[Any]):
+        self.values: List[Any] = [_MISSING]
+        positions: Dict[Tuple[type, Any], int] = {}
+        codes = np.zeros(len(raw), dtype=np.int32)
+        self.exact = True
+        for row, value in enumerate(raw):
+            if value is _MISSING:
+                continue
+            if isinstance(value, (list, dict)):
+                self.exact = False
+                continue
+            key = (type(value), value)
+            code = positions.get(key)
+            if code is None:
+                code = positions[key] = len(self.values)
+                self.values.append(value)
+            codes[row] = code
+        self.codes = codes
+        self._tables: Dict[Tuple[Any, ...], "np.ndarray"] = {}
+
+    def value(self, row: int) -> Any:
+        return self.values[self.codes[row]]
+
+    def _table(self, operand: Any, fold: bool) -> "np.ndarray":
+        """Which distinct values `operand` (a value or a regex) matches"""
+        key = _predicate_key(operand, fold)
+        table = self._tables.get(key)
+        if table is None:
+            if _is_regex(operand):
+                pattern = _compile_regex(operand)
+                predicate = lambda value: isinstance(value, str) and pattern.search(value) is not None  # noqa: E731
+            else:
+                predicate = lambda value: _same(value, operand, fold)  # noqa: E731
+            table = np.fromiter((predicate(value) for value in self.values), dtype=bool, count=len(self.values))
+            if len(self._tables) >= _TABLE_CACHE_SIZE:
+                self._tables.clear()
+            self._tables[key] = table
+        return table
+
+    def match(self, op: str, operand: Any, fold: bool) -> "np.ndarray":
+        if not self.exact:
+            raise _Unsupported("scalar column holds arrays or documents")
+        if op == "$exists":
+            return (self.codes != 0) if operand else (self.codes == 0)
+        if op in ("$eq", "$ne"):
+            if _is_regex(operand) or isinstance(operand, (list, dict)):
+                raise _Unsupported(f"{op} with a regex, array or document")
+            table = self._table(operand, fold)
+            return ~table[self.codes] if op == "$ne" else table[self.codes]
+        if op in ("$in", "$nin"):
+            table = np.zeros(len(self.values), dtype=bool)
+            for member in operand:
+                if isinstance(member, (list, dict)):
+                    raise _Unsupported(f"{op} with an array or document")
+                table |= self._table(member, fold)
+            return ~table[self.codes] if op == "$nin" else table[self.codes]
+        if op == "$regex":
+            return self._table(operand, fold)[self.codes]
+        # Range comparisons on strings follow the collation's ordering, which is not reproduced here
+        raise _Unsupported(op)
+
+
+class _NumericColumn:
+    """Numbers (or dates as epoch seconds) in a float64 array, NaN for null/missing"""
+
+    def __init__(self, raw: List[Any], kind: str):
+        self.kind = kind
+        self.raw = raw
+        accepted = (datetime,) if kind == "date" else (int, float)
+        data = np.full(len(raw), np.nan, dtype=np.float64)
+        present = np.zeros(len(raw), dtype=bool)
+        self.exact = True
+        for row, value in enumerate(raw):
+            if value is _MISSING:
+                continue
+            present[row] = True
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, accepted):
+                self.exact = False  # mixed types sort and compare by BSON type order
+                continue
+            data[row] = _epoch(value) if kind == "date" else value
+        self.data = data
+        self.present = present
+        # Ascending sort key: null/missing sorts before every value
+        self.sort_key = np.where(np.isnan(data), -np.inf, data)
+
+    def value(self, row: int) -> Any:
+        return self.raw[row]
+
+    def _operand(self, operand: Any) -> Optional[float]:
+        if operand is None:
+            return None
+        if self.kind == "date":
+            if isinstance(operand, datetime):
+                return _epoch(operand)
+        elif isinstance(operand, (int, float)) and not isinstance(operand, bool):
+            return float(operand)
+        raise _Unsupported(f"{self.kind} column compared with {type(operand).__name__}")
+
+    def _equals(self, operand: Any) -> "np.ndarray":
+        number = self._operand(operand)
+        return np.isnan(self.data) if number is None else self.data == number
+
+    def match(self, op: str, operand: Any, fold: bool) -> "np.ndarray":
+        if not self.exact:
+            raise _Unsupported(f"{self.kind} column holds other types")
+        if op == "$exists":
+            return self.present if operand else ~self.present
+        if op == "$eq":
+            return self._equals(operand)
+        if op == "$ne":
+            return ~self._equals(operand)
+        if op in ("$in", "$nin"):
+            mask = np.zeros(len(self.data), dtype=bool)
+            for member in operand:
+                mask |= self._equals(member)
+            return ~mask if op == "$nin" else mask
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            number = self._operand(operand)
+            if number is None:
+                raise _Unsupported(f"{op} null")
+            with np.errstate(invalid="ignore"):
+                if op == "$gt":
+                    return self.data > number
+                if op == "$gte":
+                    return self.data >= number
+                if op == "$lt":
+                    return self.data < number
+                return self.data <= number
+        raise _Unsupported(op)
+
+
+class _IdColumn:
+    """`_id` as a rank in ascending order, for the sort tiebreaker and keyset ranges"""
+    kind = "id"
+
+    def __init__(self, ids: List[Any]):
+        self.ids = ids
+        self.exact = len({type(_id) for _id in ids}) <= 1
+        self.sorted_ids: List[Any] = sorted(ids) if self.exact else []
+        rank = {_id: position for position, _id in enumerate(self.sorted_ids)}
+        self.sort_key = np.fromiter((rank.get(_id, 0) for _id in ids), dtype=np.int64, count=len(ids))
+
+    def value(self, row: int) -> Any:
+        return self.ids[row]
+
+    def _comparable(self, operand: Any):
+        if not self.exact or (self.ids and type(operand) is not type(self.ids[0])):
+            raise _Unsupported("_id comparison")
+
+    def _equals(self, operand: Any) -> "np.ndarray":
+        if operand is None and self.exact and self.ids and self.ids[0] is not None:
+            return np.zeros(len(self.ids), dtype=bool)  # keyset ranges ask for `_id: null`
+        self._comparable(operand)
+        position = bisect.bisect_left(self.sorted_ids, operand)
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == operand:
+            return self.sort_key == position
+        return np.zeros(len(self.ids), dtype=bool)
+
+    def match(self, op: str, operand: Any, fold: bool) -> "np.ndarray":
+        if op == "$eq":
+            return self._equals(operand)
+        if op == "$ne":
+            return ~self._equals(operand)
+        if op in ("$in", "$nin"):
+            mask = np.zeros(len(self.ids), dtype=bool)
+            for member in operand:
+                mask |= self._equals(member)
+            return ~mask if op == "$nin" else mask
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            self._comparable(operand)
+            if op == "$gt":
+                return self.sort_key >= bisect.bisect_right(self.sorted_ids, operand)
+            if op == "$gte":
+                return self.sort_key >= bisect.bisect_left(self.sorted_ids, operand)
+            if op == "$lt":
+                return self.sort_key < bisect.bisect_left(self.sorted_ids, operand)
+            return self.sort_key < bisect.bisect_right(self.sorted_ids, operand)
+        if op == "$exists":
+            return np.full(len(self.ids), bool(operand))
+        raise _Unsupported(op)
+
+
+class _BitmaskColumn:
+    """String arrays packed as per-homestay uint64 bitmasks over the distinct element values"""
+    kind = "array"
+
+    def __init__(self, raw: List[Any]):
+        self.values: List[str] = []
+        positions: Dict[str, int] = {}
+        rows: List[int] = []
+        bits: List[int] = []
+        self.exact = True
+        for row, elements in enumerate(raw):
+            if elements is _MISSING or elements is None:
+                continue
+            if isinstance(elements, str):
+                elements = [elements]
+            if not isinstance(elements, list):
+                self.exact = False
+                continue
+            for element in elements:
+                if not isinstance(element, str):
+                    self.exact = False
+                    continue
+                bit = positions.get(element)
+                if bit is None:
+                    bit = positions[element] = len(self.values)
+                    self.values.append(element)
+                rows.append(row)
+                bits.append(bit)
+        self.words = max(1, (len(self.values) + 63) // 64)
+        self.masks = np.zeros((len(raw), self.words), dtype=np.uint64)
+        if rows:
+            bit_array = np.asarray(bits, dtype=np.uint64)
+            np.bitwise_or.at(self.masks, (np.asarray(rows), (bit_array >> np.uint64(6)).astype(np.intp)),
+                             np.left_shift(np.uint64(1), bit_array & np.uint64(63)))
+        self._queries: Dict[Tuple[Any, ...], "np.ndarray"] = {}
+
+    def _any(self, query: "np.ndarray") -> "np.ndarray":
+        return (self.masks & query).any(axis=1)
+
+    def _element_query(self, operand: Any, fold: bool) -> "np.ndarray":
+        """Bits of the distinct elements `operand` (a string or a regex) matches"""
+        if not _is_regex(operand) and not isinstance(operand, str):
+            # null, numbers, arrays: element/whole-array semantics not modelled
+            raise _Unsupported(f"array compared with {type(operand).__name__}")
+        key = _predicate_key(operand, fold)
+        query = self._queries.get(key)
+        if query is None:
+            if _is_regex(operand):
+                pattern = _compile_regex(operand)
+                predicate = lambda value: pattern.search(value) is not None  # noqa: E731
+            else:
+                predicate = lambda value: _same(value, operand, fold)  # noqa: E731
+            query = np.zeros(self.words, dtype=np.uint64)
+            for bit, value in enumerate(self.values):
+                if predicate(value):
+                    query[bit >> 6] |= np.uint64(1) << np.uint64(bit & 63)
+            if len(self._queries) >= _TABLE_CACHE_SIZE:
+                self._queries.clear()
+            self._queries[key] = query
+        return query
+
+    def match(self, op: str, operand: Any, fold: bool) -> "np.ndarray":
+        if not self.exact:
+            raise _Unsupported("array column holds non-strings")
+        if op in ("$eq", "$ne"):
+            if _is_regex(operand):
+                raise _Unsupported(f"{op} with a regex value")
+            mask = self._any(self._element_query(operand, fold))
+            return ~mask if op == "$ne" else mask
+        if op in ("$in", "$nin"):
+            query = np.zeros(self.words, dtype=np.uint64)
+            for member in operand:
+                query |= self._element_query(member, fold)
+            mask = self._any(query)
+            return ~mask if op == "$nin" else mask
+        if op == "$all":
+            mask = np.ones(len(self.masks), dtype=bool)
+            for member in operand:
+                mask &= self._any(self._element_query(member, fold))
+            return mask
+        if op == "$regex":
+            return self._any(self._element_query(operand, fold))
+        raise _Unsupported(op)
+
+
+class ColumnarSnapshot:
+    """Immutable columnar copy of the searchable homestay fields.
+
+    Filters produced by `build_enhanced_mongodb_filter` (plus keyset ranges) are
+    evaluated as NumPy boolean masks: scalars are dictionary-encoded, so a regex
+    or equality is tested once per distinct value and gathered by code; feature
+    arrays are bitmasks, so a feature criterion is one AND over packed words.
+    Anything not reproduced exactly raises `_Unsupported`.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.size = len(documents)
+        self.columns: Dict[str, Any] = {"_id": _IdColumn([doc.get("_id") for doc in documents])}
+        for field in SCALAR_FIELDS:
+            self.columns[field] = self._load(documents, field, _DictColumn)
+        for field in NUMBER_FIELDS:
+            self.columns[field] = self._load(documents, field, lambda raw: _NumericColumn(raw, "number"))
+        for field in DATE_FIELDS:
+            self.columns[field] = self._load(documents, field, lambda raw: _NumericColumn(raw, "date"))
+        for field in ARRAY_FIELDS:
+            self.columns[field] = self._load(documents, field, _BitmaskColumn)
+
+    @staticmethod
+    def _load(documents: List[Dict[str, Any]], field: str, column_type):
+        raw, exact = [], True
+        for doc in documents:
+            try:
+                raw.append(_get_path(doc, field))
+            except _Unsupported:
+                raw.append(_MISSING)
+                exact = False
+        column = column_type(raw)
+        column.exact = column.exact and exact
+        return column
+
+    # ------------------------------------------------------------------ filters
+
+    def evaluate(self, criterion: Dict[str, Any], fold: bool) -> "np.ndarray":
+        """Boolean mask of the homestays matching a Mongo filter document"""
+        if not isinstance(criterion, dict):
+            raise _Unsupported("filter is not a document")
+        mask = np.ones(self.size, dtype=bool)
+        for key, value in criterion.items():
+            if key in ("$and", "$or", "$nor"):
+                if not isinstance(value, list) or not value:
+                    raise _Unsupported(key)
+                parts = [self.evaluate(part, fold) for part in value]
+                if key == "$and":
+                    combined = np.logical_and.reduce(parts)
+                else:
+                    combined = np.logical_or.reduce(parts)
+                    if key == "$nor":
+                        combined = ~combined
+                mask &= combined
+            elif key.startswith("$"):
+                raise _Unsupported(key)  # $text, $expr, $where ...
+            else:
+                mask &= self._evaluate_field(key, value, fold)
+        return mask
+
+    def _evaluate_field(self, field: str, condition: Any, fold: bool) -> "np.ndarray":
+        column = self.columns.get(field)
+        if column is None:
+            raise _Unsupported(field)
+        if not isinstance(condition, dict):
+            if isinstance(condition, list):
+                raise _Unsupported(f"{field}: array equality")
+            if _is_regex(condition):
+                return column.match("$regex", _compile_regex(condition), fold)
+            return column.match("$eq", condition, fold)
+        if not condition or not all(key.startswith("$") for key in condition):
+            raise _Unsupported(f"{field}: embedded document equality")
+
+        mask = np.ones(self.size, dtype=bool)
+        for op, operand in condition.items():
+            if op == "$options":
+                if "$regex" not in condition:
+                    raise _Unsupported("$options without $regex")
+                continue
+            if op == "$regex":
+                operand = _compile_regex(operand, condition.get("$options", ""))
+            elif op in ("$in", "$nin", "$all") and not isinstance(operand, list):
+                raise _Unsupported(op)
+            mask &= column.match(op, operand, fold)
+        return mask
+
+    # ------------------------------------------------------------------ sorting
+
+    def _sort_keys(self, sort_criteria: List[Tuple[str, int]]) -> List["np.ndarray"]:
+        keys = []
+        for field, direction in sort_criteria:
+            column = self.columns.get(field)
+            if column is None or getattr(column, "sort_key", None) is None or not column.exact:
+                raise _Unsupported(f"sort on {field}")
+            keys.append(column.sort_key if direction == 1 else -column.sort_key)
+        return keys
+
+    def top(self, mask: "np.ndarray", sort_criteria: List[Tuple[str, int]], skip: int, limit: int) -> List[int]:
+        """Rows of one sorted page, selecting the first `skip + limit` with argpartition"""
+        keys = self._sort_keys(sort_criteria)
+        rows = np.flatnonzero(mask)
+        wanted = skip + limit
+        if wanted <= 0 or not len(rows):
+            return []
+        if len(rows) > wanted:
+            # Keep everything tied with the k-th primary key; the full sort below breaks the ties
+            primary = keys[0][rows]
+            kth = primary[np.argpartition(primary, wanted - 1)[wanted - 1]]
+            rows = rows[primary <= kth]
+        order = np.lexsort(tuple(key[rows] for key in reversed(keys)))
+        return rows[order][skip:wanted].tolist()
+
+    def documents(self, rows: List[int], sort_criteria: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+        """Rows shaped like the `search_projection` documents Mongo would return"""
+        fields = ["homestayId", "homeStayName"] + [field for field, _ in sort_criteria]
+        page = []
+        for row in rows:
+            doc = {}
+            for field in fields:
+                value = self.columns[field].value(row)
+                if value is not _MISSING:
+                    doc[field] = value
+            page.append(doc)
+        return page
+
+
+class ColumnarSearchIndex:
+    """Process-wide columnar snapshot that answers searches without a database round trip.
+
+    Writes seen on the change feed mark the snapshot stale and schedule a
+    debounced rebuild; until it lands searches fall back to Mongo, so results
+    never lag behind the collection. Without change streams nothing would mark
+    it stale between periodic resyncs, so it is not used at all.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.stale = False
+        self.built_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        self.hits = 0
+        self.fallbacks = 0
+        self._snapshot: Optional[ColumnarSnapshot] = None
+        self._changes = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return self.ready and not self.stale and self._snapshot is not None and bool(change_feed.available)
+
+    # ------------------------------------------------------------------ build / maintain
+
+    async def build(self, collection=None):
+        """Load the searchable projection from Mongo and swap in a fresh snapshot"""
+        if np is None:
+            raise RuntimeError("numpy is not installed (pip install 'homestay-mcp[columnar]')")
+        collection = collection if collection is not None else db_instance.homestays
+        if collection is None:
+            return
+        changes_before = self._changes
+        started = time.perf_counter()
+        documents = await collection.find({}, SNAPSHOT_PROJECTION).to_list(length=None)
+        snapshot = await asyncio.to_thread(ColumnarSnapshot, documents)
+
+        self._snapshot = snapshot
+        self.ready = True
+        # A write that arrived while we were reading may not be in this snapshot
+        self.stale = self._changes != changes_before
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+        log.info("columnar.built", homestays=snapshot.size, ms=round(self.build_seconds * 1000), stale=self.stale)
+
+    def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback"""
+        if not self.ready:
+            return
+        operation = change.get("operationType")
+        if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.ready = False
+            return
+        self._changes += 1
+        self.stale = True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(), name="homestay-columnar-refresh")
+
+    async def _refresh(self):
+        debounce = float(os.getenv("HOMESTAY_COLUMNAR_REFRESH_SECONDS", "1"))
+        while self.stale and self.ready:
+            # Let a burst of writes settle into one rebuild
+            await asyncio.sleep(debounce)
+            try:
+                await self.build()
+            except Exception as e:
+                log.warning("columnar.refresh_failed", error=str(e))
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._refresh_task = None
+
+    # ------------------------------------------------------------------ search
+
+    def search(self, query_filter: Dict[str, Any], relaxed_filter: Optional[Dict[str, Any]],
+               sort_criteria: List[Tuple[str, int]], skip: int, limit: int,
+               collation: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Same result shape as `execute_facet_search`; None when Mongo has to answer instead"""
+        snapshot = self._snapshot
+        if not self.available:
+            return None
+        fold = _case_insensitive(collation)
+        try:
+            mask = snapshot.evaluate(query_filter, fold)
+            filtered_count = int(mask.sum())
+            page = snapshot.documents(snapshot.top(mask, sort_criteria, skip, limit), sort_criteria)
+            relaxed_count, relaxed_page = 0, []
+            if relaxed_filter is not None:
+                relaxed_mask = snapshot.evaluate(relaxed_filter, fold)
+                relaxed_count = int(relaxed_mask.sum())
+                if filtered_count == 0 and relaxed_count > 0:
+                    relaxed_page = snapshot.documents(snapshot.top(relaxed_mask, sort_criteria, skip, limit),
+                                                      sort_criteria)
+        except _Unsupported:
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return {
+            "filtered_count": filtered_count,
+            "page": page,
+            "relaxed_count": relaxed_count,
+            "relaxed_page": relaxed_page,
+            "total_count": snapshot.size,
+        }
+
+    def keyset_search(self, base_filter: Dict[str, Any], page_filter: Dict[str, Any],
+                      sort_criteria: List[Tuple[str, int]], limit: int,
+                      collation: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Same result shape as `execute_keyset_search`; None when Mongo has to answer instead"""
+        snapshot = self._snapshot
+        if not self.available:
+            return None
+        fold = _case_insensitive(collation)
+        try:
+            filtered_count = int(snapshot.evaluate(base_filter, fold).sum())
+            rows = snapshot.top(snapshot.evaluate(page_filter, fold), sort_criteria, 0, limit)
+            page = snapshot.documents(rows, sort_criteria)
+        except _Unsupported:
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return {
+            "filtered_count": filtered_count,
+            "page": page,
+            "relaxed_count": 0,
+            "relaxed_page": [],
+            "total_count": snapshot.size,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "stale": self.stale,
+            "available": self.available,
+            "homestays": self._snapshot.size if self._snapshot is not None else 0,
+            "built_at": self.built_at,
+            "build_seconds": self.build_seconds,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def _case_insensitive(collation: Optional[Dict[str, Any]]) -> bool:
+    # Strength 1-2 ignores case when comparing strings (regexes are unaffected)
+    return bool(collation) and collation.get("strength", 3) <= 2
+
+
+# Global columnar search index
+columnar_index = ColumnarSearchIndex()
@@ -1,61 +1,222 @@
 import os
+import asyncio
+import threading
 from pathlib import Path
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from pymongo import monitoring
+from typing import Optional, Dict, Any
 from dotenv import load_dotenv
+from ..metrics import metrics
+from ..logs import get_logger
 
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+log = get_logger("homestay.database")
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool metrics (open/checked-out connections, checkout wait time)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.pool_clears = 0
+
+    # Pool events
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # Connection events
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        # `duration` is the time spent waiting for the pool (pymongo >= 4.7)
+        wait = getattr(event, "duration", None) or 0.0
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_time_total += wait
+            if wait > self.wait_time_max:
+                self.wait_time_max = wait
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_connections": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+                "wait_time_avg_ms": round(self.wait_time_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+
 class HomestayDatabase:
+    """Process-wide MongoDB connection shared by every MCP session.
+
+    The client is owned by the FastAPI lifespan in ``main.py``; MCP sessions only
+    ever call ``ensure_connected()`` which is a no-op once the pool is up.
+    """
     _instance: Optional['HomestayDatabase'] = None
     _client: Optional[AsyncIOMotorClient] = None
     _db = None
     _connected = False
-    
+    _lock: Optional[asyncio.Lock] = None
+    _pool_listener: Optional[PoolMetricsListener] = None
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._pool_listener = PoolMetricsListener()
         return cls._instance
-    
+
+    @staticmethod
+    def _pool_settings() -> Dict[str, Any]:
+        """Pool sizing and timeouts, configurable through the environment"""
+        return {
+            "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+            "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+            "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+            "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+            "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+            "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        }
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            HomestayDatabase._lock = asyncio.Lock()
+        return self._lock
+
     async def connect(self):
-        """Connect to MongoDB with persistent connection"""
-        if self._client is None or not self._connected:
-            try:
-                # Get MongoDB URI from environment or use default
-                mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/HomestayDB')
-                self._client = AsyncIOMotorClient(mongodb_uri)
-                
-                # Extract database name from URI or use default
-                if '/' in mongodb_uri:
-                    db_name = mongodb_uri.split('/')[-1]
-                else:
-                    db_name = 'HomestayDB'
-                    
-                self._db = self._client[db_name]
-                
-                # Test the connection
-                await self._client.admin.command('ping')
-                self._connected = True
-                
-            except Exception as e:
-                self._connected = False
-                raise Exception(f"Failed to connect to MongoDB: {str(e)}")
-                
-        return self._db
-    
-    async def disconnect(self):
-        """Disconnect from MongoDB"""
+        """Connect to MongoDB once per process, retrying with exponential backoff"""
+        if self.is_connected:
+            return self._db
+
+        async with self._get_lock():
+            # Another coroutine may have connected while we were waiting for the lock
+            if self.is_connected:
+                return self._db
+
+            mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/HomestayDB')
+            max_attempts = int(os.getenv("MONGODB_CONNECT_RETRIES", "5"))
+            backoff = float(os.getenv("MONGODB_CONNECT_BACKOFF_SECONDS", "0.5"))
+            last_error = None
+
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    await self._open(mongodb_uri)
+                    return self._db
+                except Exception as e:
+                    last_error = e
+                    await self._close_client()
+                    if attempt < max_attempts:
+                        delay = min(backoff * (2 ** (attempt - 1)), 30.0)
+                        log.warning("database.connect_failed", attempt=attempt, max_attempts=max_attempts,
+                                    error=str(e), retry_seconds=round(delay, 1))
+                        await asyncio.sleep(delay)
+
+            raise Exception(f"Failed to connect to MongoDB: {str(last_error)}")
+
+    async def _open(self, mongodb_uri: str):
+        settings = self._pool_settings()
+        self._client = AsyncIOMotorClient(
+            mongodb_uri,
+            event_listeners=[self._pool_listener, metrics.command_listener],
+            **settings,
+        )
+
+        # Extract database name from URI or use default
+        db_name = mongodb_uri.split('?')[0].rsplit('/', 1)[-1] if mongodb_uri.count('/') > 2 else ''
+        self._db = self._client[db_name or 'HomestayDB']
+
+        # Test the connection
+        await self._client.admin.command('ping')
+        await self._warm_pool(settings["minPoolSize"])
+        self._connected = True
+
+    async def _warm_pool(self, size: int):
+        """Open `size` connections up front so the first requests don't pay TCP/TLS setup"""
+        if size <= 1:
+            return
+        await asyncio.gather(
+            *(self._client.admin.command('ping') for _ in range(size)),
+            return_exceptions=True,
+        )
+
+    async def ensure_connected(self):
+        """Cheap per-request guard: reconnects (with backoff) only if the shared client is gone"""
+        if self.is_connected:
+            return self._db
+        return await self.connect()
+
+    async def _close_client(self):
         if self._client is not None:
             self._client.close()
-            self._client = None
-            self._db = None
-            self._connected = False
-    
+        self._client = None
+        self._db = None
+        self._connected = False
+
+    async def disconnect(self):
+        """Disconnect from MongoDB"""
+        async with self._get_lock():
+            await self._close_client()
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        """Connection pool metrics for the shared client"""
+        metrics = self._pool_listener.snapshot()
+        metrics["connected"] = self.is_connected
+        metrics["max_pool_size"] = self._pool_settings()["maxPoolSize"]
+        return metrics
+
     @property
     def db(self):
         return self._db
-    
+
     @property
     def homestays(self):
         """Get the homestays collection - VERIFY THIS NAME"""
@@ -63,7 +224,7 @@ class HomestayDatabase:
             # Check if this is the correct collection name in your database
             return self._db['Homestays Collection']  # Verify this matches your actual collection
         return None
-    
+
     @property
     def is_connected(self):
         """Check if database is connected"""
@@ -77,7 +238,7 @@ class HomestayDatabase:
 
             collections = await self._db.list_collection_names()
             print(f"🔍 Available collections: {collections}")
-            
+
             collection_name = 'Homestays Collection'
             if collection_name in collections:
                 sample_doc = await self._db[collection_name].find_one()
@@ -90,9 +251,9 @@ class HomestayDatabase:
                             print(f"  - Sample Local Attractions: {sample_doc['features']['localAttractions'][:2]}...")
             else:
                 print(f"⚠️ Collection '{collection_name}' not found in database '{self._db.name}'")
-            
+
         except Exception as e:
             print(f"🔍 Error verifying collection: {e}")
 
 # Global database instance
-db_instance = HomestayDatabase()
\ No newline at end of file
+db_instance = HomestayDatabase()
@@ -0,0 +1,117 @@
+import os
+import re
+import random
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+from .backends import HomestayBackend, search_backend
+from ..metrics import metrics
+from ..logs import get_logger
+
+log = get_logger("homestay.diagnostics")
+
+
+def diagnostics_sample_rate() -> float:
+    """Fraction of zero-result searches diagnosed (0 = off, the default)"""
+    try:
+        return min(1.0, max(0.0, float(os.getenv("HOMESTAY_DIAGNOSTICS_SAMPLE", "0"))))
+    except ValueError:
+        return 0.0
+
+
+def diagnostic_probes(filter_request, mongo_filter: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Named count queries that show which criterion emptied a search"""
+    probes: Dict[str, Dict[str, Any]] = {}
+
+    # Test without status filter
+    no_status_filter = {k: v for k, v in mongo_filter.items() if k != 'status'}
+    if no_status_filter:
+        probes["without_status"] = no_status_filter
+
+    # Test with broader regex patterns: the first word of each requested attraction on its own
+    for attraction in filter_request.any_local_attractions or []:
+        if isinstance(attraction, str) and attraction.strip():
+            first_word = attraction.strip().split()[0]
+            probes[f"broad:{first_word}"] = {
+                "features.localAttractions": {"$regex": re.escape(first_word), "$options": "i"}
+            }
+    return probes
+
+
+async def count_probes(backend: HomestayBackend, probes: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    """Count every probe; on a $facet backend all of them share one aggregation"""
+    if not probes:
+        return {}
+    # $text cannot run inside $facet; such probes (and other backends) use plain counts
+    separate = {name: probe for name, probe in probes.items() if not backend.supports_facet or "$text" in probe}
+    faceted = [(f"p{i}", name, probe) for i, (name, probe) in enumerate(probes.items()) if name not in separate]
+
+    async def facet_counts() -> Dict[str, int]:
+        if not faceted:
+            return {}
+        pipeline = [
+            {"$match": {"$or": [probe for _, _, probe in faceted]}},
+            {"$facet": {key: [{"$match": probe}, {"$count": "n"}] for key, _, probe in faceted}},
+        ]
+        rows = await backend.collection.aggregate(pipeline, collation=backend.collation).to_list(length=1)
+        result = rows[0] if rows else {}
+        return {name: (result.get(key) or [{"n": 0}])[0]["n"] for key, name, _ in faceted}
+
+    counts, *separate_counts = await asyncio.gather(
+        facet_counts(), *(backend.count(probe) for probe in separate.values()))
+    counts.update(zip(separate, separate_counts))
+    return counts
+
+
+class ZeroResultDiagnostics:
+    """Explains zero-result searches in the logs without slowing them down.
+
+    Opt-in and sampled (HOMESTAY_DIAGNOSTICS_SAMPLE): a sampled search schedules
+    its probes as a background task and returns immediately. At most
+    HOMESTAY_DIAGNOSTICS_MAX_INFLIGHT tasks run at once; further ones are dropped.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self.scheduled = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def maybe_schedule(self, filter_request, mongo_filter: Dict[str, Any],
+                       backend: Optional[HomestayBackend] = None) -> bool:
+        """Diagnose this zero-result search in the background if it is sampled"""
+        rate = diagnostics_sample_rate()
+        if rate <= 0 or random.random() >= rate:
+            return False
+        if len(self._tasks) >= int(os.getenv("HOMESTAY_DIAGNOSTICS_MAX_INFLIGHT", "4")):
+            self.dropped += 1
+            return False
+        backend = backend if backend is not None else search_backend()
+        task = asyncio.create_task(self._run(filter_request, mongo_filter, backend),
+                                   name="homestay-zero-result-diagnostics")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.scheduled += 1
+        return True
+
+    async def _run(self, filter_request, mongo_filter: Dict[str, Any], backend: HomestayBackend):
+        try:
+            with metrics.stage("diagnostics"):
+                counts = await count_probes(backend, diagnostic_probes(filter_request, mongo_filter))
+            log.info("search.diagnostics", counts=counts)
+        except Exception as e:
+            self.failed += 1
+            log.warning("search.diagnostics_failed", error=str(e))
+
+    async def stop(self):
+        tasks: List[asyncio.Task] = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sample_rate": diagnostics_sample_rate(), "inflight": len(self._tasks),
+                "scheduled": self.scheduled, "dropped": self.dropped, "failed": self.failed}
+
+
+# Global diagnostics instance
+zero_result_diagnostics = ZeroResultDiagnostics()
@@ -0,0 +1,386 @@
+"""Canonical integer IDs for homestay features.
+
+The catalog maps every (feature field, label) pair to a small integer. IDs are
+persisted in the `Feature Catalog` collection and only ever appended, so they stay
+stable as the registration form grows. A backfill migration stores each homestay's
+IDs in a multikey `featureIds` array. Once it has completed, and while change
+streams keep `featureIds` in step with writes from other apps, the feature regexes
+built by `build_enhanced_mongodb_filter` are rewritten to indexed `$in` / `$all`
+predicates on those integers.
+
+Usage (backfill, resumable; re-run to continue after an interruption):
+    python -m src.homestay.feature_catalog
+    python -m src.homestay.feature_catalog --batch-size 1000 --restart
+"""
+import argparse
+import asyncio
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from .database import db_instance
+from .change_feed import change_feed
+from .feature_index import FEATURE_FIELDS
+from .models import EnhancedFeatureSearchHelper, LocalAttractionCategories
+from ..logs import configure_logging, get_logger, shutdown_logging
+
+log = get_logger("homestay.feature_catalog")
+
+CATALOG_COLLECTION = "Feature Catalog"
+FEATURE_IDS_FIELD = "featureIds"
+MIGRATION_KEY = "migration:featureIds"
+FEATURE_PROJECTION = {field: 1 for field in FEATURE_FIELDS} | {FEATURE_IDS_FIELD: 1}
+
+_ATTRACTION_GROUPS = ("NATURAL", "CULTURAL", "PRODUCTS", "FOREST", "WILDLIFE", "ADVENTURE")
+
+
+def normalize_label(label: str) -> str:
+    """Catalog key of a feature value: whitespace collapsed, case folded (the search collation ignores case)"""
+    return " ".join(label.split()).casefold()
+
+
+def source_labels() -> List[Tuple[str, str]]:
+    """(field, label) pairs from the registration form lists and the keyword maps, in a fixed order"""
+    helper = EnhancedFeatureSearchHelper
+    sources = [
+        ("features.localAttractions",
+         [label for group in _ATTRACTION_GROUPS for label in getattr(LocalAttractionCategories, group)]
+         + [label for labels in helper.ATTRACTION_KEYWORDS.values() for label in labels]),
+        ("features.infrastructure", [label for labels in helper.INFRASTRUCTURE_KEYWORDS.values() for label in labels]),
+        ("features.tourismServices", [label for labels in helper.TOURISM_KEYWORDS.values() for label in labels]),
+    ]
+    pairs: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for field, labels in sources:
+        for label in labels:
+            pairs.setdefault((field, normalize_label(label)), (field, label))
+    return list(pairs.values())
+
+
+def document_features(doc: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(field, value) pairs of a homestay's feature arrays"""
+    features = doc.get("features") or {}
+    if not isinstance(features, dict):
+        return []
+    pairs = []
+    for field in FEATURE_FIELDS:
+        raw = features.get(field.split(".", 1)[1]) or []
+        if isinstance(raw, str):
+            raw = [raw]
+        pairs.extend((field, value) for value in raw if isinstance(value, str) and value.strip())
+    return pairs
+
+
+class FeatureCatalog:
+    """(field, label) <-> integer ID, backed by `Feature Catalog`.
+
+    Labels found in documents but missing from the source lists get IDs too, so
+    after the backfill every stored feature value has one. That is what makes the
+    filter rewrite exact: a regex on `features.x` matches a homestay exactly when
+    it matches the label of one of the homestay's IDs for that field.
+    """
+
+    def __init__(self, catalog=None, homestays=None):
+        self.ready = False            # catalog loaded and the backfill completed
+        self.loaded_at: Optional[float] = None
+        self._catalog = catalog
+        self._homestays = homestays
+        self._lock = asyncio.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._ids: Dict[Tuple[str, str], int] = {}             # (field, normalized label) -> id
+        self._labels: Dict[int, Tuple[str, str]] = {}          # id -> (field, label)
+        self._pattern_cache: Dict[Tuple[str, str, str], List[int]] = {}
+
+    @property
+    def catalog(self):
+        if self._catalog is not None:
+            return self._catalog
+        return db_instance.db[CATALOG_COLLECTION] if db_instance.db is not None else None
+
+    @property
+    def homestays(self):
+        return self._homestays if self._homestays is not None else db_instance.homestays
+
+    # ------------------------------------------------------------------ catalog
+
+    def _remember(self, entry: Dict[str, Any]):
+        self._ids[(entry["field"], normalize_label(entry["label"]))] = entry["_id"]
+        self._labels[entry["_id"]] = (entry["field"], entry["label"])
+        self._pattern_cache.clear()
+
+    async def _reload(self):
+        self._clear()
+        async for entry in self.catalog.find({"field": {"$exists": True}}):
+            self._remember(entry)
+
+    async def load(self):
+        """Read the catalog (seeding labels from the source lists) and the backfill state.
+
+        Also the change feed's resync callback: homestays written while nothing kept
+        `featureIds` in step (this process down, the stream reopened without resuming)
+        are swept before the rewrite is switched back on.
+        """
+        catalog = self.catalog
+        if catalog is None:
+            return
+        self.ready = False
+        await catalog.create_index([("field", ASCENDING), ("key", ASCENDING)], unique=True, name="field_key")
+        await self._reload()
+        await self.assign(source_labels())
+        state = await catalog.find_one({"_id": MIGRATION_KEY}) or {}
+        if state.get("complete"):
+            _, updated = await self._sweep()
+            if updated:
+                log.info("feature_catalog.swept", updated=updated)
+        self.ready = bool(state.get("complete"))
+        self.loaded_at = time.time()
+        log.info("feature_catalog.loaded", features=len(self._labels),
+                 backfill="complete" if self.ready else "pending (regex feature filters stay in use)")
+
+    async def assign(self, pairs: Iterable[Tuple[str, str]]) -> List[int]:
+        """IDs for (field, label) pairs, appending unknown labels to the catalog"""
+        pairs = list(pairs)
+        if all((field, normalize_label(label)) in self._ids for field, label in pairs):
+            return [self._ids[(field, normalize_label(label))] for field, label in pairs]
+        async with self._lock:
+            while True:
+                missing: Dict[Tuple[str, str], str] = {}
+                for field, label in pairs:
+                    key = (field, normalize_label(label))
+                    if key not in self._ids:
+                        missing.setdefault(key, label)
+                if not missing:
+                    break
+                next_id = max(self._labels, default=0) + 1
+                entries = [{"_id": next_id + offset, "field": field, "key": key, "label": label}
+                           for offset, ((field, key), label) in enumerate(missing.items())]
+                try:
+                    await self.catalog.insert_many(entries, ordered=True)
+                except (DuplicateKeyError, BulkWriteError):
+                    # Another process appended first: pick up its IDs and retry what is still missing
+                    await self._reload()
+                    continue
+                for entry in entries:
+                    self._remember(entry)
+        return [self._ids[(field, normalize_label(label))] for field, label in pairs]
+
+    async def document_ids(self, doc: Dict[str, Any]) -> List[int]:
+        """Sorted, distinct feature IDs of a homestay document"""
+        return sorted(set(await self.assign(document_features(doc))))
+
+    # ------------------------------------------------------------------ backfill
+
+    async def _write_ids(self, docs: List[Dict[str, Any]]) -> int:
+        requests = []
+        for doc in docs:
+            ids = await self.document_ids(doc)
+            if doc.get(FEATURE_IDS_FIELD) != ids:
+                requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": {FEATURE_IDS_FIELD: ids}}))
+        if requests:
+            await self.homestays.bulk_write(requests, ordered=False)
+        return len(requests)
+
+    async def _sweep(self, batch_size: int = 500) -> Tuple[int, int]:
+        """Write `featureIds` on every homestay that has none; returns (scanned, updated)"""
+        scanned = updated = 0
+        while True:
+            docs = await self.homestays.find({FEATURE_IDS_FIELD: {"$exists": False}}, FEATURE_PROJECTION).limit(batch_size).to_list(length=None)
+            if not docs:
+                return scanned, updated
+            updated += await self._write_ids(docs)
+            scanned += len(docs)
+
+    async def backfill(self, batch_size: int = 500, restart: bool = False) -> Dict[str, Any]:
+        """Store `featureIds` on every homestay, in `_id` order, checkpointing after each batch.
+
+        An interrupted run continues from its checkpoint. A final sweep picks up
+        documents the ordered pass cannot see (inserted behind the checkpoint, or
+        with `_id`s of another BSON type).
+        """
+        catalog, homestays = self.catalog, self.homestays
+        if catalog is None or homestays is None:
+            raise Exception("Database not connected. Please ensure the server is properly initialized.")
+        if not self._labels:
+            await self.load()
+
+        state = {} if restart else (await catalog.find_one({"_id": MIGRATION_KEY}) or {})
+        last_id = state.get("lastId")
+        scanned, updated = state.get("scanned", 0), state.get("updated", 0)
+        started = time.perf_counter()
+        await catalog.update_one(
+            {"_id": MIGRATION_KEY},
+            {"$set": {"complete": False, "lastId": last_id, "scanned": scanned, "updated": updated,
+                      "startedAt": state.get("startedAt") or datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        if last_id is not None:
+            log.info("feature_catalog.backfill_resumed", after_id=last_id, scanned=scanned)
+
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            docs = await homestays.find(query, FEATURE_PROJECTION).sort("_id", ASCENDING).limit(batch_size).to_list(length=None)
+            if not docs:
+                break
+            updated += await self._write_ids(docs)
+            scanned += len(docs)
+            last_id = docs[-1]["_id"]
+            await catalog.update_one({"_id": MIGRATION_KEY},
+                                     {"$set": {"lastId": last_id, "scanned": scanned, "updated": updated}})
+            log.info("feature_catalog.backfill_progress", scanned=scanned, updated=updated)
+
+        swept, swept_updated = await self._sweep(batch_size)
+        scanned, updated = scanned + swept, updated + swept_updated
+
+        report = {"scanned": scanned, "updated": updated, "features": len(self._labels),
+                  "seconds": round(time.perf_counter() - started, 2)}
+        await catalog.update_one({"_id": MIGRATION_KEY},
+                                 {"$set": {"complete": True, "scanned": scanned, "updated": updated,
+                                           "completedAt": datetime.now(timezone.utc)}})
+        self.ready = True
+        log.info("feature_catalog.backfill_complete", **report)
+        return report
+
+    async def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback: keep `featureIds` in step with documents written elsewhere"""
+        # Not gated on `ready`: a write during a load's sweep must not slip between the two
+        if not self._labels or change.get("operationType") not in ("insert", "update", "replace"):
+            return
+        doc = change.get("fullDocument")
+        if doc is None:
+            return
+        ids = await self.document_ids(doc)
+        if doc.get(FEATURE_IDS_FIELD) != ids:
+            # Our own write comes back through the stream as a no-op
+            await self.homestays.update_one({"_id": doc["_id"]}, {"$set": {FEATURE_IDS_FIELD: ids}})
+
+    # ------------------------------------------------------------------ query rewrite
+
+    def _matching_ids(self, field: str, pattern: str, options: str) -> Optional[List[int]]:
+        key = (field, pattern, options)
+        cached = self._pattern_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            regex = re.compile(pattern, re.IGNORECASE if "i" in options else 0)
+        except re.error:
+            return None
+        ids = sorted(feature_id for feature_id, (label_field, label) in self._labels.items()
+                     if label_field == field and regex.search(label))
+        self._pattern_cache[key] = ids
+        return ids
+
+    def _exact_ids(self, field: str, value: Any) -> Optional[Set[int]]:
+        if not isinstance(value, str):
+            return None
+        feature_id = self._ids.get((field, normalize_label(value)))
+        return {feature_id} if feature_id is not None else set()
+
+    def _rewrite_field(self, field: str, condition: Any) -> Optional[Dict[str, Any]]:
+        """`featureIds` predicate equivalent to a condition on one feature array; None if not translatable"""
+        if isinstance(condition, str):
+            ids = self._exact_ids(field, condition)
+            return {FEATURE_IDS_FIELD: {"$in": sorted(ids)}}
+        if not isinstance(condition, dict):
+            return None
+        if set(condition) <= {"$regex", "$options"} and isinstance(condition.get("$regex"), str):
+            ids = self._matching_ids(field, condition["$regex"], condition.get("$options", ""))
+            return {FEATURE_IDS_FIELD: {"$in": ids}} if ids is not None else None
+        if set(condition) == {"$in"} and isinstance(condition["$in"], list):
+            ids: Set[int] = set()
+            for value in condition["$in"]:
+                matched = self._exact_ids(field, value)
+                if matched is None:
+                    return None
+                ids |= matched
+            return {FEATURE_IDS_FIELD: {"$in": sorted(ids)}}
+        if set(condition) == {"$all"} and isinstance(condition["$all"], list):
+            clauses = []
+            for value in condition["$all"]:
+                matched = self._exact_ids(field, value)
+                if matched is None:
+                    return None
+                clauses.append({FEATURE_IDS_FIELD: {"$in": sorted(matched)}})
+            return {"$and": clauses} if clauses else None
+        return None
+
+    @staticmethod
+    def _merge_all(clauses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """AND of single-ID `$in`s on featureIds -> one `$all`"""
+        single = [clause for clause in clauses
+                  if set(clause) == {FEATURE_IDS_FIELD} and set(clause[FEATURE_IDS_FIELD]) == {"$in"}
+                  and len(clause[FEATURE_IDS_FIELD]["$in"]) == 1]
+        if len(single) < 2:
+            return clauses
+        rest = [clause for clause in clauses if not any(clause is s for s in single)]
+        ids = sorted({clause[FEATURE_IDS_FIELD]["$in"][0] for clause in single})
+        return [{FEATURE_IDS_FIELD: {"$all": ids}}] + rest
+
+    def _rewrite(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        rewritten: Dict[str, Any] = {}
+        extra: List[Dict[str, Any]] = []
+        for key, value in node.items():
+            if key in ("$and", "$or", "$nor") and isinstance(value, list):
+                children = [self._rewrite(child) if isinstance(child, dict) else child for child in value]
+                if key == "$and":
+                    children = self._merge_all(children)
+                rewritten[key] = children
+            elif key in FEATURE_FIELDS:
+                replacement = self._rewrite_field(key, value)
+                if replacement is None:
+                    rewritten[key] = value
+                elif FEATURE_IDS_FIELD in replacement and FEATURE_IDS_FIELD not in rewritten and not extra:
+                    rewritten.update(replacement)
+                else:
+                    extra.append(replacement)
+            else:
+                rewritten[key] = value
+        if extra:
+            if FEATURE_IDS_FIELD in rewritten:
+                extra.insert(0, {FEATURE_IDS_FIELD: rewritten.pop(FEATURE_IDS_FIELD)})
+            rewritten["$and"] = self._merge_all(rewritten.get("$and", []) + extra)
+        return rewritten
+
+    def rewrite(self, mongo_filter: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace feature regex/equality predicates with integer predicates on `featureIds`.
+
+        Returns the filter unchanged until the backfill has completed, and whenever
+        change streams are unavailable: homestays inserted or edited by other apps would
+        carry missing or stale IDs until the next resync.
+        """
+        if not self.ready or not change_feed.available or not mongo_filter:
+            return mongo_filter
+        return self._rewrite(mongo_filter)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "rewriting": self.ready and bool(change_feed.available),
+            "features": len(self._labels),
+            "loaded_at": self.loaded_at,
+        }
+
+
+# Global feature catalog instance
+feature_catalog = FeatureCatalog()
+
+
+async def _backfill_main(batch_size: int, restart: bool):
+    configure_logging()
+    await db_instance.connect()
+    try:
+        await feature_catalog.load()
+        await feature_catalog.backfill(batch_size=batch_size, restart=restart)
+    finally:
+        await db_instance.disconnect()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill canonical feature IDs (featureIds) on every homestay")
+    parser.add_argument("--batch-size", type=int, default=500, help="Homestays per batch / checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and scan from the start")
+    args = parser.parse_args()
+    asyncio.run(_backfill_main(args.batch_size, args.restart))
@@ -0,0 +1,308 @@
+import os
+import re
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from .database import db_instance
+from .change_feed import change_feed
+from ..logs import get_logger
+
+log = get_logger("homestay.feature_index")
+
+FEATURE_FIELDS = ("features.localAttractions", "features.infrastructure", "features.tourismServices")
+
+
+class FeatureBitsetIndex:
+    """In-process inverted index: canonical feature value -> bitset of homestay ordinals.
+
+    Each homestay gets a small integer ordinal; a posting list is a Python int used
+    as a bitset over those ordinals. The `$regex`/`$or`/`$and` feature criteria built
+    by `build_enhanced_mongodb_filter` are evaluated here with the same matching rules
+    Mongo applies (regex against each array element), so AND/OR/MIXED logic becomes
+    bitwise set algebra and Mongo only receives the matching `_id`s.
+
+    The index is only used while change streams keep it current. A write seen
+    while a build is scanning may be missing from the result, so the index is
+    marked stale and rebuilt; until then searches use the regex filters.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.stale = False
+        self.built_at: Optional[float] = None
+        self._changes = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._clear()
+
+    def _clear(self):
+        self._ordinals: Dict[Any, int] = {}                       # _id -> ordinal
+        self._ids: List[Any] = []                                 # ordinal -> _id (None when free)
+        self._free: List[int] = []
+        self._doc_values: Dict[int, List[Tuple[str, str]]] = {}   # ordinal -> [(field, value)]
+        self._postings: Dict[str, Dict[str, int]] = {field: {} for field in FEATURE_FIELDS}
+        self._pattern_cache: Dict[Tuple[str, str, str], int] = {}
+
+    # ------------------------------------------------------------------ build / maintain
+
+    async def build(self, collection=None):
+        """Load every homestay's features from Mongo and swap in a fresh index"""
+        collection = collection if collection is not None else db_instance.homestays
+        if collection is None:
+            return
+        changes_before = self._changes
+        fresh = FeatureBitsetIndex()
+        cursor = collection.find({}, {"features.localAttractions": 1, "features.infrastructure": 1,
+                                      "features.tourismServices": 1})
+        async for doc in cursor:
+            fresh.upsert(doc)
+
+        self._ordinals, self._ids, self._free = fresh._ordinals, fresh._ids, fresh._free
+        self._doc_values, self._postings = fresh._doc_values, fresh._postings
+        self._pattern_cache = {}
+        self.ready = True
+        # A write that arrived while we were reading may not be in the fresh index
+        self.stale = self._changes != changes_before
+        if self.stale:
+            self._schedule_refresh()
+        self.built_at = time.time()
+        log.info("feature_index.built", homestays=len(self._ordinals), stale=self.stale,
+                 values=sum(len(p) for p in self._postings.values()))
+
+    @staticmethod
+    def _extract_values(doc: Dict[str, Any]) -> List[Tuple[str, str]]:
+        features = doc.get("features") or {}
+        values = []
+        for field in FEATURE_FIELDS:
+            raw = features.get(field.split(".", 1)[1]) or []
+            if isinstance(raw, str):
+                raw = [raw]
+            for value in raw:
+                if isinstance(value, str):
+                    values.append((field, value))
+        return values
+
+    def upsert(self, doc: Dict[str, Any]):
+        """Index (or re-index) one homestay document"""
+        _id = doc.get("_id")
+        if _id is None:
+            return
+        ordinal = self._ordinals.get(_id)
+        if ordinal is None:
+            ordinal = self._free.pop() if self._free else len(self._ids)
+            if ordinal == len(self._ids):
+                self._ids.append(_id)
+            else:
+                self._ids[ordinal] = _id
+            self._ordinals[_id] = ordinal
+        else:
+            self._unlink(ordinal)
+
+        bit = 1 << ordinal
+        values = self._extract_values(doc)
+        for field, value in values:
+            postings = self._postings[field]
+            postings[value] = postings.get(value, 0) | bit
+        self._doc_values[ordinal] = values
+        self._pattern_cache.clear()
+
+    def remove(self, _id: Any):
+        ordinal = self._ordinals.pop(_id, None)
+        if ordinal is None:
+            return
+        self._unlink(ordinal)
+        self._doc_values.pop(ordinal, None)
+        self._ids[ordinal] = None
+        self._free.append(ordinal)
+        self._pattern_cache.clear()
+
+    def _unlink(self, ordinal: int):
+        mask = ~(1 << ordinal)
+        for field, value in self._doc_values.get(ordinal, []):
+            postings = self._postings[field]
+            remaining = postings.get(value, 0) & mask
+            if remaining:
+                postings[value] = remaining
+            else:
+                postings.pop(value, None)
+
+    def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback"""
+        self._changes += 1
+        if not self.ready:
+            return
+        operation = change.get("operationType")
+        key = (change.get("documentKey") or {}).get("_id")
+        if operation in ("insert", "update", "replace"):
+            full_document = change.get("fullDocument")
+            if full_document is not None:
+                self.upsert(full_document)
+            else:
+                # Document was deleted before the update could be looked up
+                self.remove(key)
+        elif operation == "delete":
+            self.remove(key)
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.ready = False
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(), name="homestay-feature-index-refresh")
+
+    async def _refresh(self):
+        debounce = float(os.getenv("HOMESTAY_FEATURE_INDEX_REFRESH_SECONDS", "1"))
+        while self.stale and self.ready:
+            # Let a burst of writes settle into one rebuild
+            await asyncio.sleep(debounce)
+            try:
+                await self.build()
+            except Exception as e:
+                log.warning("feature_index.refresh_failed", error=str(e))
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    @property
+    def available(self) -> bool:
+        """Built, not missing a write, and kept current by change streams (not a periodic resync)"""
+        return self.ready and not self.stale and bool(change_feed.available)
+
+    # ------------------------------------------------------------------ evaluation
+
+    def _match_pattern(self, field: str, pattern: str, options: str) -> int:
+        key = (field, pattern, options)
+        cached = self._pattern_cache.get(key)
+        if cached is not None:
+            return cached
+        flags = re.IGNORECASE if "i" in options else 0
+        regex = re.compile(pattern, flags)
+        bits = 0
+        for value, postings in self._postings[field].items():
+            if regex.search(value):
+                bits |= postings
+        self._pattern_cache[key] = bits
+        return bits
+
+    def _evaluate_field(self, field: str, condition: Any) -> Optional[int]:
+        postings = self._postings[field]
+        if isinstance(condition, str):
+            return postings.get(condition, 0)
+        if not isinstance(condition, dict):
+            return None
+        if set(condition) - {"$regex", "$options", "$in", "$all"}:
+            return None
+        result = self._live_bits()
+        if "$regex" in condition:
+            try:
+                result &= self._match_pattern(field, condition["$regex"], condition.get("$options", ""))
+            except re.error:
+                return None
+        if "$in" in condition:
+            bits = 0
+            for value in condition["$in"]:
+                if not isinstance(value, str):
+                    return None
+                bits |= postings.get(value, 0)
+            result &= bits
+        if "$all" in condition:
+            for value in condition["$all"]:
+                if not isinstance(value, str):
+                    return None
+                result &= postings.get(value, 0)
+        return result
+
+    def _live_bits(self) -> int:
+        return (1 << len(self._ids)) - 1
+
+    def evaluate(self, criterion: Any) -> Optional[int]:
+        """Evaluate a feature-only criterion to a bitset; None if it touches other fields"""
+        if not isinstance(criterion, dict) or not criterion:
+            return None
+        result = self._live_bits()
+        for key, value in criterion.items():
+            if key in ("$and", "$or"):
+                if not isinstance(value, list) or not value:
+                    return None
+                parts = [self.evaluate(part) for part in value]
+                if any(part is None for part in parts):
+                    return None
+                combined = parts[0]
+                for part in parts[1:]:
+                    combined = (combined & part) if key == "$and" else (combined | part)
+                result &= combined
+            elif key in FEATURE_FIELDS:
+                bits = self._evaluate_field(key, value)
+                if bits is None:
+                    return None
+                result &= bits
+            else:
+                return None
+        return result
+
+    def ids_for(self, bits: int) -> List[Any]:
+        """Translate a bitset back to homestay `_id`s"""
+        ids = []
+        # Scan the binary representation (least significant bit first)
+        digits = bin(bits)[:1:-1]
+        ordinal = digits.find("1")
+        while ordinal != -1:
+            _id = self._ids[ordinal]
+            if _id is not None:
+                ids.append(_id)
+            ordinal = digits.find("1", ordinal + 1)
+        return ids
+
+    def rewrite(self, mongo_filter: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the feature-only parts of a filter with a single `_id: {$in: [...]}`.
+
+        Returns the filter unchanged if the index is not `available` or nothing is feature-only.
+        """
+        if not self.available or not mongo_filter:
+            return mongo_filter
+
+        feature_parts = []
+        rewritten: Dict[str, Any] = {}
+        for key, value in mongo_filter.items():
+            if key in FEATURE_FIELDS:
+                feature_parts.append({key: value})
+            elif key == "$and" and isinstance(value, list):
+                remaining = []
+                for part in value:
+                    if self.evaluate(part) is not None:
+                        feature_parts.append(part)
+                    else:
+                        remaining.append(part)
+                if remaining:
+                    rewritten["$and"] = remaining
+            else:
+                rewritten[key] = value
+
+        if not feature_parts:
+            return mongo_filter
+        bits = self.evaluate({"$and": feature_parts})
+        if bits is None:
+            return mongo_filter
+        id_condition = {"_id": {"$in": self.ids_for(bits)}}
+        if "_id" in rewritten:
+            rewritten.setdefault("$and", []).append(id_condition)
+        else:
+            rewritten.update(id_condition)
+        return rewritten
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "stale": self.stale,
+            "available": self.available,
+            "homestays": len(self._ordinals),
+            "distinct_values": {field: len(postings) for field, postings in self._postings.items()},
+            "built_at": self.built_at,
+        }
+
+
+# Global feature index instance
+feature_index = FeatureBitsetIndex()
@@ -0,0 +1,272 @@
+import re
+import json
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+from bson.regex import Regex
+
+# Operators that can share one field document with other operators of this set
+_MERGEABLE_OPS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists"}
+
+# Patterns whose meaning depends on group numbering can't be joined into an alternation
+_UNSAFE_ALTERNATION = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?[a-zA-Z]+\)")
+
+
+@dataclass
+class Predicate:
+    """A single operator applied to one field: `{field: {op: value}}`"""
+    field: str
+    op: str
+    value: Any
+    options: str = ""  # `$options` for `$regex`
+
+    def key(self) -> str:
+        return _canonical(["P", self.field, self.op, self.value, self.options])
+
+    def to_ops(self) -> Dict[str, Any]:
+        if self.op == "$regex":
+            return {"$regex": self.value, "$options": self.options} if self.options else {"$regex": self.value}
+        return {self.op: self.value}
+
+
+@dataclass
+class Raw:
+    """A top-level operator the optimizer treats as opaque (`$text`, `$expr`, `$nor`, ...)"""
+    op: str
+    value: Any
+
+    def key(self) -> str:
+        return _canonical(["R", self.op, self.value])
+
+
+@dataclass
+class And:
+    children: List["Node"] = field(default_factory=list)
+
+    def key(self) -> str:
+        return "A(" + ",".join(child.key() for child in self.children) + ")"
+
+
+@dataclass
+class Or:
+    children: List["Node"] = field(default_factory=list)
+
+    def key(self) -> str:
+        return "O(" + ",".join(child.key() for child in self.children) + ")"
+
+
+Node = Union[Predicate, Raw, And, Or]
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+def regex(field_name: str, pattern: str, options: str = "i") -> Predicate:
+    return Predicate(field_name, "$regex", pattern, options)
+
+
+def fields_of(node: Node) -> List[str]:
+    """Distinct fields referenced by a node, in first-seen order"""
+    if isinstance(node, Predicate):
+        return [node.field]
+    if isinstance(node, Raw):
+        return []
+    seen: Dict[str, None] = {}
+    for child in node.children:
+        for name in fields_of(child):
+            seen.setdefault(name, None)
+    return list(seen)
+
+
+def predicates_of(node: Node) -> List[Predicate]:
+    """All field predicates in a node"""
+    if isinstance(node, Predicate):
+        return [node]
+    if isinstance(node, Raw):
+        return []
+    return [predicate for child in node.children for predicate in predicates_of(child)]
+
+
+def count_regex_clauses(mongo_filter: Dict[str, Any]) -> int:
+    """Number of regex predicates in a query document"""
+    return sum(1 for predicate in predicates_of(parse_filter(mongo_filter))
+               if predicate.op == "$regex" or isinstance(predicate.value, (re.Pattern, Regex)))
+
+
+# ---------------------------------------------------------------------------
+# Mongo dict -> AST
+# ---------------------------------------------------------------------------
+
+def parse_filter(mongo_filter: Dict[str, Any]) -> Node:
+    """Parse a MongoDB query document into the filter AST"""
+    children: List[Node] = []
+    for key, value in mongo_filter.items():
+        if key == "$and":
+            children.append(And([parse_filter(part) for part in value]))
+        elif key == "$or":
+            children.append(Or([parse_filter(part) for part in value]))
+        elif key.startswith("$"):
+            children.append(Raw(key, value))
+        else:
+            children.extend(_parse_field(key, value))
+    return children[0] if len(children) == 1 else And(children)
+
+
+def _parse_field(field_name: str, value: Any) -> List[Predicate]:
+    if not (isinstance(value, dict) and value and all(k.startswith("$") for k in value)):
+        return [Predicate(field_name, "$eq", value)]
+    ops = dict(value)
+    predicates = []
+    if "$regex" in ops:
+        predicates.append(Predicate(field_name, "$regex", ops.pop("$regex"), ops.pop("$options", "")))
+    predicates.extend(Predicate(field_name, op, operand) for op, operand in ops.items())
+    return predicates
+
+
+# ---------------------------------------------------------------------------
+# Optimizer
+# ---------------------------------------------------------------------------
+
+def optimize_filter(node: Node) -> Node:
+    """Flatten nested $and/$or, drop duplicate predicates, and inside a disjunction
+    merge regexes on the same field into one alternation and fold equalities into `$in`"""
+    if isinstance(node, (Predicate, Raw)):
+        return node
+
+    flat: List[Node] = []
+    for child in (optimize_filter(child) for child in node.children):
+        if type(child) is type(node):
+            flat.extend(child.children)
+        else:
+            flat.append(child)
+
+    if isinstance(node, Or) and any(isinstance(child, And) and not child.children for child in flat):
+        return And([])  # one branch matches everything
+
+    seen = set()
+    unique: List[Node] = []
+    for child in flat:
+        if isinstance(child, And) and not child.children:
+            continue  # `{}` inside a conjunction constrains nothing
+        child_key = child.key()
+        if child_key not in seen:
+            seen.add(child_key)
+            unique.append(child)
+
+    if isinstance(node, Or):
+        unique = _merge_disjunction(unique)
+    if len(unique) == 1:
+        return unique[0]
+    return type(node)(unique)
+
+
+def _merge_disjunction(children: List[Node]) -> List[Node]:
+    groups: Dict[Tuple[str, ...], List[Predicate]] = {}
+    slots: List[Union[Node, Tuple[str, ...]]] = []
+    for child in children:
+        group = _disjunction_group(child)
+        if group is None:
+            slots.append(child)
+            continue
+        if group not in groups:
+            groups[group] = []
+            slots.append(group)
+        groups[group].append(child)
+
+    merged: List[Node] = []
+    for slot in slots:
+        if not isinstance(slot, tuple):
+            merged.append(slot)
+            continue
+        members = groups[slot]
+        if len(members) == 1:
+            merged.append(members[0])
+        elif slot[0] == "regex":
+            pattern = "|".join(f"(?:{member.value})" for member in members)
+            merged.append(Predicate(slot[1], "$regex", pattern, slot[2]))
+        else:
+            values: Dict[str, Any] = {}
+            for member in members:
+                for value in (member.value if member.op == "$in" else [member.value]):
+                    values.setdefault(_canonical(value), value)
+            merged.append(Predicate(slot[1], "$in", list(values.values())))
+    return merged
+
+
+@lru_cache(maxsize=4096)
+def _alternation_safe(pattern: str) -> bool:
+    # An invalid pattern (e.g. an unbalanced "(") must keep failing on its own rather
+    # than pair up with a neighbour inside the alternation
+    if _UNSAFE_ALTERNATION.search(pattern):
+        return False
+    try:
+        re.compile(pattern)
+    except re.error:
+        return False
+    return True
+
+
+def _disjunction_group(node: Node) -> Optional[Tuple[str, ...]]:
+    if not isinstance(node, Predicate):
+        return None
+    if node.op == "$regex" and isinstance(node.value, str) and _alternation_safe(node.value):
+        return ("regex", node.field, node.options)
+    if node.op == "$eq" or (node.op == "$in" and isinstance(node.value, list)):
+        return ("in", node.field)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# AST -> Mongo dict
+# ---------------------------------------------------------------------------
+
+def compile_filter(node: Node) -> Dict[str, Any]:
+    """Compile the AST back into a MongoDB query document"""
+    if isinstance(node, Predicate):
+        return {node.field: _render(node.to_ops())}
+    if isinstance(node, Raw):
+        return {node.op: node.value}
+    if isinstance(node, Or):
+        if not node.children:
+            raise ValueError("Cannot compile an empty $or")
+        return {"$or": [compile_filter(child) for child in node.children]}
+
+    result: Dict[str, Any] = {}
+    field_ops: Dict[str, Dict[str, Any]] = {}
+    extras: List[Dict[str, Any]] = []
+    for child in node.children:
+        if isinstance(child, Predicate):
+            ops = child.to_ops()
+            existing = field_ops.get(child.field)
+            if existing is None:
+                field_ops[child.field] = ops
+                result[child.field] = None  # keep first-seen key order
+            elif set(existing) <= _MERGEABLE_OPS and set(ops) <= _MERGEABLE_OPS and not set(existing) & set(ops):
+                existing.update(ops)
+            else:
+                extras.append({child.field: _render(ops)})
+        elif isinstance(child, Raw) and child.op not in result:
+            result[child.op] = child.value
+        else:
+            extras.append(compile_filter(child))
+
+    for field_name, ops in field_ops.items():
+        result[field_name] = _render(ops)
+    if extras:
+        if not result and len(extras) == 1:
+            return extras[0]
+        result["$and"] = extras
+    return result
+
+
+def _render(ops: Dict[str, Any]) -> Any:
+    # A lone equality is written the way the builders always wrote it
+    if list(ops) == ["$eq"] and not isinstance(ops["$eq"], dict):
+        return ops["$eq"]
+    return ops
+
+
+def optimize_mongo_filter(mongo_filter: Dict[str, Any]) -> Dict[str, Any]:
+    """parse -> optimize -> compile for an existing query document"""
+    return compile_filter(optimize_filter(parse_filter(mongo_filter)))
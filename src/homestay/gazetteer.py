@@ -0,0 +1,204 @@
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .database import db_instance
+from .spelling import edit_distance, spelling_index
+from ..logs import get_logger
+
+log = get_logger("homestay.gazetteer")
+
+LOCATION_LEVELS = ("province", "district", "municipality", "ward")
+_SIDES = ("en", "ne")
+
+# Administrative suffixes that users add or omit freely (longest first)
+_SUFFIXES = sorted([
+    "sub-metropolitan city", "sub metropolitan city", "metropolitan city", "rural municipality",
+    "municipality", "district", "province", "pradesh", "ward no.", "ward no", "ward", "city",
+    "उपमहानगरपालिका", "महानगरपालिका", "गाउँपालिका", "नगरपालिका", "जिल्ला", "प्रदेश", "वडा नं.", "वडा",
+], key=len, reverse=True)
+
+_DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+
+# Romanization folding: collapse spellings Nepali place names are commonly written with
+_FOLDS = [
+    (re.compile(r"([kgcjtdpb])h"), r"\1"),   # aspirates: kh/gh/chh/th/dh/ph/bh -> k/g/c/t/d/p/b
+    (re.compile(r"w"), "v"),
+    (re.compile(r"ph|f"), "p"),
+    (re.compile(r"sh|ss"), "s"),
+    (re.compile(r"ee|ii"), "i"),
+    (re.compile(r"oo|uu"), "u"),
+    (re.compile(r"aa+"), "a"),
+    (re.compile(r"(.)\1+"), r"\1"),          # doubled letters
+]
+
+
+def normalize_location(text: str) -> str:
+    """Lowercase, NFC, strip administrative suffixes and punctuation"""
+    value = unicodedata.normalize("NFC", str(text)).lower().translate(_DEVANAGARI_DIGITS).strip()
+    changed = True
+    while changed:
+        changed = False
+        for suffix in _SUFFIXES:
+            if value.endswith(suffix) and len(value) > len(suffix):
+                value = value[: -len(suffix)].strip(" ,.-")
+                changed = True
+                break
+    value = re.sub(r"[^\w\s]", " ", value)
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def fold_location(text: str) -> str:
+    """Transliteration-aware key: normalized, spaces removed, romanization variants folded"""
+    value = normalize_location(text).replace(" ", "")
+    if value.isascii():
+        for pattern, replacement in _FOLDS:
+            value = pattern.sub(replacement, value)
+    return value
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationGazetteer:
+    """In-memory index of the distinct `address.<level>.{en,ne}` names in the collection.
+
+    `resolve()` maps free-form user input ("Malangawa", "malangwa municipality",
+    "मलंगवा") to the canonical stored names, per language, so the query can use an
+    exact `$in` instead of dozens of unanchored regexes.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.loaded_at: Optional[float] = None
+        self._entries: Dict[str, List[Tuple[str, str]]] = {level: [] for level in LOCATION_LEVELS}
+        # Postings hold (entry position, side) where side indexes _SIDES
+        self._keys: Dict[str, Dict[str, Set[Tuple[int, int]]]] = {level: defaultdict(set) for level in LOCATION_LEVELS}
+        self._trigram_index: Dict[str, Dict[str, Set[Tuple[int, int]]]] = {
+            level: defaultdict(set) for level in LOCATION_LEVELS}
+        self._positions: Dict[str, Dict[Tuple[str, str], int]] = {level: {} for level in LOCATION_LEVELS}
+        self._memo: Dict[Tuple[str, str], Optional[Dict[str, List[str]]]] = {}
+
+    async def load(self, collection=None):
+        """Load distinct location names for every level in one aggregation"""
+        collection = collection if collection is not None else db_instance.homestays
+        if collection is None:
+            return
+        pipeline = [{"$facet": {
+            level: [{"$group": {"_id": {"en": f"$address.{level}.en", "ne": f"$address.{level}.ne"}}}]
+            for level in LOCATION_LEVELS
+        }}]
+        result = await collection.aggregate(pipeline).to_list(length=1)
+        fresh = LocationGazetteer()
+        for level, rows in (result[0] if result else {}).items():
+            for row in rows:
+                names = row.get("_id") or {}
+                fresh.add(level, names.get("en"), names.get("ne"))
+
+        self._entries, self._keys = fresh._entries, fresh._keys
+        self._trigram_index, self._positions = fresh._trigram_index, fresh._positions
+        self._memo = {}
+        self.ready = True
+        self.loaded_at = time.time()
+        log.info("gazetteer.loaded", **{f"{level}s": len(entries) for level, entries in self._entries.items()})
+
+    def add(self, level: str, en: Any, ne: Any):
+        """Register one (en, ne) location name pair"""
+        en = en.strip() if isinstance(en, str) else ""
+        ne = ne.strip() if isinstance(ne, str) else ""
+        if level not in self._entries or not (en or ne) or (en, ne) in self._positions[level]:
+            return
+        position = len(self._entries[level])
+        self._entries[level].append((en, ne))
+        self._positions[level][(en, ne)] = position
+        # Known place names are vocabulary for the NL typo corrector, never something to correct
+        spelling_index.add_text(en)
+        for side, name in enumerate((en, ne)):
+            key = fold_location(name) if name else ""
+            if not key:
+                continue
+            self._keys[level][key].add((position, side))
+            for gram in _trigrams(key):
+                self._trigram_index[level][gram].add((position, side))
+        self._memo.clear()
+
+    def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback: pick up names from inserted/updated homestays"""
+        document = change.get("fullDocument")
+        if not self.ready or not document:
+            return
+        address = document.get("address") or {}
+        for level in LOCATION_LEVELS:
+            names = address.get(level)
+            if isinstance(names, dict):
+                self.add(level, names.get("en"), names.get("ne"))
+
+    def resolve(self, level: str, term: str) -> Optional[Dict[str, List[str]]]:
+        """Stored names matching `term` as {"en": [...], "ne": [...]}, or None if nothing resolves"""
+        if not self.ready or level not in self._entries or not term or not term.strip():
+            return None
+        memo_key = (level, term.strip().lower())
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+        resolved = self._resolve(level, term)
+        if len(self._memo) > 4096:
+            self._memo.clear()
+        self._memo[memo_key] = resolved
+        return resolved
+
+    def _names(self, level: str, postings) -> Dict[str, List[str]]:
+        entries = self._entries[level]
+        return {side: sorted({entries[position][index] for position, index in postings if index == i})
+                for i, side in enumerate(_SIDES)}
+
+    def _resolve(self, level: str, term: str) -> Optional[Dict[str, List[str]]]:
+        key = fold_location(term)
+        if not key:
+            return None
+        entries = self._entries[level]
+        keys = self._keys[level]
+
+        # 1. Exact match on the folded key
+        if key in keys:
+            return self._names(level, keys[key])
+
+        # Wards are numbers: only exact matches make sense
+        if level == "ward":
+            return None
+
+        # 2. Containment ("janakpur" -> "Janakpurdham Sub-Metropolitan City")
+        if len(key) >= 3:
+            contained = {posting for name_key, postings in keys.items() if key in name_key for posting in postings}
+            if contained:
+                return self._names(level, contained)
+
+        # 3. Trigram candidates, verified by edit distance on the folded key
+        grams = _trigrams(key)
+        overlap: Dict[Tuple[int, int], int] = defaultdict(int)
+        for gram in grams:
+            for posting in self._trigram_index[level].get(gram, ()):
+                overlap[posting] += 1
+        max_distance = 1 if len(key) <= 5 else 2
+        best: Dict[Tuple[int, int], int] = {}
+        for posting, shared in overlap.items():
+            if shared * 3 < len(grams):
+                continue
+            position, side = posting
+            distance = edit_distance(key, fold_location(entries[position][side]), max_distance)
+            if distance <= max_distance:
+                best[posting] = distance
+        if not best:
+            return None
+        closest = min(best.values())
+        return self._names(level, [posting for posting, distance in best.items() if distance == closest])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "loaded_at": self.loaded_at,
+                **{level: len(entries) for level, entries in self._entries.items()}}
+
+
+# Global gazetteer instance
+gazetteer = LocationGazetteer()
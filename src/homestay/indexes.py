@@ -0,0 +1,198 @@
+import os
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from .database import db_instance
+from ..logs import get_logger
+
+log = get_logger("homestay.indexes")
+
+# Case-insensitive (strength 2) comparison for every managed index. Searches run
+# with the same collation: an index is only usable for string predicates when the
+# query's collation matches the index's.
+SEARCH_COLLATION = {"locale": "en", "strength": 2}
+
+FEATURE_ARRAY_FIELDS = ("features.localAttractions", "features.infrastructure", "features.tourismServices")
+ADDRESS_FIELDS = tuple(f"address.{level}.{lang}"
+                       for level in ("province", "district", "municipality", "ward") for lang in ("en", "ne"))
+
+
+@dataclass
+class IndexSpec:
+    """One managed index on `Homestays Collection`"""
+    name: str
+    keys: List[Tuple[str, int]]
+    partial_filter: Optional[Dict[str, Any]] = None
+    # Empty for an index serving exact lookups that run without the search collation
+    collation: Dict[str, Any] = field(default_factory=lambda: dict(SEARCH_COLLATION))
+
+    @property
+    def names(self) -> Tuple[str, str]:
+        """Names the index may live under: a rebuild creates the replacement under the other one"""
+        return self.name, f"{self.name}_next"
+
+    def model(self, name: Optional[str] = None) -> IndexModel:
+        options: Dict[str, Any] = {"name": name or self.name}
+        if self.collation:
+            options["collation"] = self.collation
+        if self.partial_filter:
+            options["partialFilterExpression"] = self.partial_filter
+        return IndexModel(self.keys, **options)
+
+    def matches(self, info: Dict[str, Any]) -> bool:
+        """True if an existing index (from `list_indexes`) already has this definition"""
+        if [(k, int(d)) for k, d in info.get("key", {}).items()] != self.keys:
+            return False
+        if (info.get("partialFilterExpression") or None) != self.partial_filter:
+            return False
+        existing_collation = info.get("collation") or {}
+        if not self.collation:
+            return not existing_collation
+        return all(existing_collation.get(k) == v for k, v in self.collation.items())
+
+
+INDEX_SPECS: List[IndexSpec] = [
+    # Every search filters on status; type/admin narrow it further
+    IndexSpec("mcp_status_type_admin", [("status", ASCENDING), ("homeStayType", ASCENDING), ("adminUsername", ASCENDING)]),
+    # Default sort for any status; the trailing _id makes the order total for keyset cursors
+    IndexSpec("mcp_status_rating_created",
+              [("status", ASCENDING), ("averageRating", DESCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)]),
+    # Default sort for the common case, restricted to approved homestays
+    IndexSpec("mcp_approved_rating_created", [("averageRating", DESCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+              partial_filter={"status": "approved"}),
+    # Multikey indexes on the feature arrays
+    *[IndexSpec(f"mcp_{path.replace('.', '_')}", [(path, ASCENDING)]) for path in FEATURE_ARRAY_FIELDS],
+    # Canonical feature IDs (see feature_catalog.py); `$in` / `$all` on integers
+    IndexSpec("mcp_featureIds", [("featureIds", ASCENDING)]),
+    # get_homestays_by_ids: exact `homestayId $in` lookups, which run without a collation
+    IndexSpec("mcp_homestayId", [("homestayId", ASCENDING)], collation={}),
+    # Bilingual address names (gazetteer-resolved locations become exact $in matches)
+    *[IndexSpec(f"mcp_{path.replace('.', '_')}", [(path, ASCENDING)]) for path in ADDRESS_FIELDS],
+]
+
+DEFAULT_SORT = [("averageRating", DESCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)]
+
+# Query shapes the search path issues; each should be answered from an index
+REPRESENTATIVE_QUERIES: List[Dict[str, Any]] = [
+    {"name": "default approved listing", "filter": {"status": "approved"},
+     "sort": DEFAULT_SORT},
+    {"name": "status + type + admin", "filter": {"status": "approved", "homeStayType": "community", "adminUsername": "admin"}},
+    {"name": "minimum rating", "filter": {"status": "approved", "averageRating": {"$gte": 4.0}},
+     "sort": DEFAULT_SORT},
+    {"name": "resolved district", "filter": {"status": "approved", "address.district.en": {"$in": ["Chitwan"]}}},
+    {"name": "resolved municipality (ne)", "filter": {"status": "approved", "address.municipality.ne": {"$in": ["मलंगवा नगरपालिका"]}}},
+    {"name": "exact feature", "filter": {"status": "approved", "features.infrastructure": {"$in": ["Community Building/सामुदायिक भवन"]}}},
+    {"name": "feature ids", "filter": {"status": "approved", "featureIds": {"$all": [1, 2]}}},
+    {"name": "homestays by id", "collation": None,
+     "filter": {"homestayId": {"$in": ["homestay000001", "homestay000002"]}, "status": {"$in": ["approved"]}}},
+    {"name": "pending review queue", "filter": {"status": "pending"},
+     "sort": DEFAULT_SORT},
+    {"name": "keyset next page", "sort": DEFAULT_SORT,
+     "filter": {"status": "approved", "$or": [
+         {"averageRating": {"$lt": 4.5}},
+         {"averageRating": 4.5, "createdAt": {"$lt": datetime(2024, 1, 1)}},
+     ]}},
+]
+
+
+def _rebuild_drifted_default() -> bool:
+    return os.getenv("HOMESTAY_REBUILD_DRIFTED_INDEXES", "false").lower() in ("1", "true", "yes")
+
+
+async def ensure_indexes(collection=None, rebuild_drifted: Optional[bool] = None) -> Dict[str, List[str]]:
+    """Create missing managed indexes; report (or, if enabled, rebuild) ones whose definition drifted (idempotent).
+
+    A drifted index is never dropped before its replacement exists: the new
+    definition is built under the spec's other name and the old index is dropped
+    only once that succeeded, so a failed build leaves the collection as it was.
+    """
+    collection = collection if collection is not None else db_instance.homestays
+    if rebuild_drifted is None:
+        rebuild_drifted = _rebuild_drifted_default()
+    existing = {info["name"]: info async for info in collection.list_indexes()}
+
+    report: Dict[str, List[str]] = {"created": [], "rebuilt": [], "drifted": [], "unchanged": [], "failed": []}
+    for spec in INDEX_SPECS:
+        current = [name for name in spec.names if name in existing]
+        matching = [name for name in current if spec.matches(existing[name])]
+        if matching:
+            # Leftover of a rebuild interrupted between creating the replacement and dropping the old index
+            for stale in current:
+                if stale not in matching and rebuild_drifted:
+                    await collection.drop_index(stale)
+            report["unchanged"].append(spec.name)
+            continue
+        if current and not rebuild_drifted:
+            log.warning("indexes.drifted", index=current[0], hint="set HOMESTAY_REBUILD_DRIFTED_INDEXES=true to rebuild it")
+            report["drifted"].append(spec.name)
+            continue
+        if len(current) == len(spec.names):
+            # Both names hold outdated definitions: keep one serving while the replacement builds
+            await collection.drop_index(current.pop())
+        name = next(name for name in spec.names if name not in current)
+        try:
+            await collection.create_indexes([spec.model(name)])
+        except OperationFailure as e:
+            # e.g. the same key pattern already exists under another name/collation
+            log.warning("indexes.create_failed", index=name, error=str(e))
+            report["failed"].append(spec.name)
+            continue
+        for stale in current:
+            await collection.drop_index(stale)
+        report["rebuilt" if current else "created"].append(spec.name)
+
+    log.info("indexes.ensured", **{bucket: len(names) for bucket, names in report.items()})
+    return report
+
+
+def plan_nodes(plan: Any) -> List[Dict[str, Any]]:
+    """Flatten an explain plan tree into its stages (classic and SBE formats)"""
+    nodes: List[Dict[str, Any]] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            nodes.append(plan)
+        for key in ("inputStage", "queryPlan"):
+            if key in plan:
+                nodes.extend(plan_nodes(plan[key]))
+        for child in plan.get("inputStages", []):
+            nodes.extend(plan_nodes(child))
+    return nodes
+
+
+async def verify_query_plans(collection=None) -> List[Dict[str, Any]]:
+    """explain() every representative query and warn loudly about collection scans"""
+    collection = collection if collection is not None else db_instance.homestays
+    results = []
+    for shape in REPRESENTATIVE_QUERIES:
+        cursor = collection.find(shape["filter"]).limit(100)
+        collation = shape.get("collation", SEARCH_COLLATION)
+        if collation:
+            cursor = cursor.collation(collation)
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        explain = await cursor.explain()
+        nodes = plan_nodes(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        stages = [node["stage"] for node in nodes]
+        results.append({"name": shape["name"], "stages": stages,
+                        "indexes": [node["indexName"] for node in nodes if node.get("indexName")],
+                        "collscan": "COLLSCAN" in stages})
+
+    scans = [r for r in results if r["collscan"]]
+    for r in scans:
+        log.error("indexes.collscan", query=r["name"], plan=" <- ".join(r["stages"]))
+    if scans:
+        log.error("indexes.collscan_summary", collscans=len(scans), queries=len(results),
+                  hint="check the index spec in src/homestay/indexes.py against the deployed indexes")
+    else:
+        log.info("indexes.plans_verified", queries=len(results))
+    return results
+
+
+async def provision_indexes():
+    """Apply the index spec and verify query plans, as configured by environment variables"""
+    if os.getenv("HOMESTAY_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes"):
+        await ensure_indexes()
+    if os.getenv("HOMESTAY_VERIFY_QUERY_PLANS", "true").lower() in ("1", "true", "yes"):
+        await verify_query_plans()
@@ -0,0 +1,110 @@
+"""Aho-Corasick automaton over the NL keyword maps.
+
+`EnhancedFeatureSearchHelper` used to test every keyword of every category
+with `keyword in text`, once per split part of a query plus once for the whole
+query. The automaton finds every keyword occurrence in one left-to-right pass
+and hands back the category-tagged database values.
+
+Matches must sit on word boundaries, so 'room' no longer fires inside
+'mushroom' and 'water' not inside 'waterfall'. A plural 's'/'es' after a
+keyword is still accepted ('lakes', 'museums', 'toilets').
+"""
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+# Endings accepted between a keyword and the following word boundary
+PLURAL_SUFFIXES = ("", "s", "es")
+
+
+class KeywordMatch(NamedTuple):
+    category: str
+    keyword: str
+    start: int
+    end: int
+    values: Tuple[str, ...]
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordAutomaton:
+    """Goto/fail/output tables built once from `{category: {keyword: [db values]}}`"""
+
+    def __init__(self, keyword_maps: Dict[str, Dict[str, Iterable[str]]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (category, keyword, values) for every keyword ending there
+        self._out: List[List[Tuple[str, str, Tuple[str, ...]]]] = [[]]
+        self.keyword_count = 0
+        for category, keywords in keyword_maps.items():
+            for keyword, values in keywords.items():
+                self._add(keyword.lower(), (category, keyword.lower(), tuple(values)))
+        self._link()
+
+    def _add(self, keyword: str, output: Tuple[str, str, Tuple[str, ...]]):
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._out[state].append(output)
+        self.keyword_count += 1
+
+    def _link(self):
+        """Breadth-first failure links; each state inherits the outputs of its fail state"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> List[KeywordMatch]:
+        """Every keyword occurrence in `text` (lowercased) that starts and ends on a word boundary"""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = index + 1
+            for category, keyword, values in out[state]:
+                start = end - len(keyword)
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(keyword[0]):
+                    continue
+                if not self._ends_word(text, end, keyword):
+                    continue
+                matches.append(KeywordMatch(category, keyword, start, end, values))
+        return matches
+
+    @staticmethod
+    def _ends_word(text: str, end: int, keyword: str) -> bool:
+        if not _is_word_char(keyword[-1]):
+            return True
+        for suffix in PLURAL_SUFFIXES:
+            boundary = end + len(suffix)
+            if text.startswith(suffix, end) and (boundary == len(text) or not _is_word_char(text[boundary])):
+                return True
+        return False
+
+    def categorize(self, text: str) -> Dict[str, Set[str]]:
+        """Database values found in `text`, by category"""
+        found: Dict[str, Set[str]] = {}
+        for match in self.find(text):
+            found.setdefault(match.category, set()).update(match.values)
+        return found
@@ -0,0 +1,93 @@
+import os
+from .change_feed import change_feed
+from .feature_index import feature_index
+from .feature_catalog import feature_catalog
+from .gazetteer import gazetteer
+from .indexes import provision_indexes
+from .cache import search_cache, homestay_cache, negative_cache
+from .stats import homestay_stats
+from .columnar import columnar_index
+from .backends import search_backend, search_backend_name
+from .diagnostics import zero_result_diagnostics
+from ..logs import get_logger
+
+log = get_logger("homestay.lifecycle")
+
+
+def _enabled(name: str, default: str = "true") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _invalidate_search_cache(change=None):
+    search_cache.invalidate_all()
+
+
+async def startup():
+    """Start process-wide homestay search services (call after db_instance.connect())"""
+    try:
+        await provision_indexes()
+    except Exception as e:
+        log.warning("indexes.provisioning_failed", error=str(e))
+
+    # Writes made while the services below load are replayed once the feed starts
+    await change_feed.pin_start()
+
+    if _enabled("HOMESTAY_FEATURE_INDEX"):
+        try:
+            await feature_index.build()
+            change_feed.subscribe(feature_index.on_change, feature_index.build, name="feature_index")
+        except Exception as e:
+            log.warning("feature_index.disabled", error=str(e), fallback="regex filters")
+
+    if _enabled("HOMESTAY_FEATURE_IDS", "false"):
+        try:
+            await feature_catalog.load()
+            change_feed.subscribe(feature_catalog.on_change, feature_catalog.load, name="feature_catalog")
+        except Exception as e:
+            log.warning("feature_catalog.disabled", error=str(e), fallback="regex filters")
+
+    if _enabled("HOMESTAY_GAZETTEER"):
+        try:
+            await gazetteer.load()
+            change_feed.subscribe(gazetteer.on_change, gazetteer.load, name="gazetteer")
+        except Exception as e:
+            log.warning("gazetteer.disabled", error=str(e), fallback="regex location filters")
+
+    if _enabled("HOMESTAY_STATS"):
+        try:
+            await homestay_stats.load()
+            change_feed.subscribe(homestay_stats.on_change, homestay_stats.load, name="homestay_stats")
+            await homestay_stats.start_reconciliation()
+        except Exception as e:
+            log.warning("stats.disabled", error=str(e), fallback="aggregation")
+
+    if _enabled("HOMESTAY_COLUMNAR", "false"):
+        try:
+            await columnar_index.build()
+            change_feed.subscribe(columnar_index.on_change, columnar_index.build, name="columnar_index")
+        except Exception as e:
+            log.warning("columnar.disabled", error=str(e), fallback="mongodb")
+
+    if search_backend_name() == "sqlite" and _enabled("HOMESTAY_SQLITE_SYNC"):
+        try:
+            backend = search_backend()
+            await backend.sync_from()
+            change_feed.subscribe(backend.on_change, backend.sync_from, name="sqlite_replica")
+        except Exception as e:
+            log.warning("sqlite_replica.sync_failed", error=str(e), fallback="last synced copy")
+
+    # Any write can change any search result; TTL takes over without change streams
+    change_feed.subscribe(_invalidate_search_cache, _invalidate_search_cache, name="search_cache")
+    change_feed.subscribe(homestay_cache.on_change, homestay_cache.invalidate_all, name="homestay_cache")
+    change_feed.subscribe(negative_cache.on_change, negative_cache.invalidate_all, name="negative_cache")
+
+    await change_feed.start()
+
+
+async def shutdown():
+    """Stop background services started by `startup()`"""
+    await homestay_stats.stop()
+    await feature_index.stop()
+    await columnar_index.stop()
+    await zero_result_diagnostics.stop()
+    await change_feed.stop()
@@ -3,6 +3,8 @@ from typing import Dict, List, Optional, Any, Union, Literal
 from datetime import datetime
 from enum import Enum
 import re
+from .keyword_automaton import KeywordAutomaton
+from .spelling import spelling_index
 
 class BilingualData(BaseModel):
     en: str
@@ -60,10 +62,8 @@ class EnhancedFeatureSearchHelper:
         'hiking': ['Trekking, Climbing & Hiking Routes/ट्रेकिङ, आरोहण तथा हाइकिङ मार्गहरू'],
         'trekking': ['Trekking, Climbing & Hiking Routes/ट्रेकिङ, आरोहण तथा हाइकिङ मार्गहरू'],
         'trek': ['Trekking, Climbing & Hiking Routes/ट्रेकिङ, आरोहण तथा हाइकिङ मार्गहरू'],
-        'treking': ['Trekking, Climbing & Hiking Routes/ट्रेकिङ, आरोहण तथा हाइकिङ मार्गहरू'],
         'climbing': ['Trekking, Climbing & Hiking Routes/ट्रेकिङ, आरोहण तथा हाइकिङ मार्गहरू'],
         'fishing': ['Fishing in the fish pond/माछा पोखरीमा फिसिङ'],
-        'fshing': ['Fishing in the fish pond/माछा पोखरीमा फिसिङ'],
         'fish pond': ['Fishing in the fish pond/माछा पोखरीमा फिसिङ'],
         'museum': ['Museums & Cultural Centers/आदिवासी संग्रहालय तथा संस्कृति केन्द्रहरू'],
         'cultural centers': ['Museums & Cultural Centers/आदिवासी संग्रहालय तथा संस्कृति केन्द्रहरू'],
@@ -74,14 +74,12 @@ class EnhancedFeatureSearchHelper:
         'organic food': ['Organic Food/Organic खाना'],
         'organic': ['Organic Food/Organic खाना'],
         'national park': ['National Parks & Conservation Areas/राष्ट्रिय निकुञ्ज तथा संरक्षित क्षेत्र'],
-        'natinal park': ['National Parks & Conservation Areas/राष्ट्रिय निकुञ्ज तथा संरक्षित क्षेत्र'],
         'conservation': ['National Parks & Conservation Areas/राष्ट्रिय निकुञ्ज तथा संरक्षित क्षेत्र'],
         'river': ['Major Rivers & Lakes/प्रमुख नदी तथा तालहरू'],
         'lake': ['Major Rivers & Lakes/प्रमुख नदी तथा तालहरू'],
         'viewpoint': ['Viewpoint Tower/दृश्यावलोकन स्थल (भ्यू टावर)'],
         'view tower': ['Viewpoint Tower/दृश्यावलोकन स्थल (भ्यू टावर)'],
         'bird watching': ['Birdwatching Hotspots/चराचुरुङ्गी हेर्ने स्थानहरू'],
-        'bird wathign spot': ['Birdwatching Hotspots/चराचुरुङ्गी हेर्ने स्थानहरू'],
         'bird watching spot': ['Birdwatching Hotspots/चराचुरुङ्गी हेर्ने स्थानहरू'],
         'birdwatching': ['Birdwatching Hotspots/चराचुरुङ्गी हेर्ने स्थानहरू'],
         'wildlife': ['Iconic & Endangered Wildlife/प्रमुख तथा लोपोन्मुख जनावरहरू'],
@@ -142,6 +140,9 @@ class EnhancedFeatureSearchHelper:
         """🔧 ENHANCED natural language processing to accurately handle must-have vs optional features"""
         import re
         query_lower = query.lower().strip()
+        # Location patterns see the words as typed; the gazetteer resolves misspelled names itself
+        location_text = query_lower
+        query_lower = spelling_index.correct_text(query_lower)
         filters = {}
     
         # Initialize feature sets
@@ -272,7 +273,7 @@ class EnhancedFeatureSearchHelper:
         
         for location_type, patterns in location_patterns.items():
             for pattern in patterns:
-                match = re.search(pattern, query_lower, re.IGNORECASE)
+                match = re.search(pattern, location_text, re.IGNORECASE)
                 if match:
                     location_value = match.group(1).strip()
                     if location_value and len(location_value) > 1:
@@ -327,53 +328,21 @@ class EnhancedFeatureSearchHelper:
     @classmethod
     def _contains_mixed_feature_types(cls, text: str) -> bool:
         """Check if query contains features from multiple categories (attractions + infrastructure/tourism)"""
-        attraction_count = 0
-        infrastructure_count = 0
-        tourism_count = 0
-        
-        # Count how many different feature types are mentioned
-        for keyword in cls.ATTRACTION_KEYWORDS:
-            if keyword in text:
-                attraction_count += 1
-                
-        for keyword in cls.INFRASTRUCTURE_KEYWORDS:
-            if keyword in text:
-                infrastructure_count += 1
-                
-        for keyword in cls.TOURISM_KEYWORDS:
-            if keyword in text:
-                tourism_count += 1
-        
+        found = cls.KEYWORD_AUTOMATON.categorize(text)
         # If we have attractions AND (infrastructure OR tourism), it's mixed
-        return attraction_count > 0 and (infrastructure_count > 0 or tourism_count > 0)
+        return 'attractions' in found and ('infrastructure' in found or 'tourism' in found)
     
     @classmethod
     def _extract_features_from_text(cls, text: str, attractions_set: set, infrastructure_set: set, tourism_set: set):
         """Helper method to extract features from text and add them to appropriate sets"""
         if not text or not text.strip():
             return
-            
-        # Clean the text and split by common separators
-        text = text.strip()
-        # Split by commas, 'and', 'with', but be careful not to split bilingual terms
-        parts = re.split(r'(?:,\s*|\s+and\s+|\s+with\s+)(?![^/]*\s)', text)
-        
-        # Also try to match the full text as a single unit for better context
-        all_parts = parts + [text]
-        
-        for part in all_parts:
-            part = part.strip()
-            if not part:
-                continue
-            for keyword, attraction_terms in cls.ATTRACTION_KEYWORDS.items():
-                if keyword in part:
-                    attractions_set.update(attraction_terms)
-            for keyword, infra_terms in cls.INFRASTRUCTURE_KEYWORDS.items():
-                if keyword in part:
-                    infrastructure_set.update(infra_terms)
-            for keyword, tourism_terms in cls.TOURISM_KEYWORDS.items():
-                if keyword in part:
-                    tourism_set.update(tourism_terms)
+        # One pass over the whole text finds everything the comma/'and'/'with' parts would:
+        # the parts are substrings of it that start and end on word boundaries
+        found = cls.KEYWORD_AUTOMATON.categorize(text.strip())
+        attractions_set.update(found.get('attractions', ()))
+        infrastructure_set.update(found.get('infrastructure', ()))
+        tourism_set.update(found.get('tourism', ()))
 
     @classmethod
     def map_simple_keywords_to_database_values(cls, keywords: List[str], category: str) -> List[str]:
@@ -400,12 +369,14 @@ class EnhancedFeatureSearchHelper:
             keyword_lower = keyword.lower().strip()
             found_match = False
             
-            # Try exact match first
-            for map_key, db_values in keyword_map.items():
-                if keyword_lower == map_key.lower():
+            # Try exact match first, then with misspelled words corrected
+            for candidate in (keyword_lower, spelling_index.correct_text(keyword_lower)):
+                db_values = keyword_map.get(candidate)
+                if db_values:
                     mapped_values.update(db_values)
                     found_match = True
                     break
+            keyword_lower = candidate
             
             # If no exact match, try partial match
             if not found_match:
@@ -423,23 +394,34 @@ class EnhancedFeatureSearchHelper:
 
     @classmethod
     def fuzzy_keyword_match(cls, query: str, keywords: Dict[str, List[str]]) -> List[str]:
-        """Fuzzy matching for keywords (e.g., 'hike' matches 'hiking')"""
-        import difflib
-        
+        """Fuzzy matching for keywords (e.g., 'hike' matches 'hiking', 'fshing' matches 'fishing')"""
         query_words = query.lower().split()
         matched_features = set()
         
         for word in query_words:
+            # Typos resolve through the spelling index, then the usual containment match applies
+            word = spelling_index.correct(word)
             for keyword, features in keywords.items():
-                # Exact match
                 if word in keyword or keyword in word:
                     matched_features.update(features)
-                # Fuzzy match
-                elif difflib.SequenceMatcher(None, word, keyword).ratio() > 0.8:
-                    matched_features.update(features)
         
         return list(matched_features)
 
+# Compiled once; the NL parser scans each query with it in a single pass
+EnhancedFeatureSearchHelper.KEYWORD_AUTOMATON = KeywordAutomaton({
+    'attractions': EnhancedFeatureSearchHelper.ATTRACTION_KEYWORDS,
+    'infrastructure': EnhancedFeatureSearchHelper.INFRASTRUCTURE_KEYWORDS,
+    'tourism': EnhancedFeatureSearchHelper.TOURISM_KEYWORDS,
+})
+# Typo vocabulary: keyword phrases plus the English side of every label they map to
+for _keyword_map in (EnhancedFeatureSearchHelper.ATTRACTION_KEYWORDS, EnhancedFeatureSearchHelper.INFRASTRUCTURE_KEYWORDS,
+                     EnhancedFeatureSearchHelper.TOURISM_KEYWORDS):
+    spelling_index.add_all(_keyword_map)
+    spelling_index.add_all(label.split('/')[0] for labels in _keyword_map.values() for label in labels)
+for _labels in (LocalAttractionCategories.NATURAL, LocalAttractionCategories.CULTURAL, LocalAttractionCategories.PRODUCTS,
+                LocalAttractionCategories.FOREST, LocalAttractionCategories.WILDLIFE, LocalAttractionCategories.ADVENTURE):
+    spelling_index.add_all(label.split('/')[0] for label in _labels)
+
 class HomestayFilterRequest(BaseModel):
     """Comprehensive homestay filtering request model"""
     
@@ -535,6 +517,7 @@ class HomestayFilterRequest(BaseModel):
     # Pagination and sorting
     skip: Optional[int] = 0
     limit: Optional[int] = 100
+    cursor: Optional[str] = None  # keyset token from a previous response's nextCursor (skip is ignored)
     sort_by: Optional[str] = None
     sort_order: Optional[Literal["asc", "desc"]] = "desc"
     logical_operator: Optional[Literal["AND", "OR", "MIXED"]] = "AND"
@@ -547,6 +530,7 @@ class HomestayFilterResponse(BaseModel):
     filtered_count: int = Field(alias="filteredCount")
     applied_filters: Dict[str, Any] = Field(alias="appliedFilters")
     suggestions: Optional[List[str]] = None  # Suggestions for better filtering
+    next_cursor: Optional[str] = Field(None, alias="nextCursor")  # pass as `cursor` for the next page
     
     class Config:
         allow_population_by_field_name = True
@@ -0,0 +1,79 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+CURSOR_VERSION = 1
+
+
+class InvalidCursorError(ValueError):
+    """The pagination token is malformed or belongs to a different search"""
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def encode_cursor(sort_criteria: List[Tuple[str, int]], last_document: Dict[str, Any],
+                  search_key: str, relaxed: bool) -> str:
+    """Opaque token for the position right after `last_document` in this search's order"""
+    payload = {
+        "v": CURSOR_VERSION,
+        "k": search_key,
+        "s": [[field, direction] for field, direction in sort_criteria],
+        "p": [_get_path(last_document, field) for field, _ in sort_criteria],
+        "r": relaxed,
+    }
+    raw = json_util.dumps(payload, json_options=CANONICAL_JSON_OPTIONS, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort_criteria: List[Tuple[str, int]], search_key: str) -> Tuple[List[Any], bool]:
+    """Position values and relaxed flag from a token issued for the same search and sort"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, TypeError, UnicodeError, json.JSONDecodeError) as e:
+        raise InvalidCursorError(f"Malformed cursor: {e}") from e
+    if not isinstance(payload, dict) or payload.get("v") != CURSOR_VERSION:
+        raise InvalidCursorError("Unsupported cursor version")
+    if payload.get("k") != search_key or payload.get("s") != [[f, d] for f, d in sort_criteria]:
+        raise InvalidCursorError("Cursor was issued for a different search; start again without a cursor")
+    position = payload.get("p")
+    if not isinstance(position, list) or len(position) != len(sort_criteria):
+        raise InvalidCursorError("Malformed cursor position")
+    return position, bool(payload.get("r"))
+
+
+def _beyond(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    """Documents strictly after `value` on one sort key; None if nothing can follow it.
+
+    Null/missing sorts before every other value, so it comes last in a descending
+    sort and first in an ascending one.
+    """
+    if value is None:
+        return {field: {"$ne": None}} if direction == 1 else None
+    if direction == 1:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort_criteria: List[Tuple[str, int]], position: List[Any]) -> Dict[str, Any]:
+    """Range predicate selecting everything after `position` in `sort_criteria` order:
+    (k1 beyond v1) OR (k1 = v1 AND k2 beyond v2) OR ..."""
+    branches = []
+    equal_prefix: List[Dict[str, Any]] = []
+    for (field, direction), value in zip(sort_criteria, position):
+        beyond = _beyond(field, direction, value)
+        if beyond is not None:
+            branches.append({"$and": equal_prefix + [beyond]} if equal_prefix else beyond)
+        equal_prefix.append({field: value})
+    if not branches:
+        return {"_id": {"$exists": False}}  # nothing can come after the position
+    return branches[0] if len(branches) == 1 else {"$or": branches}
@@ -0,0 +1,35 @@
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+# Memo for request-building work (NL extraction, keyword mapping, location
+# patterns) shared by every search in a batch. Tasks started from inside
+# `shared_resolution()` inherit the context, so they all see the same dict.
+_resolution_memo: ContextVar[Optional[Dict[Tuple[str, Hashable], Any]]] = ContextVar(
+    "homestay_resolution_memo", default=None)
+
+
+@contextmanager
+def shared_resolution() -> Iterator[Dict[Tuple[str, Hashable], Any]]:
+    """Share resolution results across the searches built inside this block"""
+    memo: Dict[Tuple[str, Hashable], Any] = {}
+    token = _resolution_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _resolution_memo.reset(token)
+
+
+def memoized(namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+    """`compute()` once per (namespace, key) inside `shared_resolution()`; a plain call outside it.
+
+    Callers get their own copy, so mutating a result cannot leak into another search.
+    """
+    memo = _resolution_memo.get()
+    if memo is None:
+        return compute()
+    slot = (namespace, key)
+    if slot not in memo:
+        memo[slot] = compute()
+    return copy.deepcopy(memo[slot])
@@ -1,36 +1,36 @@
 from mcp.server.fastmcp import FastMCP
-from .tools import enhanced_filter_homestays, get_homestay_stats
+from .tools import (enhanced_filter_homestays, execute_search_batch, explain_search, get_homestay_stats,
+                    get_homestays_by_ids)
 from .models import HomestayFilterRequest, HomestayFilterResponse
 from .database import db_instance
-from typing import Dict, Any
+from .resolution import memoized, shared_resolution
+from ..metrics import metrics
+from ..logs import get_logger
+from typing import Dict, Any, List
 import os
 import builtins
 from contextlib import asynccontextmanager
 from .models import EnhancedFeatureSearchHelper
 
-# Create lifespan manager for database connection
+# Per-session lifespan hook. The MongoDB client itself is owned by the FastAPI
+# lifespan in main.py; in stateless mode this runs for every request, so it must
+# never connect/disconnect the pool - it only reconnects if the client is gone.
 @asynccontextmanager
 async def lifespan_manager(server: FastMCP):
-    """Manage database connection lifecycle"""
-    try:
-        # Connect to database on startup
-        await db_instance.connect()
-        print("Connected to MongoDB for homestay filtering")
-        yield
-    finally:
-        # Disconnect on shutdown
-        await db_instance.disconnect()
-        print("Disconnected from MongoDB")
+    """Ensure the shared database connection is available for this session"""
+    await db_instance.ensure_connected()
+    yield
 
 # Create FastMCP server with lifespan management
+log = get_logger("homestay.server")
+
 mcp = FastMCP(
     name="Homestay_Filter_Server", 
     stateless_http=True,
     lifespan=lifespan_manager
 )
 
-@mcp.tool(name="search_homestays")
-async def search_homestays_tool(
+def build_search_request(
     # Location filters
     province: str = None,
     district: str = None,
@@ -53,32 +53,37 @@ async def search_homestays_tool(
     min_average_rating: float = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: str = None,
+    sort_by: str = None,
     sort_order: str = "desc",
     natural_language_description: str = None,
+    search_query: str = None,
     logical_operator: str = "AND",
     # Homestay type (accept both aliases)
     type: str = None,
     homestay_type: str = None,
-) -> HomestayFilterResponse:
-    """🔧 ENHANCED tool with intelligent keyword mapping and improved logical operator handling"""
+) -> HomestayFilterRequest:
+    """🔧 Turn search tool parameters into a HomestayFilterRequest, with intelligent keyword mapping
+    and improved logical operator handling (shared by every search-shaped tool)"""
     
     # Process natural language FIRST
     extracted_filters = {}
     if natural_language_description:
-        extracted_filters = EnhancedFeatureSearchHelper.enhanced_natural_query_processing(
-            natural_language_description
-        )
-        print(f"🔍 DEBUGGING - Extracted NL filters: {extracted_filters}")
+        with metrics.stage("nl_parse"):
+            extracted_filters = memoized(
+                "natural_language", natural_language_description,
+                lambda: EnhancedFeatureSearchHelper.enhanced_natural_query_processing(natural_language_description),
+            )
+        log.debug("search.nl_filters", filters=extracted_filters)
 
     # Override logical_operator if detected in the natural language query
     final_logical_operator = extracted_filters.get('logical_operator', logical_operator)
 
     # 🔧 CRITICAL PARAMETER VALIDATION - Sanitize inputs FIRST
-    print(f"🔍 RAW PARAMETERS - any_local_attractions: {any_local_attractions} (type: {builtins.type(any_local_attractions)})")
-    if type is not None:
-        print(f"🔍 RAW PARAMETERS - type: {type} (type: {builtins.type(type)})")
-    if homestay_type is not None:
-        print(f"🔍 RAW PARAMETERS - homestay_type: {homestay_type} (type: {builtins.type(homestay_type)})")
+    log.debug("search.raw_parameters",
+              any_local_attractions=lambda: repr(any_local_attractions),
+              type=lambda: None if type is None else f"{type!r} ({builtins.type(type).__name__})",
+              homestay_type=lambda: None if homestay_type is None else f"{homestay_type!r} ({builtins.type(homestay_type).__name__})")
 
     # Validate and sanitize list parameters to prevent type errors
     def sanitize_list(value):
@@ -95,51 +100,44 @@ async def search_homestays_tool(
     any_tourism_services = sanitize_list(any_tourism_services)
     tourism_services = sanitize_list(tourism_services)
 
+    def map_keywords(keywords: list, category: str) -> list:
+        return memoized(
+            "keywords", (category, tuple(keywords)),
+            lambda: EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values(keywords, category),
+        )
+
     # 🔧 ENHANCED: Map simple keywords to database values for direct API calls (non-NL)
     if not natural_language_description:
-        print("🔧 MAPPING KEYWORDS FOR DIRECT API CALL")
         
         if any_local_attractions:
-            mapped_attractions = EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values(
-                any_local_attractions, 'attractions'
-            )
+            mapped_attractions = map_keywords(any_local_attractions, 'attractions')
             any_local_attractions = mapped_attractions
-            print(f"🔍 MAPPED any_local_attractions: {any_local_attractions}")
+            log.debug("search.keywords_mapped", parameter="any_local_attractions", values=any_local_attractions)
         
         if local_attractions:
-            mapped_attractions = EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values(
-                local_attractions, 'attractions'
-            )
+            mapped_attractions = map_keywords(local_attractions, 'attractions')
             local_attractions = mapped_attractions
-            print(f"🔍 MAPPED local_attractions: {local_attractions}")
+            log.debug("search.keywords_mapped", parameter="local_attractions", values=local_attractions)
         
         if any_infrastructure:
-            mapped_infrastructure = EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values(
-                any_infrastructure, 'infrastructure'
-            )
+            mapped_infrastructure = map_keywords(any_infrastructure, 'infrastructure')
             any_infrastructure = mapped_infrastructure
-            print(f"🔍 MAPPED any_infrastructure: {any_infrastructure}")
+            log.debug("search.keywords_mapped", parameter="any_infrastructure", values=any_infrastructure)
         
         if infrastructure:
-            mapped_infrastructure = EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values(
-                infrastructure, 'infrastructure'
-            )
+            mapped_infrastructure = map_keywords(infrastructure, 'infrastructure')
             infrastructure = mapped_infrastructure
-            print(f"🔍 MAPPED infrastructure: {infrastructure}")
+            log.debug("search.keywords_mapped", parameter="infrastructure", values=infrastructure)
         
         if any_tourism_services:
-            mapped_services = EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values(
-                any_tourism_services, 'tourism'
-            )
+            mapped_services = map_keywords(any_tourism_services, 'tourism')
             any_tourism_services = mapped_services
-            print(f"🔍 MAPPED any_tourism_services: {any_tourism_services}")
+            log.debug("search.keywords_mapped", parameter="any_tourism_services", values=any_tourism_services)
         
         if tourism_services:
-            mapped_services = EnhancedFeatureSearchHelper.map_simple_keywords_to_database_values(
-                tourism_services, 'tourism'
-            )
+            mapped_services = map_keywords(tourism_services, 'tourism')
             tourism_services = mapped_services
-            print(f"🔍 MAPPED tourism_services: {tourism_services}")
+            log.debug("search.keywords_mapped", parameter="tourism_services", values=tourism_services)
         
         # 🔧 CRITICAL: INTELLIGENT LOGICAL OPERATOR SELECTION FOR DIRECT CALLS
         # This ensures consistency between natural language and direct API processing
@@ -162,47 +160,46 @@ async def search_homestays_tool(
         has_mixed_types = feature_categories > 1
         has_multiple_features = total_feature_count > 1
         
-        print(f"🔧 DIRECT API ANALYSIS: categories={feature_categories}, mixed_types={has_mixed_types}, total_features={total_feature_count}")
-        
         # 🔧 ENHANCED LOGIC: Auto-adjust logical operator to match natural language behavior
         if has_mixed_types:
             # Rule 1: Mixed feature types should use OR/MIXED for broader results
             if has_any_features and has_must_features:
                 # Both any_ and must-have features with mixed types
                 final_logical_operator = "MIXED"
-                print(f"🔧 AUTO-SWITCHED TO MIXED: Mixed types with both any_ and must-have features")
+                log.debug("search.operator_switched", operator="MIXED", reason="Mixed types with both any_ and must-have features")
             elif has_any_features:
                 # Only any_ features with mixed types - always use OR
                 final_logical_operator = "OR"
-                print(f"🔧 AUTO-SWITCHED TO OR: Mixed any_ features across categories")
+                log.debug("search.operator_switched", operator="OR", reason="Mixed any_ features across categories")
             elif has_must_features and total_feature_count > 2:
                 # Multiple must-have features across categories - use MIXED for smart handling
                 final_logical_operator = "MIXED"
-                print(f"🔧 AUTO-SWITCHED TO MIXED: Multiple must-have features across categories")
+                log.debug("search.operator_switched", operator="MIXED", reason="Multiple must-have features across categories")
             else:
                 # Few must-have features across categories - use OR for better results
                 final_logical_operator = "OR"
-                print(f"🔧 AUTO-SWITCHED TO OR: Mixed types, using OR for broader results")
+                log.debug("search.operator_switched", operator="OR", reason="Mixed types, using OR for broader results")
         
         elif has_multiple_features:
             # Rule 2: Multiple features in same category
             if has_any_features and not has_must_features:
                 # Multiple any_ features in same category - use OR
                 final_logical_operator = "OR"
-                print(f"🔧 AUTO-SWITCHED TO OR: Multiple any_ features in same category")
+                log.debug("search.operator_switched", operator="OR", reason="Multiple any_ features in same category")
             elif has_must_features and total_feature_count > 3:
                 # Many must-have features - use OR for practical results
                 final_logical_operator = "OR"
-                print(f"🔧 AUTO-SWITCHED TO OR: Too many must-have features, using OR for practical results")
+                log.debug("search.operator_switched", operator="OR", reason="Too many must-have features, using OR for practical results")
             # else: keep original logical_operator (likely AND)
         
         elif has_any_features:
             # Rule 3: Single category, any_ features - prefer OR
             final_logical_operator = "OR"
-            print(f"🔧 AUTO-SWITCHED TO OR: Single category any_ features")
+            log.debug("search.operator_switched", operator="OR", reason="Single category any_ features")
         
         # Rule 4: For single must-have feature, keep AND (default)
-        print(f"🔧 FINAL LOGICAL OPERATOR FOR DIRECT API: {final_logical_operator}")
+        log.debug("search.direct_analysis", categories=feature_categories, mixed_types=has_mixed_types,
+                  total_features=total_feature_count, logical_operator=final_logical_operator)
 
     # 🔧 ENHANCED CONSOLIDATION: Handle both must-have and optional features correctly
     # Only add NL filters if explicit parameters are empty
@@ -213,7 +210,7 @@ async def search_homestays_tool(
             # Convert must-have to optional for mixed types to get better results
             if extracted_filters.get('logical_operator') in ['OR', 'MIXED']:
                 any_local_attractions = must_attractions_from_nl
-                print(f"🔧 CONVERTED must-have attractions to optional for better results")
+                log.debug("search.nl_must_to_optional", category="attractions")
             else:
                 local_attractions = must_attractions_from_nl
         elif optional_attractions_from_nl:
@@ -226,7 +223,7 @@ async def search_homestays_tool(
             # Convert must-have to optional for mixed types to get better results
             if extracted_filters.get('logical_operator') in ['OR', 'MIXED']:
                 any_infrastructure = must_infrastructure_from_nl
-                print(f"🔧 CONVERTED must-have infrastructure to optional for better results")
+                log.debug("search.nl_must_to_optional", category="infrastructure")
             else:
                 infrastructure = must_infrastructure_from_nl
         elif optional_infrastructure_from_nl:
@@ -240,7 +237,7 @@ async def search_homestays_tool(
             # Convert must-have to optional for mixed types to get better results
             if extracted_filters.get('logical_operator') in ['OR', 'MIXED']:
                 any_tourism_services = must_services_from_nl
-                print(f"🔧 CONVERTED must-have tourism services to optional for better results")
+                log.debug("search.nl_must_to_optional", category="tourism services")
             else:
                 tourism_services = must_services_from_nl
         elif optional_services_from_nl:
@@ -277,18 +274,10 @@ async def search_homestays_tool(
     explicit_type = _normalize_homestay_type(homestay_type) or _normalize_homestay_type(type)
     final_homestay_type = explicit_type or _normalize_homestay_type(detected_type)
     if final_homestay_type not in (None, 'community', 'private'):
-        print(f"⚠️ WARNING - Invalid homestay type received: {final_homestay_type}, ignoring it")
+        log.warning("search.invalid_homestay_type", homestay_type=final_homestay_type)
         final_homestay_type = None
 
-    print(f"🔍 SANITIZED PARAMETERS - any_local_attractions: {any_local_attractions}")
-    print(f"🔍 SANITIZED PARAMETERS - local_attractions: {local_attractions}")
-    print(f"🔍 SANITIZED PARAMETERS - any_infrastructure: {any_infrastructure}")
-    print(f"🔍 SANITIZED PARAMETERS - infrastructure: {infrastructure}")
-    print(f"🔍 SANITIZED PARAMETERS - any_tourism_services: {any_tourism_services}")
-    print(f"🔍 SANITIZED PARAMETERS - tourism_services: {tourism_services}")
-    if final_homestay_type:
-        print(f"🔍 SANITIZED PARAMETERS - homestay_type: {final_homestay_type}")
-    
+
     filter_request = HomestayFilterRequest(
         province=province,
         district=district,
@@ -311,15 +300,207 @@ async def search_homestays_tool(
         min_average_rating=min_average_rating,
         skip=skip,
         limit=limit,
+        cursor=cursor,
+        sort_by=sort_by,
         sort_order=sort_order,
+        search_query=search_query,
         logical_operator=final_logical_operator
     )
     
-    print(f"🔍 DEBUGGING - Final filter request: {filter_request.dict(exclude_none=True)}")
+    log.debug("search.request_built", request=lambda: filter_request.dict(exclude_none=True))
+    
+    return filter_request
+
+@mcp.tool(name="search_homestays")
+@metrics.instrumented("search_homestays")
+async def search_homestays_tool(
+    # Location filters
+    province: str = None,
+    district: str = None,
+    municipality: str = None,
+    status: str = None,
+    
+    # Feature filters - Local Attractions
+    any_local_attractions: list = None,
+    local_attractions: list = None,
+    
+    # Feature filters - Infrastructure  
+    any_infrastructure: list = None,
+    infrastructure: list = None,
+    
+    # Feature filters - Tourism Services
+    any_tourism_services: list = None,
+    tourism_services: list = None,
     
+    # Other filters
+    min_average_rating: float = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str = None,
+    sort_by: str = None,
+    sort_order: str = "desc",
+    natural_language_description: str = None,
+    search_query: str = None,
+    logical_operator: str = "AND",
+    # Homestay type (accept both aliases)
+    type: str = None,
+    homestay_type: str = None,
+) -> HomestayFilterResponse:
+    """🔧 ENHANCED tool with intelligent keyword mapping and improved logical operator handling.
+
+    A full page carries `nextCursor`; pass it back as `cursor` with the same
+    filters to get the following page (`skip` is ignored when a cursor is given).
+
+    `search_query` is a full-text search over homestay names, village names and
+    local attractions (needs a text index on MongoDB; built in on the SQLite backend).
+
+    `sort_by="relevance"` ranks homestays by how many of the requested features
+    they have (must-have lists count double), then by rating, so the best matches
+    of an OR/MIXED search come first and a small `limit` is enough.
+    """
+    with metrics.stage("build_request"):
+        filter_request = build_search_request(
+            province=province,
+            district=district,
+            municipality=municipality,
+            status=status,
+            any_local_attractions=any_local_attractions,
+            local_attractions=local_attractions,
+            any_infrastructure=any_infrastructure,
+            infrastructure=infrastructure,
+            any_tourism_services=any_tourism_services,
+            tourism_services=tourism_services,
+            min_average_rating=min_average_rating,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            natural_language_description=natural_language_description,
+            search_query=search_query,
+            logical_operator=logical_operator,
+            type=type,
+            homestay_type=homestay_type,
+        )
     return await enhanced_filter_homestays(filter_request)
 
+@mcp.tool(name="search_homestays_batch")
+@metrics.instrumented("search_homestays_batch")
+async def search_homestays_batch_tool(searches: List[Dict[str, Any]]) -> List[HomestayFilterResponse]:
+    """
+    Run several homestay searches in one call, e.g. one per province or per
+    attraction variant.
+
+    `searches` is a list of objects, each taking the same parameters as
+    search_homestays (province, district, any_local_attractions, limit, cursor,
+    natural_language_description, ...). Returns one response per search, in the
+    same order. Identical searches are executed once, and keyword/location
+    resolution is shared across the batch.
+    """
+    max_searches = int(os.getenv("HOMESTAY_BATCH_MAX_SEARCHES", "20"))
+    if len(searches) > max_searches:
+        raise ValueError(f"At most {max_searches} searches per batch (got {len(searches)})")
+
+    with shared_resolution():
+        filter_requests = []
+        for position, spec in enumerate(searches):
+            try:
+                filter_requests.append(build_search_request(**spec))
+            except TypeError as e:
+                raise ValueError(f"searches[{position}]: {e}") from e
+        return await execute_search_batch(filter_requests)
+
+@mcp.tool(name="explain_homestay_search")
+@metrics.instrumented("explain_homestay_search")
+async def explain_homestay_search_tool(
+    # Location filters
+    province: str = None,
+    district: str = None,
+    municipality: str = None,
+    status: str = None,
+    
+    # Feature filters - Local Attractions
+    any_local_attractions: list = None,
+    local_attractions: list = None,
+    
+    # Feature filters - Infrastructure  
+    any_infrastructure: list = None,
+    infrastructure: list = None,
+    
+    # Feature filters - Tourism Services
+    any_tourism_services: list = None,
+    tourism_services: list = None,
+    
+    # Other filters
+    min_average_rating: float = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str = None,
+    sort_by: str = None,
+    sort_order: str = "desc",
+    natural_language_description: str = None,
+    search_query: str = None,
+    logical_operator: str = "AND",
+    # Homestay type (accept both aliases)
+    type: str = None,
+    homestay_type: str = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Show how MongoDB executes a homestay search. Takes the same parameters as
+    search_homestays.
+
+    Returns the generated filter, the number of regex clauses, and the winning
+    plan (stage chain, indexes, keys/docs examined, execution time) from
+    explain("executionStats"), alongside the normal search response.
+
+    With dry_run=true nothing is executed: only the query planner is consulted
+    and the cost is estimated from the plan. Useful for spotting bad query shapes
+    produced from natural-language descriptions.
+    """
+    filter_request = build_search_request(
+        province=province,
+        district=district,
+        municipality=municipality,
+        status=status,
+        any_local_attractions=any_local_attractions,
+        local_attractions=local_attractions,
+        any_infrastructure=any_infrastructure,
+        infrastructure=infrastructure,
+        any_tourism_services=any_tourism_services,
+        tourism_services=tourism_services,
+        min_average_rating=min_average_rating,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        natural_language_description=natural_language_description,
+        search_query=search_query,
+        logical_operator=logical_operator,
+        type=type,
+        homestay_type=homestay_type,
+    )
+    return await explain_search(filter_request, dry_run=dry_run)
+
+@mcp.tool(name="get_homestays_by_ids")
+@metrics.instrumented("get_homestays_by_ids")
+async def get_homestays_by_ids_tool(homestay_ids: List[str], fields: List[str] = None) -> Dict[str, Any]:
+    """
+    Get details for homestays returned by search_homestays (its `homestayUsernames`).
+
+    Pass up to 100 `homestay_ids`. `fields` selects what to return from homestayId,
+    homeStayName, villageName, homeStayType, address, averageRating and features (the
+    default is all of them). Dotted sub-fields such as "address.district" are
+    accepted. Asking for any other field returns an error that lists the allowed ones.
+
+    Returns `homestays` in the same order as the input IDs, and `not_found` for IDs
+    that do not exist or are not approved listings.
+    """
+    return await get_homestays_by_ids(homestay_ids, fields)
+
 @mcp.tool(name="get_homestay_statistics")
+@metrics.instrumented("get_homestay_statistics")
 async def get_homestay_statistics_tool() -> Dict[str, Any]:
     """
     Get comprehensive statistics about homestays in the database.
@@ -332,6 +513,8 @@ async def get_homestay_statistics_tool() -> Dict[str, Any]:
     - Count of featured homestays
     - Average ratings, rooms, and beds
     - Distribution by provinces and districts
+    - Freshness: `as_of` (last change reflected), `last_reconciled_at` (last full
+      recount) and `live` (true while writes are applied as they happen)
     
     This tool is useful for understanding the overall homestay landscape
     and getting insights into the database contents.
@@ -342,6 +525,7 @@ async def get_homestay_statistics_tool() -> Dict[str, Any]:
     return await get_homestay_stats()
 
 @mcp.tool(name="test_homestay_filtering")
+@metrics.instrumented("test_homestay_filtering")
 async def test_homestay_filtering_tool() -> Dict[str, Any]:
     """
     Run a suite of tests to validate the homestay filtering logic.
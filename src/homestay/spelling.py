@@ -0,0 +1,130 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set
+
+# Tokens the index corrects: romanized words (Devanagari input is left alone)
+_TOKEN = re.compile(r"[a-z]+")
+# Shortest token corrected at all, and at distance 2; shorter words have too many near neighbours
+MIN_CORRECTION_LENGTH = 5
+MIN_DISTANCE_2_LENGTH = 7
+
+# Words the NL parser's own patterns rely on; they must never be "corrected" into a feature keyword
+QUERY_WORDS = (
+    "homestay homestays home stay stays with near need want looking having possible optionally available "
+    "would nice prefer bonus either province pradesh district municipality city village rating above "
+    "greater minimum star stars private community based managed public options only just"
+).split()
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal-string-alignment distance, returning max_distance + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j, cb in enumerate(b, 1):
+            cost = 0 if ca == cb else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """Every string reachable from `word` by deleting up to max_distance characters"""
+    found: Set[str] = set()
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+        found |= frontier
+    return found
+
+
+class SpellingIndex:
+    """Symmetric-delete (SymSpell) index over the feature keyword and gazetteer vocabulary.
+
+    Every vocabulary word is stored under each of its up-to-2-character deletions.
+    A lookup generates the deletions of the misspelled token, collects the words
+    sharing one, and verifies them with `edit_distance`: a handful of dictionary
+    probes per token instead of a similarity ratio against every keyword.
+    """
+
+    def __init__(self, max_distance: int = 2):
+        self.max_distance = max_distance
+        self._words: Set[str] = set()
+        self._by_delete: Dict[str, Set[str]] = defaultdict(set)
+        self._memo: Dict[str, str] = {}
+
+    def add(self, word: str):
+        word = word.lower()
+        if not _TOKEN.fullmatch(word) or word in self._words:
+            return
+        self._words.add(word)
+        for delete in _deletes(word, self.max_distance):
+            self._by_delete[delete].add(word)
+        self._memo.clear()
+
+    def add_text(self, text: Any):
+        """Register every romanized word of a phrase or label"""
+        if isinstance(text, str):
+            for token in _TOKEN.findall(text.lower()):
+                self.add(token)
+
+    def add_all(self, texts: Iterable[Any]):
+        for text in texts:
+            self.add_text(text)
+
+    def correct(self, token: str) -> str:
+        """The vocabulary word closest to `token`, or `token` itself when it is known or nothing is unambiguous"""
+        token = token.lower()
+        if token in self._words or len(token) < MIN_CORRECTION_LENGTH or not _TOKEN.fullmatch(token):
+            return token
+        cached = self._memo.get(token)
+        if cached is not None:
+            return cached
+        corrected = self._lookup(token)
+        if len(self._memo) > 4096:
+            self._memo.clear()
+        self._memo[token] = corrected
+        return corrected
+
+    def _lookup(self, token: str) -> str:
+        max_distance = min(self.max_distance, 1 if len(token) < MIN_DISTANCE_2_LENGTH else 2)
+        candidates: Set[str] = set()
+        for probe in {token} | _deletes(token, max_distance):
+            if probe in self._words:
+                candidates.add(probe)
+            candidates |= self._by_delete.get(probe, set())
+        best: Dict[int, Set[str]] = defaultdict(set)
+        for word in candidates:
+            # Typos rarely hit the first letter; real words that do ('mushroom'/'washroom',
+            # 'later'/'water') are exactly the ones that must not be rewritten
+            if word[0] != token[0]:
+                continue
+            distance = edit_distance(token, word, max_distance)
+            if distance <= max_distance:
+                best[distance].add(word)
+        if not best:
+            return token
+        closest = best[min(best)]
+        # Two words equally close: guessing would put a wrong feature into the filter
+        return next(iter(closest)) if len(closest) == 1 else token
+
+    def correct_text(self, text: str) -> str:
+        """`text` with each misspelled romanized word replaced by its correction"""
+        return _TOKEN.sub(lambda match: self.correct(match.group()), text.lower())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"words": len(self._words), "deletes": len(self._by_delete)}
+
+
+# Global spelling index (keyword vocabulary at import, location names as the gazetteer loads)
+spelling_index = SpellingIndex()
+spelling_index.add_all(QUERY_WORDS)
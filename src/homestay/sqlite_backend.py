@@ -0,0 +1,532 @@
+"""SQLite read replica of `Homestays Collection` (HOMESTAY_SEARCH_BACKEND=sqlite).
+
+Documents are stored as JSON and queried with JSON1; the Mongo filters built in
+tools.py are translated to SQL, feature lists are matched element-wise with
+json_each, and `$text` is answered by an FTS5 index over name, village and
+local attractions. The replica is filled by a sync job (at startup and from the
+change feed when MongoDB is reachable, or standalone):
+
+    python -m src.homestay.sqlite_backend --path homestays.sqlite3 [--watch]
+"""
+import re
+import json
+import asyncio
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId, json_util
+from bson.regex import Regex
+from .database import db_instance
+from .indexes import SEARCH_COLLATION
+from .backends import EMPTY_STATS, search_projection
+from ..logs import configure_logging, get_logger, shutdown_logging
+
+log = get_logger("homestay.sqlite_backend")
+
+# Multikey fields: a condition matches when any element matches (as in Mongo)
+ARRAY_FIELDS = ("features.localAttractions", "features.infrastructure", "features.tourismServices")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS homestays (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,   -- _id as a sortable string (ObjectId hex)
+    id_json TEXT NOT NULL,     -- _id as extended JSON, to hand back the original value
+    doc TEXT NOT NULL          -- the document as JSON, dates as ISO-8601 UTC strings
+);
+CREATE INDEX IF NOT EXISTS homestays_status_rating_created ON homestays (
+    json_extract(doc, '$.status') COLLATE NOCASE,
+    json_extract(doc, '$.averageRating'),
+    json_extract(doc, '$.createdAt')
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS homestays_fts USING fts5(
+    name, village, attractions, tokenize = 'porter unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS replica_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_FIELD_PATH = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+_ISO_DATETIME = re.compile(r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}Z$")
+_REGEX_OPTIONS = set("imsx")
+
+
+class UnsupportedFilterError(ValueError):
+    """The filter uses an operator the SQLite backend does not translate"""
+
+
+# ---------------------------------------------------------------------- values
+
+def _iso(value: datetime) -> str:
+    # Fixed width, so string order is chronological order
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _to_json(value: Any) -> Any:
+    """BSON document -> plain JSON values"""
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, datetime):
+        return _iso(value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)  # ObjectId, Decimal128, ...
+
+
+def _from_json(value: Any) -> Any:
+    if isinstance(value, str) and _ISO_DATETIME.match(value):
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return value
+
+
+def _id_key(value: Any) -> str:
+    if isinstance(value, ObjectId):
+        return str(value)
+    return json_util.dumps(value)
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _feature_text(values: Any) -> str:
+    if isinstance(values, str):
+        return values
+    return "\n".join(v for v in values or [] if isinstance(v, str))
+
+
+# ---------------------------------------------------------------------- filters
+
+@lru_cache(maxsize=1024)
+def _compiled(pattern: str) -> "re.Pattern":
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value: Any) -> int:
+    """SQL `regexp(pattern, value)`; inline flags carry the Mongo $options"""
+    return int(isinstance(value, str) and _compiled(pattern).search(value) is not None)
+
+
+def _negate(condition: str) -> str:
+    # NULL (unknown) counts as "does not match" on both sides, like Mongo's $ne/$nin/$nor
+    return f"NOT IFNULL({condition}, 0)"
+
+
+def fts_query(search: str) -> Optional[str]:
+    """FTS5 query with `$text` semantics: any term, all "phrases", no -negated terms"""
+    phrases = re.findall(r'"([^"]+)"', search)
+    rest = re.sub(r'"[^"]*"', " ", search)
+    terms = [token for token in rest.split() if not token.startswith("-")]
+    negated = [token[1:] for token in rest.split() if token.startswith("-") and len(token) > 1]
+
+    def quote(text: str) -> str:
+        return '"' + text.replace('"', '""') + '"'
+
+    positive = " AND ".join(quote(p) for p in phrases) if phrases else " OR ".join(quote(t) for t in terms)
+    if not positive:
+        return None
+    return f"({positive})" + "".join(f" NOT {quote(term)}" for term in negated)
+
+
+class _Target:
+    """SQL expressions for a value and its JSON type"""
+
+    def __init__(self, value: str, type_: Optional[str]):
+        self.value = value
+        self.type = type_
+
+
+class SQLFilter:
+    """Translate a Mongo filter document into a WHERE clause with bound parameters"""
+
+    def __init__(self, fold: bool):
+        self.fold = fold  # case-insensitive string comparison (collation strength <= 2)
+        self.params: List[Any] = []
+
+    def bind(self, value: Any) -> str:
+        self.params.append(value)
+        return "?"
+
+    @property
+    def collate(self) -> str:
+        return " COLLATE NOCASE" if self.fold else ""
+
+    def where(self, criterion: Dict[str, Any]) -> str:
+        if not isinstance(criterion, dict):
+            raise UnsupportedFilterError("filter is not a document")
+        parts = []
+        for key, value in criterion.items():
+            if key in ("$and", "$or", "$nor"):
+                if not isinstance(value, list) or not value:
+                    raise UnsupportedFilterError(f"{key} needs a non-empty list")
+                inner = [self.where(part) for part in value]
+                joined = "(" + (" AND " if key == "$and" else " OR ").join(inner) + ")"
+                parts.append(_negate(joined) if key == "$nor" else joined)
+            elif key == "$text":
+                parts.append(self.text(value))
+            elif key.startswith("$"):
+                raise UnsupportedFilterError(key)
+            else:
+                parts.append(self.field(key, value))
+        return "(" + " AND ".join(parts) + ")" if parts else "1"
+
+    def text(self, value: Any) -> str:
+        if not isinstance(value, dict) or not isinstance(value.get("$search"), str) \
+                or set(value) - {"$search", "$language"}:
+            raise UnsupportedFilterError("$text")
+        query = fts_query(value["$search"])
+        if query is None:
+            return "0"
+        return f"pk IN (SELECT rowid FROM homestays_fts WHERE homestays_fts MATCH {self.bind(query)})"
+
+    # -------------------------------------------------------------- fields
+
+    def field(self, path: str, condition: Any) -> str:
+        if path != "_id" and not _FIELD_PATH.match(path):
+            raise UnsupportedFilterError(f"field {path!r}")
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            ops = dict(condition)
+        elif isinstance(condition, dict) or isinstance(condition, list):
+            raise UnsupportedFilterError(f"{path}: document/array equality")
+        elif isinstance(condition, (Regex, re.Pattern)):
+            ops = {"$regex": condition}
+        else:
+            ops = {"$eq": condition}
+
+        options = ops.pop("$options", "")
+        if path in ARRAY_FIELDS:
+            parts = [self.array_op(path, op, operand, options) for op, operand in ops.items()]
+        else:
+            target = _Target("id", None) if path == "_id" else \
+                _Target(f"json_extract(doc, '$.{path}')", f"json_type(doc, '$.{path}')")
+            parts = [self.op(target, op, operand, options) for op, operand in ops.items()]
+        return parts[0] if len(parts) == 1 else "(" + " AND ".join(parts) + ")"
+
+    def array_op(self, path: str, op: str, operand: Any, options: str) -> str:
+        source = f"json_each(doc, '$.{path}')"
+        element = _Target("value", "type")
+
+        def any_element(predicate: str) -> str:
+            return f"EXISTS (SELECT 1 FROM {source} WHERE {predicate})"
+
+        if op == "$exists":
+            return f"json_type(doc, '$.{path}') IS {'NOT ' if operand else ''}NULL"
+        if op == "$ne":
+            return f"NOT {any_element(self.op(element, '$eq', operand, options))}"
+        if op == "$nin":
+            return f"NOT {any_element(self.op(element, '$in', operand, options))}"
+        if op == "$all":
+            if not isinstance(operand, list) or not operand:
+                raise UnsupportedFilterError("$all")
+            return "(" + " AND ".join(any_element(self.op(element, "$in", [member], options))
+                                      for member in operand) + ")"
+        return any_element(self.op(element, op, operand, options))
+
+    def op(self, target: _Target, op: str, operand: Any, options: str = "") -> str:
+        if op == "$eq":
+            return self.equals(target, operand)
+        if op == "$ne":
+            return _negate(self.equals(target, operand))
+        if op in ("$in", "$nin"):
+            if not isinstance(operand, list):
+                raise UnsupportedFilterError(op)
+            members = [self.regex(target, member) if isinstance(member, (Regex, re.Pattern))
+                       else self.equals(target, member) for member in operand]
+            condition = "(" + " OR ".join(members) + ")" if members else "0"
+            return _negate(condition) if op == "$nin" else condition
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            return self.compare(target, op, operand)
+        if op == "$regex":
+            return self.regex(target, operand, options)
+        if op == "$exists":
+            if target.type is None:
+                return "1" if operand else "0"
+            return f"{target.type} IS {'NOT ' if operand else ''}NULL"
+        raise UnsupportedFilterError(op)
+
+    def equals(self, target: _Target, operand: Any) -> str:
+        if target.type is None:  # _id
+            if operand is None:
+                return "0"
+            if isinstance(operand, (ObjectId, str)):
+                return f"{target.value} = {self.bind(_id_key(operand))}"
+            raise UnsupportedFilterError(f"_id = {type(operand).__name__}")
+        if operand is None:
+            return f"{target.value} IS NULL"
+        if isinstance(operand, bool):
+            return f"{target.type} = '{'true' if operand else 'false'}'"
+        if isinstance(operand, (int, float)):
+            return f"({target.type} IN ('integer', 'real') AND {target.value} = {self.bind(operand)})"
+        if isinstance(operand, str):
+            return f"{target.value} = {self.bind(operand)}{self.collate}"
+        if isinstance(operand, datetime):
+            return f"{target.value} = {self.bind(_iso(operand))}"
+        if isinstance(operand, ObjectId):
+            return f"{target.value} = {self.bind(str(operand))}"
+        raise UnsupportedFilterError(f"equality with {type(operand).__name__}")
+
+    def compare(self, target: _Target, op: str, operand: Any) -> str:
+        symbol = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+        if target.type is None:  # _id
+            if not isinstance(operand, ObjectId):
+                raise UnsupportedFilterError(f"_id {op} {type(operand).__name__}")
+            return f"{target.value} {symbol} {self.bind(_id_key(operand))}"
+        if isinstance(operand, (int, float)) and not isinstance(operand, bool):
+            return f"({target.type} IN ('integer', 'real') AND {target.value} {symbol} {self.bind(operand)})"
+        if isinstance(operand, datetime):
+            return f"({target.type} = 'text' AND {target.value} {symbol} {self.bind(_iso(operand))})"
+        if isinstance(operand, str):
+            return f"({target.type} = 'text' AND {target.value} {symbol} {self.bind(operand)}{self.collate})"
+        raise UnsupportedFilterError(f"{op} {type(operand).__name__}")
+
+    def regex(self, target: _Target, pattern: Any, options: str = "") -> str:
+        if isinstance(pattern, Regex):
+            pattern = pattern.try_compile()
+        if isinstance(pattern, re.Pattern):
+            options = "".join(flag for flag, bit in (("i", re.I), ("m", re.M), ("s", re.S), ("x", re.X))
+                              if pattern.flags & bit)
+            pattern = pattern.pattern
+        if not isinstance(pattern, str) or set(options or "") - _REGEX_OPTIONS - {"u"}:
+            raise UnsupportedFilterError("$regex")
+        flags = "".join(sorted(set(options or "") & _REGEX_OPTIONS))
+        full = f"(?{flags}){pattern}" if flags else pattern
+        try:
+            _compiled(full)
+        except re.error as e:
+            raise ValueError(f"Regular expression is invalid: {e}") from e
+        return f"regexp({self.bind(full)}, {target.value})"
+
+    def order_by(self, sort_criteria: List[Tuple[str, int]]) -> str:
+        terms = []
+        for field, direction in sort_criteria:
+            if field == "_id":
+                expression = "id"
+            elif _FIELD_PATH.match(field):
+                expression = f"json_extract(doc, '$.{field}'){self.collate}"
+            else:
+                raise UnsupportedFilterError(f"sort on {field!r}")
+            # SQLite orders NULL first ascending and last descending, as Mongo does
+            terms.append(f"{expression} {'ASC' if direction == 1 else 'DESC'}")
+        return ", ".join(terms)
+
+
+# ---------------------------------------------------------------------- backend
+
+class SQLiteBackend:
+    """HomestayBackend over a local SQLite file (JSON1 + FTS5)"""
+    name = "sqlite"
+    supports_facet = False
+    uses_feature_index = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self.collation: Optional[Dict[str, Any]] = SEARCH_COLLATION
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.create_function("regexp", 2, _regexp, deterministic=True)
+        self._conn.executescript(SCHEMA)
+
+    @property
+    def fold(self) -> bool:
+        return bool(self.collation) and self.collation.get("strength", 3) <= 2
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -------------------------------------------------------------- reads
+
+    async def count(self, query_filter: Dict[str, Any]) -> int:
+        sql = SQLFilter(self.fold)
+        where = sql.where(query_filter)
+        row = await self._run(lambda: self._conn.execute(
+            f"SELECT COUNT(*) FROM homestays WHERE {where}", sql.params).fetchone())
+        return row[0]
+
+    async def estimated_count(self) -> int:
+        row = await self._run(lambda: self._conn.execute("SELECT COUNT(*) FROM homestays").fetchone())
+        return row[0]
+
+    async def find_page(self, query_filter: Dict[str, Any], sort_criteria: List[Tuple[str, int]],
+                        skip: int, limit: int) -> List[Dict[str, Any]]:
+        sql = SQLFilter(self.fold)
+        where = sql.where(query_filter)
+        order_by = sql.order_by(sort_criteria)
+        statement = f"SELECT id_json, doc FROM homestays WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?"
+        rows = await self._run(lambda: self._conn.execute(statement, sql.params + [limit, skip]).fetchall())
+
+        fields = [field for field in search_projection(sort_criteria) if field != "_id"]
+        page = []
+        for id_json, doc_json in rows:
+            doc = json.loads(doc_json)
+            projected = {"_id": json_util.loads(id_json)}
+            for field in fields:
+                value = _get_path(doc, field)
+                if value is not None:
+                    projected[field] = _from_json(value)
+            page.append(projected)
+        return page
+
+    async def find_documents(self, query_filter: Dict[str, Any], fields: List[str]) -> List[Dict[str, Any]]:
+        sql = SQLFilter(False)
+        where = sql.where(query_filter)
+        rows = await self._run(lambda: self._conn.execute(
+            f"SELECT id_json, doc FROM homestays WHERE {where}", sql.params).fetchall())
+        documents = []
+        for id_json, doc_json in rows:
+            doc = json.loads(doc_json)
+            projected = {"_id": json_util.loads(id_json)}
+            for field in fields:
+                if field in doc:
+                    projected[field] = _from_json(doc[field])
+            documents.append(projected)
+        return documents
+
+    async def aggregate_stats(self) -> Dict[str, Any]:
+        def number(path: str) -> str:
+            return (f"AVG(CASE WHEN json_type(doc, '$.{path}') IN ('integer', 'real') "
+                    f"THEN json_extract(doc, '$.{path}') END)")
+
+        summary_sql = f"""
+            SELECT COUNT(*),
+                   SUM(json_extract(doc, '$.status') = 'approved'),
+                   SUM(json_extract(doc, '$.status') = 'pending'),
+                   SUM(json_extract(doc, '$.status') = 'rejected'),
+                   SUM(json_extract(doc, '$.homeStayType') = 'community'),
+                   SUM(json_extract(doc, '$.homeStayType') = 'private'),
+                   SUM(json_type(doc, '$.isVerified') = 'true'),
+                   SUM(json_type(doc, '$.isFeatured') = 'true'),
+                   {number('averageRating')}, {number('roomCount')}, {number('bedCount')}
+            FROM homestays"""
+
+        def distribution_sql(level: str) -> str:
+            name = f"COALESCE(json_extract(doc, '$.address.{level}.en'), json_extract(doc, '$.address.{level}.ne'))"
+            return (f"SELECT {name} AS name, COUNT(*) AS n FROM homestays "
+                    f"WHERE name IS NOT NULL AND name != '' GROUP BY name ORDER BY n DESC")
+
+        def query():
+            summary = self._conn.execute(summary_sql).fetchone()
+            provinces = self._conn.execute(distribution_sql("province")).fetchall()
+            districts = self._conn.execute(distribution_sql("district")).fetchall()
+            return summary, provinces, districts
+
+        summary, provinces, districts = await self._run(query)
+        if summary[0]:
+            stats = dict(zip(EMPTY_STATS, summary))
+        else:
+            stats = dict(EMPTY_STATS)
+        stats["province_distribution"] = {name: n for name, n in provinces}
+        stats["district_distribution"] = {name: n for name, n in districts}
+        return stats
+
+    # -------------------------------------------------------------- writes (sync job)
+
+    def _upsert(self, doc: Dict[str, Any]):
+        _id = doc.get("_id")
+        if _id is None:
+            return
+        pk = self._conn.execute(
+            "INSERT INTO homestays (id, id_json, doc) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET id_json = excluded.id_json, doc = excluded.doc RETURNING pk",
+            (_id_key(_id), json_util.dumps(_id), json.dumps(_to_json(doc), ensure_ascii=False)),
+        ).fetchone()[0]
+        features = doc.get("features") if isinstance(doc.get("features"), dict) else {}
+        self._conn.execute("DELETE FROM homestays_fts WHERE rowid = ?", (pk,))
+        self._conn.execute(
+            "INSERT INTO homestays_fts (rowid, name, village, attractions) VALUES (?, ?, ?, ?)",
+            (pk, doc.get("homeStayName") or "", doc.get("villageName") or "",
+             _feature_text(features.get("localAttractions"))),
+        )
+
+    def _delete(self, _id: Any):
+        row = self._conn.execute("DELETE FROM homestays WHERE id = ? RETURNING pk", (_id_key(_id),)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM homestays_fts WHERE rowid = ?", (row[0],))
+
+    def _transaction(self, apply: Callable[[], None]):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            apply()
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _replace_all(self, docs: Iterable[Dict[str, Any]]):
+        def apply():
+            self._conn.execute("DELETE FROM homestays")
+            self._conn.execute("DELETE FROM homestays_fts")
+            for doc in docs:
+                self._upsert(doc)
+            self._conn.execute("INSERT OR REPLACE INTO replica_meta (key, value) VALUES ('synced_at', ?)",
+                               (datetime.now(timezone.utc).isoformat(),))
+        self._transaction(apply)
+
+    async def sync_from(self, collection=None):
+        """Full copy of the Mongo collection; readers keep the old contents until it commits"""
+        collection = collection if collection is not None else db_instance.homestays
+        if collection is None:
+            return
+        docs = await collection.find({}).to_list(length=None)
+        await self._run(self._replace_all, docs)
+        log.info("sqlite_replica.synced", homestays=len(docs), path=self.path)
+
+    async def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback"""
+        operation = change.get("operationType")
+        key = (change.get("documentKey") or {}).get("_id")
+        full_document = change.get("fullDocument")
+        if operation in ("insert", "update", "replace") and full_document is not None:
+            await self._run(self._transaction, lambda: self._upsert(full_document))
+        elif operation in ("insert", "update", "replace", "delete") and key is not None:
+            # Deleted before the update could be looked up, or deleted outright
+            await self._run(self._transaction, lambda: self._delete(key))
+
+    async def synced_at(self) -> Optional[str]:
+        row = await self._run(lambda: self._conn.execute(
+            "SELECT value FROM replica_meta WHERE key = 'synced_at'").fetchone())
+        return row[0] if row else None
+
+
+async def _sync_main(path: str, watch: bool):
+    from .change_feed import change_feed
+    configure_logging()
+    backend = SQLiteBackend(path)
+    await db_instance.connect()
+    try:
+        await backend.sync_from()
+        if watch:
+            change_feed.subscribe(backend.on_change, backend.sync_from, name="sqlite_replica")
+            await change_feed.start()
+            await asyncio.Event().wait()
+    finally:
+        if watch:
+            await change_feed.stop()
+        await db_instance.disconnect()
+        backend.close()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the homestays collection into a SQLite replica")
+    parser.add_argument("--path", default="homestays.sqlite3", help="SQLite file to (re)build")
+    parser.add_argument("--watch", action="store_true", help="Keep applying changes from the change stream")
+    args = parser.parse_args()
+    asyncio.run(_sync_main(args.path, args.watch))
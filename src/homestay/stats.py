@@ -0,0 +1,270 @@
+import os
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, NamedTuple, Optional, Set
+from .database import db_instance
+from .change_feed import change_feed
+from ..logs import get_logger
+
+log = get_logger("homestay.stats")
+
+STATS_PROJECTION = {"status": 1, "homeStayType": 1, "isVerified": 1, "isFeatured": 1, "averageRating": 1,
+                    "roomCount": 1, "bedCount": 1, "address.province": 1, "address.district": 1}
+
+
+class _Contribution(NamedTuple):
+    """What one homestay adds to the aggregates"""
+    status: Any
+    homestay_type: Any
+    verified: bool
+    featured: bool
+    rating: Optional[float]
+    rooms: Optional[float]
+    beds: Optional[float]
+    province: Optional[str]
+    district: Optional[str]
+
+
+def _numeric(value: Any) -> Optional[float]:
+    # $avg only counts numbers (booleans, strings and nulls are ignored)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def _location_name(address: Dict[str, Any], level: str) -> Optional[str]:
+    names = address.get(level)
+    if isinstance(names, dict):
+        return names.get("en") or names.get("ne") or None
+    return names if isinstance(names, str) and names else None
+
+
+def _contribution(doc: Dict[str, Any]) -> _Contribution:
+    address = doc.get("address") if isinstance(doc.get("address"), dict) else {}
+    return _Contribution(
+        status=doc.get("status"),
+        homestay_type=doc.get("homeStayType"),
+        verified=doc.get("isVerified") is True,
+        featured=doc.get("isFeatured") is True,
+        rating=_numeric(doc.get("averageRating")),
+        rooms=_numeric(doc.get("roomCount")),
+        beds=_numeric(doc.get("bedCount")),
+        province=_location_name(address, "province"),
+        district=_location_name(address, "district"),
+    )
+
+
+def _timestamp(epoch: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat() if epoch else None
+
+
+class HomestayStatistics:
+    """Materialized `get_homestay_statistics` counters, maintained incrementally.
+
+    Every homestay's contribution is kept so an insert/update/delete from the
+    change feed adjusts the counters by the difference. A periodic full reload
+    (reconciliation) corrects any drift, e.g. from events missed while the
+    stream was down. Homestays written while a reload is reading are re-read
+    once it is swapped in. Reads serve a cached snapshot.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.updated_at: Optional[float] = None      # last change applied (or reload)
+        self.reconciled_at: Optional[float] = None   # last full reload
+        self.drift_corrections = 0
+        self._task: Optional[asyncio.Task] = None
+        self._touched: Optional[Set[Any]] = None    # _ids changed while a load is reading
+        self._clear()
+
+    def _clear(self):
+        self._docs: Dict[Any, _Contribution] = {}
+        self._status: Counter = Counter()
+        self._types: Counter = Counter()
+        self._provinces: Counter = Counter()
+        self._districts: Counter = Counter()
+        self._verified = 0
+        self._featured = 0
+        # field -> [sum, count] over numeric values
+        self._sums: Dict[str, list] = {"rating": [0.0, 0], "rooms": [0.0, 0], "beds": [0.0, 0]}
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    # ------------------------------------------------------------------ build / maintain
+
+    async def load(self, collection=None):
+        """Recompute everything from the collection and swap it in"""
+        collection = collection if collection is not None else db_instance.homestays
+        if collection is None:
+            return
+        fresh = HomestayStatistics()
+        self._touched = touched = set()
+        try:
+            async for doc in collection.find({}, STATS_PROJECTION):
+                fresh.upsert(doc)
+        finally:
+            self._touched = None
+
+        # A homestay written while the cursor ran may have been read before the write;
+        # the old counters have it right, so it is not drift
+        if touched:
+            drifted = self.ready and ({k: v for k, v in fresh._docs.items() if k not in touched}
+                                      != {k: v for k, v in self._docs.items() if k not in touched})
+        else:
+            drifted = self.ready and fresh._docs != self._docs
+        if drifted:
+            self.drift_corrections += 1
+            log.warning("stats.drift_reconciled", before=len(self._docs), after=len(fresh._docs))
+        self._docs, self._status, self._types = fresh._docs, fresh._status, fresh._types
+        self._provinces, self._districts = fresh._provinces, fresh._districts
+        self._verified, self._featured, self._sums = fresh._verified, fresh._featured, fresh._sums
+        self._snapshot = None
+        self.ready = True
+        if touched:
+            await self._reread(collection, touched)
+        self.updated_at = self.reconciled_at = time.time()
+        log.info("stats.loaded", homestays=len(self._docs), provinces=len(self._provinces),
+                 districts=len(self._districts), reread=len(touched))
+
+    async def _reread(self, collection, ids: Set[Any]):
+        """Re-read homestays written during a load; ones written again meanwhile are already current"""
+        self._touched = again = set()
+        try:
+            documents = await collection.find({"_id": {"$in": list(ids)}}, STATS_PROJECTION).to_list(length=None)
+        finally:
+            self._touched = None
+        found = set()
+        for doc in documents:
+            found.add(doc["_id"])
+            if doc["_id"] not in again:
+                self.upsert(doc)
+        for _id in ids - found - again:
+            self.remove(_id)
+
+    def _apply(self, contribution: _Contribution, sign: int):
+        self._status[contribution.status] += sign
+        self._types[contribution.homestay_type] += sign
+        self._verified += sign * contribution.verified
+        self._featured += sign * contribution.featured
+        for field in ("rating", "rooms", "beds"):
+            value = getattr(contribution, field)
+            if value is not None:
+                self._sums[field][0] += sign * value
+                self._sums[field][1] += sign
+        if contribution.province:
+            self._provinces[contribution.province] += sign
+        if contribution.district:
+            self._districts[contribution.district] += sign
+        self._snapshot = None
+
+    def upsert(self, doc: Dict[str, Any]):
+        """Count (or re-count) one homestay document"""
+        _id = doc.get("_id")
+        if _id is None:
+            return
+        contribution = _contribution(doc)
+        previous = self._docs.get(_id)
+        if previous == contribution:
+            return
+        if previous is not None:
+            self._apply(previous, -1)
+        self._docs[_id] = contribution
+        self._apply(contribution, 1)
+
+    def remove(self, _id: Any):
+        previous = self._docs.pop(_id, None)
+        if previous is not None:
+            self._apply(previous, -1)
+
+    def on_change(self, change: Dict[str, Any]):
+        """Change-stream callback"""
+        key = (change.get("documentKey") or {}).get("_id")
+        if self._touched is not None:
+            self._touched.add(key)
+        if not self.ready:
+            return
+        operation = change.get("operationType")
+        if operation in ("insert", "update", "replace"):
+            full_document = change.get("fullDocument")
+            if full_document is not None:
+                self.upsert(full_document)
+            else:
+                # Document was deleted before the update could be looked up
+                self.remove(key)
+        elif operation == "delete":
+            self.remove(key)
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.ready = False
+            return
+        self.updated_at = time.time()
+
+    async def start_reconciliation(self, interval_seconds: Optional[float] = None):
+        """Periodically reload from scratch in the background (idempotent)"""
+        if self._task is not None and not self._task.done():
+            return
+        interval = interval_seconds or float(os.getenv("HOMESTAY_STATS_RECONCILE_SECONDS", "3600"))
+        self._task = asyncio.create_task(self._reconcile_forever(interval), name="homestay-stats-reconcile")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+
+    async def _reconcile_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception as e:
+                log.warning("stats.reconcile_failed", error=str(e))
+
+    # ------------------------------------------------------------------ read
+
+    def _average(self, field: str) -> Optional[float]:
+        total, count = self._sums[field]
+        return total / count if count else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current statistics (rebuilt only after something changed)"""
+        if self._snapshot is None:
+            self._snapshot = {
+                "total_homestays": len(self._docs),
+                "approved_homestays": self._status["approved"],
+                "pending_homestays": self._status["pending"],
+                "rejected_homestays": self._status["rejected"],
+                "community_homestays": self._types["community"],
+                "private_homestays": self._types["private"],
+                "verified_homestays": self._verified,
+                "featured_homestays": self._featured,
+                "avg_rating": self._average("rating") if self._docs else 0,
+                "avg_rooms": self._average("rooms") if self._docs else 0,
+                "avg_beds": self._average("beds") if self._docs else 0,
+                "province_distribution": {name: n for name, n in self._provinces.most_common() if n > 0},
+                "district_distribution": {name: n for name, n in self._districts.most_common() if n > 0},
+            }
+        # Freshness is reported on every read: with a live change stream the numbers
+        # track writes as they happen, otherwise they are as of the last reload
+        return {
+            **self._snapshot,
+            "as_of": _timestamp(self.updated_at),
+            "last_reconciled_at": _timestamp(self.reconciled_at),
+            "live": bool(change_feed.available and change_feed.is_running),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "homestays": len(self._docs),
+            "updated_at": self.updated_at,
+            "reconciled_at": self.reconciled_at,
+            "drift_corrections": self.drift_corrections,
+        }
+
+
+# Global statistics instance
+homestay_stats = HomestayStatistics()
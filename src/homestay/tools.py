@@ -1,9 +1,28 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import os
+import copy
+import asyncio
 from .models import HomestayFilterRequest, HomestayFilterResponse
 from .database import db_instance
 import re
-from datetime import datetime
-from .models import EnhancedFeatureSearchHelper
+from datetime import datetime, timezone
+from .feature_index import feature_index
+from .feature_catalog import feature_catalog
+from .gazetteer import gazetteer
+from .indexes import SEARCH_COLLATION, plan_nodes
+from .filter_ast import And, Or, Node, parse_filter, optimize_filter, compile_filter, fields_of, regex, count_regex_clauses
+from .cache import (search_cache, search_cache_enabled, canonical_request_key, homestay_cache, negative_cache,
+                    negative_cache_enabled)
+from .pagination import InvalidCursorError, encode_cursor, decode_cursor, keyset_filter
+from .resolution import memoized
+from .stats import homestay_stats
+from .columnar import columnar_index
+from .backends import HomestayBackend, MotorBackend, search_backend, search_projection
+from .diagnostics import zero_result_diagnostics
+from ..metrics import metrics
+from ..logs import get_logger
+
+log = get_logger("homestay.tools")
 
 async def build_mongodb_filter(filter_request: HomestayFilterRequest) -> Dict[str, Any]:
     """Build MongoDB filter from the filter request"""
@@ -250,12 +269,64 @@ async def build_mongodb_filter(filter_request: HomestayFilterRequest) -> Dict[st
     
     return mongo_filter
 
-async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest) -> Dict[str, Any]:
-    """🔧 COMPLETELY REWRITTEN: Builds a MongoDB filter with proper support for mixed must-have and optional features."""
-    mongo_filter = await build_basic_filters(filter_request)
+FEATURE_CATEGORIES = {
+    "features.localAttractions": "attractions",
+    "features.infrastructure": "infrastructure",
+    "features.tourismServices": "tourism",
+}
+
+# sort_by value that ranks by matched requested features, then rating
+RELEVANCE_SORT = "relevance"
+RELEVANCE_FIELD = "_relevance"
+# Score per matched requested feature: must-have values count double
+RELEVANCE_WEIGHTS = {"must": 2, "optional": 1}
+RELEVANCE_SOURCES = (
+    ("features.localAttractions", "local_attractions", "any_local_attractions"),
+    ("features.infrastructure", "infrastructure", "any_infrastructure"),
+    ("features.tourismServices", "tourism_services", "any_tourism_services"),
+)
+
+
+def build_relevance_score(filter_request: HomestayFilterRequest) -> Dict[str, Any]:
+    """Aggregation expression scoring a homestay by the requested features it has.
+
+    Catalog labels ("English/नेपाली", what keyword mapping produces) are counted with
+    one `$setIntersection` per category and weight. Free-text values fall back to a
+    regex over the array elements, the same match the filter itself applies.
+    """
+    terms = []
+    for field, must_attr, any_attr in RELEVANCE_SOURCES:
+        array = {"$cond": [{"$isArray": f"${field}"}, f"${field}", []]}
+        for attr, weight in ((must_attr, RELEVANCE_WEIGHTS["must"]), (any_attr, RELEVANCE_WEIGHTS["optional"])):
+            values = list(dict.fromkeys(
+                v.strip() for v in getattr(filter_request, attr) or [] if isinstance(v, str) and v.strip()))
+            labels = [v for v in values if "/" in v]
+            if labels:
+                matched = {"$size": {"$setIntersection": [array, {"$literal": labels}]}}
+                terms.append({"$multiply": [weight, matched]})
+            for value in values:
+                if value in labels:
+                    continue
+                element_matches = {"$map": {"input": array, "in": {"$cond": [
+                    {"$eq": [{"$type": "$$this"}, "string"]},
+                    {"$regexMatch": {"input": "$$this", "regex": re.escape(value), "options": "i"}},
+                    False,
+                ]}}}
+                terms.append({"$cond": [{"$anyElementTrue": [element_matches]}, weight, 0]})
+    return {"$add": terms} if terms else {"$literal": 0}
+
+
+
+async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest, optimize: bool = True) -> Dict[str, Any]:
+    """🔧 COMPLETELY REWRITTEN: Builds a MongoDB filter with proper support for mixed must-have and optional features.
+
+    Criteria are assembled as a filter AST (see filter_ast.py); with `optimize` the
+    tree is flattened, deduped and regex/equality-merged before compiling to a dict.
+    """
+    basic_filter = await build_basic_filters(filter_request)
     
-    must_have_criteria = []  # AND logic - all must match
-    optional_criteria = []   # OR logic - any can match
+    must_have_criteria: List[Node] = []  # AND logic - all must match
+    optional_criteria: List[Node] = []   # OR logic - any can match
 
     def add_must_have_criteria(field: str, values: List[str]):
         """Handle must-have features (ALL must match - AND logic) with smart bilingual handling"""
@@ -273,32 +344,30 @@ async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest) -
                         bilingual_or = []
                         for part in parts:
                             # Try both exact and partial matching for better coverage
-                            bilingual_or.append({field: {"$regex": part, "$options": "i"}})
+                            bilingual_or.append(regex(field, part))
                             # For complex phrases, also try key words
                             words = part.split()
                             if len(words) > 2:
                                 for word in words:
                                     if len(word.strip()) > 3:
-                                        bilingual_or.append({field: {"$regex": word.strip(), "$options": "i"}})
+                                        bilingual_or.append(regex(field, word.strip()))
                         # Each bilingual term gets its own OR clause, but terms are ANDed together
-                        must_have_criteria.append({"$or": bilingual_or})
+                        must_have_criteria.append(Or(bilingual_or))
                     else:
                         # Single term - try both exact and partial matching
                         words = val.split()
                         if len(words) > 2:
                             # For phrases, create OR with full phrase + key words
-                            phrase_or = [
-                                {field: {"$regex": val.strip(), "$options": "i"}}
-                            ]
+                            phrase_or = [regex(field, val.strip())]
                             for word in words:
                                 if len(word.strip()) > 3:
-                                    phrase_or.append({field: {"$regex": word.strip(), "$options": "i"}})
-                            must_have_criteria.append({"$or": phrase_or})
+                                    phrase_or.append(regex(field, word.strip()))
+                            must_have_criteria.append(Or(phrase_or))
                         else:
-                            must_have_criteria.append({field: {"$regex": val.strip(), "$options": "i"}})
+                            must_have_criteria.append(regex(field, val.strip()))
                 
         except Exception as e:
-            print(f"⚠️ Error processing must-have criteria for {field}: {e}")
+            log.warning("filter.criteria_failed", kind="must", field=field, error=str(e))
 
     def add_optional_criteria(field: str, values: List[str]):
         """Handle optional features (ANY can match - OR logic) with smart bilingual handling"""
@@ -323,17 +392,15 @@ async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest) -
             
             if unique_patterns:
                 # Create OR conditions for all patterns
-                or_conditions = []
-                for pattern in unique_patterns:
-                    or_conditions.append({field: {"$regex": pattern, "$options": "i"}})
+                or_conditions = [regex(field, pattern) for pattern in unique_patterns]
                 
                 if len(or_conditions) == 1:
                     optional_criteria.append(or_conditions[0])
                 else:
-                    optional_criteria.append({"$or": or_conditions})
+                    optional_criteria.append(Or(or_conditions))
                 
         except Exception as e:
-            print(f"⚠️ Error processing optional criteria for {field}: {e}")
+            log.warning("filter.criteria_failed", kind="optional", field=field, error=str(e))
 
     # 🔧 CRITICAL: Process must-have and optional features separately
     # Must-have features (ALL must match)
@@ -364,37 +431,19 @@ async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest) -
         # MIXED operator: Combine intelligently for mixed feature scenarios
         if must_have_criteria and optional_criteria:
             # Strategy: (must-have1 AND must-have2) OR (optional1 OR optional2)
-            must_combined = {"$and": must_have_criteria} if len(must_have_criteria) > 1 else must_have_criteria[0]
-            optional_combined = {"$or": optional_criteria} if len(optional_criteria) > 1 else optional_criteria[0]
-            all_criteria.append({"$or": [must_combined, optional_combined]})
+            must_combined = And(must_have_criteria) if len(must_have_criteria) > 1 else must_have_criteria[0]
+            optional_combined = Or(optional_criteria) if len(optional_criteria) > 1 else optional_criteria[0]
+            all_criteria.append(Or([must_combined, optional_combined]))
         elif must_have_criteria:
             # Only must-have features with MIXED operator - be more permissive
             if is_mixed_types:
                 # For mixed types, use OR between categories
-                category_groups = {"attractions": [], "infrastructure": [], "tourism": []}
-                
-                for criterion in must_have_criteria:
-                    # Determine which category this criterion belongs to
-                    if "features.localAttractions" in str(criterion):
-                        category_groups["attractions"].append(criterion)
-                    elif "features.infrastructure" in str(criterion):
-                        category_groups["infrastructure"].append(criterion)
-                    elif "features.tourismServices" in str(criterion):
-                        category_groups["tourism"].append(criterion)
-                
-                # Combine within categories with AND, between categories with OR
-                category_criteria = []
-                for category, criteria in category_groups.items():
-                    if criteria:
-                        if len(criteria) == 1:
-                            category_criteria.append(criteria[0])
-                        else:
-                            category_criteria.append({"$and": criteria})
+                category_criteria = group_by_feature_category(must_have_criteria)
                 
                 if len(category_criteria) == 1:
                     all_criteria.append(category_criteria[0])
                 else:
-                    all_criteria.append({"$or": category_criteria})
+                    all_criteria.append(Or(category_criteria))
             else:
                 # Same category features - use AND
                 all_criteria.extend(must_have_criteria)
@@ -403,7 +452,7 @@ async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest) -
             if len(optional_criteria) == 1:
                 all_criteria.append(optional_criteria[0])
             else:
-                all_criteria.append({"$or": optional_criteria})
+                all_criteria.append(Or(optional_criteria))
     
     elif logical_operator == "OR":
         # OR operator: All features are treated as optional
@@ -411,51 +460,33 @@ async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest) -
         if len(combined_criteria) == 1:
             all_criteria.append(combined_criteria[0])
         elif combined_criteria:
-            all_criteria.append({"$or": combined_criteria})
+            all_criteria.append(Or(combined_criteria))
     
     else:  # Default "AND" operator
         if must_have_criteria and optional_criteria:
             # 🔧 CRITICAL FIX: For mixed types with AND operator, be more flexible
             if is_mixed_types:
                 # Mixed types with AND - use OR between categories but AND within
-                category_groups = {"attractions": [], "infrastructure": [], "tourism": []}
-                
                 # Categorize all criteria (both must-have and optional)
-                all_combined = must_have_criteria + optional_criteria
-                for criterion in all_combined:
-                    if "features.localAttractions" in str(criterion):
-                        category_groups["attractions"].append(criterion)
-                    elif "features.infrastructure" in str(criterion):
-                        category_groups["infrastructure"].append(criterion)
-                    elif "features.tourismServices" in str(criterion):
-                        category_groups["tourism"].append(criterion)
-                
-                # Build category-wise criteria
-                category_criteria = []
-                for category, criteria in category_groups.items():
-                    if criteria:
-                        if len(criteria) == 1:
-                            category_criteria.append(criteria[0])
-                        else:
-                            category_criteria.append({"$and": criteria})
+                category_criteria = group_by_feature_category(must_have_criteria + optional_criteria)
                 
                 # Use OR between categories for better results
                 if len(category_criteria) == 1:
                     all_criteria.append(category_criteria[0])
                 else:
-                    all_criteria.append({"$or": category_criteria})
+                    all_criteria.append(Or(category_criteria))
             else:
                 # Same category - standard AND logic
                 all_criteria.extend(must_have_criteria)
                 if len(optional_criteria) == 1:
                     all_criteria.append(optional_criteria[0])
                 else:
-                    all_criteria.append({"$or": optional_criteria})
+                    all_criteria.append(Or(optional_criteria))
         elif must_have_criteria:
             # Only must-have features
             if is_mixed_types and len(must_have_criteria) > 2:
                 # For mixed types with multiple features, use OR for broader results
-                all_criteria.append({"$or": must_have_criteria})
+                all_criteria.append(Or(must_have_criteria))
             else:
                 all_criteria.extend(must_have_criteria)
         elif optional_criteria:
@@ -463,45 +494,36 @@ async def build_enhanced_mongodb_filter(filter_request: HomestayFilterRequest) -
             if len(optional_criteria) == 1:
                 all_criteria.append(optional_criteria[0])
             else:
-                all_criteria.append({"$or": optional_criteria})
-
-    # Apply the combined criteria to the filter
-    if all_criteria:
-        if len(all_criteria) == 1:
-            # Single criterion - add directly but be careful about structure
-            criterion = all_criteria[0]
-            if isinstance(criterion, dict):
-                # Check if it's a simple field:value or complex condition
-                if any(key.startswith('$') for key in criterion.keys()):
-                    # Complex condition - add to $and
-                    if "$and" in mongo_filter:
-                        mongo_filter["$and"].append(criterion)
-                    else:
-                        mongo_filter["$and"] = [criterion]
-                else:
-                    # Simple field condition - can merge directly if no conflicts
-                    for key, value in criterion.items():
-                        if key in mongo_filter:
-                            # Conflict - use $and to combine
-                            if "$and" in mongo_filter:
-                                mongo_filter["$and"].append(criterion)
-                            else:
-                                mongo_filter["$and"] = [criterion]
-                            break
-                        else:
-                            mongo_filter[key] = value
-        else:
-            # Multiple criteria - combine with $and
-            if "$and" in mongo_filter:
-                mongo_filter["$and"].extend(all_criteria)
-            else:
-                mongo_filter["$and"] = all_criteria
-                
-    return mongo_filter
+                all_criteria.append(Or(optional_criteria))
+
+    # Combine with the basic filters; the compiler decides what can share the top-level document
+    query = And([parse_filter(basic_filter), *all_criteria])
+    if optimize:
+        query = optimize_filter(query)
+    return compile_filter(query)
+
+
+def group_by_feature_category(criteria: List[Node]) -> List[Node]:
+    """AND criteria within each feature category (attractions, infrastructure, tourism), in category order"""
+    category_groups: Dict[str, List[Node]] = {category: [] for category in FEATURE_CATEGORIES.values()}
+    for criterion in criteria:
+        for field in fields_of(criterion):
+            if field in FEATURE_CATEGORIES:
+                category_groups[FEATURE_CATEGORIES[field]].append(criterion)
+                break
+
+    category_criteria: List[Node] = []
+    for criteria_in_category in category_groups.values():
+        if len(criteria_in_category) == 1:
+            category_criteria.append(criteria_in_category[0])
+        elif criteria_in_category:
+            category_criteria.append(And(criteria_in_category))
+    return category_criteria
 
 async def build_basic_filters(filter_request: HomestayFilterRequest) -> Dict[str, Any]:
     """🔧 ENHANCED: Build non-conflicting basic filters with PERFECT partial matching for location fields"""
     filters = {}
+    clauses = []  # compound conditions ($or groups), ANDed with `filters` at the end
     lang = filter_request.language or "en"
     
     # 🔧 ENHANCED LOCATION FILTERS: Implement perfect partial matching for ALL location fields
@@ -511,6 +533,13 @@ async def build_basic_filters(filter_request: HomestayFilterRequest) -> Dict[str
             return {}
         
         search_term = search_term.strip()
+
+        # Resolve against the gazetteer first: an exact $in on the stored names
+        # replaces the regex fan-out below whenever the term is recognised
+        resolved = gazetteer.resolve(field_base.split('.')[-1], search_term)
+        if resolved:
+            exact = [{f"{field_base}.{side}": {"$in": names}} for side, names in resolved.items() if names]
+            return exact[0] if len(exact) == 1 else {"$or": exact}
         
         # Create multiple search patterns for better matching
         patterns = []
@@ -661,49 +690,31 @@ async def build_basic_filters(filter_request: HomestayFilterRequest) -> Dict[str
         else:
             return {}
 
+    def resolve_location(field_base: str, search_term: str) -> Dict[str, Any]:
+        # Depends only on (field, term), so searches in one batch share the work
+        return memoized("location", (field_base, search_term),
+                        lambda: create_location_partial_match(field_base, search_term))
+
     # Apply enhanced location filtering
     if filter_request.province:
-        province_filter = create_location_partial_match("address.province", filter_request.province)
+        province_filter = resolve_location("address.province", filter_request.province)
         if province_filter:
-            if "$or" in filters:
-                # Combine with existing OR conditions
-                filters["$and"] = [{"$or": filters["$or"]}, province_filter]
-                del filters["$or"]
-            else:
-                filters.update(province_filter)
+            clauses.append(province_filter)
     
     if filter_request.district:
-        district_filter = create_location_partial_match("address.district", filter_request.district)
+        district_filter = resolve_location("address.district", filter_request.district)
         if district_filter:
-            if "$and" in filters:
-                filters["$and"].append(district_filter)
-            elif "$or" in filters:
-                filters["$and"] = [{"$or": filters["$or"]}, district_filter]
-                del filters["$or"]
-            else:
-                filters.update(district_filter)
+            clauses.append(district_filter)
     
     if filter_request.municipality:
-        municipality_filter = create_location_partial_match("address.municipality", filter_request.municipality)
+        municipality_filter = resolve_location("address.municipality", filter_request.municipality)
         if municipality_filter:
-            if "$and" in filters:
-                filters["$and"].append(municipality_filter)
-            elif "$or" in filters:
-                filters["$and"] = [{"$or": filters["$or"]}, municipality_filter]
-                del filters["$or"]
-            else:
-                filters.update(municipality_filter)
+            clauses.append(municipality_filter)
     
     if filter_request.ward:
-        ward_filter = create_location_partial_match("address.ward", filter_request.ward)
+        ward_filter = resolve_location("address.ward", filter_request.ward)
         if ward_filter:
-            if "$and" in filters:
-                filters["$and"].append(ward_filter)
-            elif "$or" in filters:
-                filters["$and"] = [{"$or": filters["$or"]}, ward_filter]
-                del filters["$or"]
-            else:
-                filters.update(ward_filter)
+            clauses.append(ward_filter)
 
     # 🔧 ENHANCED: City and village with partial matching too
     if filter_request.city:
@@ -720,13 +731,7 @@ async def build_basic_filters(filter_request: HomestayFilterRequest) -> Dict[str
         
         if city_or:
             city_filter = {"$or": city_or} if len(city_or) > 1 else city_or[0]
-            if "$and" in filters:
-                filters["$and"].append(city_filter)
-            elif "$or" in filters:
-                filters["$and"] = [{"$or": filters["$or"]}, city_filter]
-                del filters["$or"]
-            else:
-                filters.update(city_filter)
+            clauses.append(city_filter)
 
     if filter_request.village_name:
         # Village name with partial matching
@@ -742,13 +747,7 @@ async def build_basic_filters(filter_request: HomestayFilterRequest) -> Dict[str
         
         if village_or:
             village_filter = {"$or": village_or} if len(village_or) > 1 else village_or[0]
-            if "$and" in filters:
-                filters["$and"].append(village_filter)
-            elif "$or" in filters:
-                filters["$and"] = [{"$or": filters["$or"]}, village_filter]
-                del filters["$or"]
-            else:
-                filters.update(village_filter)
+            clauses.append(village_filter)
 
     # Enhanced homestay name matching
     if filter_request.homestay_name:
@@ -764,13 +763,7 @@ async def build_basic_filters(filter_request: HomestayFilterRequest) -> Dict[str
         
         if name_or:
             name_filter = {"$or": name_or} if len(name_or) > 1 else name_or[0]
-            if "$and" in filters:
-                filters["$and"].append(name_filter)
-            elif "$or" in filters:
-                filters["$and"] = [{"$or": filters["$or"]}, name_filter]
-                del filters["$or"]
-            else:
-                filters.update(name_filter)
+            clauses.append(name_filter)
 
     # Other basic filters (non-location)
     if filter_request.homestay_type:
@@ -804,116 +797,594 @@ async def build_basic_filters(filter_request: HomestayFilterRequest) -> Dict[str
     
     if filter_request.is_admin is not None:
         filters["isAdmin"] = filter_request.is_admin
+
+    # Full-text search: a MongoDB text index, or FTS5 on the SQLite backend
+    if filter_request.search_query:
+        filters["$text"] = {"$search": filter_request.search_query}
     
-    return filters
+    return compile_filter(And([parse_filter(clause) for clause in clauses] + [parse_filter(filters)]))
 
 
 async def filter_homestays(filter_request: HomestayFilterRequest) -> HomestayFilterResponse:
     """Main homestay filtering function"""
     return await enhanced_filter_homestays(filter_request)
 
+def build_relaxed_request(filter_request: HomestayFilterRequest) -> HomestayFilterRequest:
+    """Relaxed version of a request: must-have features become optional and the operator more permissive"""
+    relaxed_request = HomestayFilterRequest(**filter_request.dict())
+
+    # Move must-have features to optional to broaden results
+    def move_to_optional(any_field: str, must_field: str):
+        must_vals = getattr(relaxed_request, must_field)
+        if must_vals:
+            existing_any = getattr(relaxed_request, any_field) or []
+            # Merge and deduplicate while preserving order
+            merged = []
+            for v in existing_any + must_vals:
+                if v and v not in merged:
+                    merged.append(v)
+            setattr(relaxed_request, any_field, merged)
+            setattr(relaxed_request, must_field, None)
+
+    move_to_optional('any_local_attractions', 'local_attractions')
+    move_to_optional('any_infrastructure', 'infrastructure')
+    move_to_optional('any_tourism_services', 'tourism_services')
+
+    # Re-evaluate categories after moving
+    has_attractions = bool(relaxed_request.local_attractions or relaxed_request.any_local_attractions)
+    has_infrastructure = bool(relaxed_request.infrastructure or relaxed_request.any_infrastructure)
+    has_tourism = bool(relaxed_request.tourism_services or relaxed_request.any_tourism_services)
+    feature_type_count = sum([has_attractions, has_infrastructure, has_tourism])
+
+    # Choose a more permissive operator
+    relaxed_request.logical_operator = "MIXED" if feature_type_count > 1 else "OR"
+    return relaxed_request
+
+def build_sort_criteria(filter_request: HomestayFilterRequest) -> List[tuple]:
+    """Sort specification for a request (default: average rating, then newest).
+
+    `_id` is always the final tiebreaker so the order is total, which keyset
+    cursors rely on. `sort_by="relevance"` orders by the pipeline-computed score
+    (best first, whatever `sort_order` says), then rating.
+    """
+    if filter_request.sort_by == RELEVANCE_SORT:
+        return [(RELEVANCE_FIELD, -1), ("averageRating", -1), ("_id", -1)]
+    if filter_request.sort_by:
+        sort_direction = 1 if filter_request.sort_order == "asc" else -1
+        return [(filter_request.sort_by, sort_direction), ("_id", sort_direction)]
+    # Default sorting by average rating (descending) and creation date
+    return [("averageRating", -1), ("createdAt", -1), ("_id", -1)]
+
+SEARCH_PROJECTION = {"homestayId": 1, "homeStayName": 1, "_id": 0}
+
+def pagination_key(filter_request: HomestayFilterRequest) -> str:
+    """Identity of a search for cursor validation (page position and size excluded)"""
+    return canonical_request_key(filter_request.copy(update={"cursor": None, "skip": 0, "limit": None}))[:16]
+
+def search_execution_mode() -> str:
+    """'facet' (one aggregation round trip, default) or 'classic' (count + find, run concurrently)"""
+    mode = os.getenv("HOMESTAY_SEARCH_EXECUTION", "facet").lower()
+    return mode if mode in ("facet", "classic") else "facet"
+
+def build_facet_pipeline(query_filter: Dict[str, Any], relaxed_filter: Optional[Dict[str, Any]],
+                         sort_criteria: List[tuple], skip: int, limit: int,
+                         score: Optional[Dict[str, Any]] = None,
+                         after: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """$match + $facet pipeline yielding the count and page (and relaxed count/page) of a search.
+
+    `score` adds the relevance field before the page is sorted; `after` is a keyset
+    predicate applied to the page only (it may refer to the score).
+    """
+    page_stages = []
+    if score is not None:
+        page_stages.append({"$addFields": {RELEVANCE_FIELD: score}})
+    if after is not None:
+        page_stages.append({"$match": after})
+    page_stages += [
+        {"$sort": dict(sort_criteria)},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": search_projection(sort_criteria)},
+    ]
+    if relaxed_filter is None:
+        match_stage = query_filter
+        facets = {
+            "count": [{"$count": "n"}],
+            "page": page_stages,
+        }
+    else:
+        # Strict and relaxed filters share one collection scan
+        match_stage = {"$or": [query_filter, relaxed_filter]}
+        facets = {
+            "count": [{"$match": query_filter}, {"$count": "n"}],
+            "page": [{"$match": query_filter}] + page_stages,
+            "relaxedCount": [{"$match": relaxed_filter}, {"$count": "n"}],
+            "relaxedPage": [{"$match": relaxed_filter}] + page_stages,
+        }
+    return [{"$match": match_stage}, {"$facet": facets}]
+
+async def execute_facet_search(backend: MotorBackend, query_filter: Dict[str, Any], relaxed_filter: Optional[Dict[str, Any]],
+                               sort_criteria: List[tuple], skip: int, limit: int,
+                               score: Optional[Dict[str, Any]] = None,
+                               after: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Filtered count, sorted page and relaxed-fallback count/page from a single $facet aggregation"""
+    pipeline = build_facet_pipeline(query_filter, relaxed_filter, sort_criteria, skip, limit, score, after)
+    collection = backend.collection
+    facet_result, total_count = await asyncio.gather(
+        metrics.timed("facet_aggregate", collection.aggregate(pipeline, allowDiskUse=True, collation=backend.collation).to_list(length=1)),
+        metrics.timed("total_count", backend.estimated_count()),
+    )
+    result = facet_result[0] if facet_result else {}
+
+    def count_of(name: str) -> int:
+        rows = result.get(name) or []
+        return rows[0]["n"] if rows else 0
+
+    return {
+        "filtered_count": count_of("count"),
+        "page": result.get("page") or [],
+        "relaxed_count": count_of("relaxedCount") if relaxed_filter is not None else 0,
+        "relaxed_page": result.get("relaxedPage") or [],
+        "total_count": total_count,
+    }
+
+def _discard(task: "asyncio.Future"):
+    """Drop a speculative query whose result is not needed, without leaving its exception unretrieved"""
+    task.cancel()
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+async def execute_classic_search(backend: HomestayBackend, query_filter: Dict[str, Any], relaxed_filter: Optional[Dict[str, Any]],
+                                 sort_criteria: List[tuple], skip: int, limit: int) -> Dict[str, Any]:
+    """count + find page, with the independent queries issued concurrently"""
+    async def zero():
+        return 0
+
+    # The relaxed page is fetched speculatively too, so a zero-result search needs no second round trip
+    relaxed_find = None
+    if relaxed_filter is not None:
+        relaxed_find = asyncio.ensure_future(
+            metrics.timed("relaxed_find", backend.find_page(relaxed_filter, sort_criteria, skip, limit)))
+
+    # Strict count, speculative relaxed count, total count and the strict page are independent
+    try:
+        filtered_count, relaxed_count, total_count, page = await asyncio.gather(
+            metrics.timed("count_documents", backend.count(query_filter)),
+            metrics.timed("relaxed_count", backend.count(relaxed_filter) if relaxed_filter is not None else zero()),
+            metrics.timed("total_count", backend.estimated_count()),
+            metrics.timed("find", backend.find_page(query_filter, sort_criteria, skip, limit)),
+        )
+    except BaseException:
+        if relaxed_find is not None:
+            _discard(relaxed_find)
+        raise
+    relaxed_page = []
+    if relaxed_find is not None:
+        if filtered_count == 0 and relaxed_count > 0:
+            relaxed_page = await relaxed_find
+        else:
+            _discard(relaxed_find)
+
+    return {
+        "filtered_count": filtered_count,
+        "page": page,
+        "relaxed_count": relaxed_count,
+        "relaxed_page": relaxed_page,
+        "total_count": total_count,
+    }
+
+def ranked_search_pipelines(plan: "SearchPlan") -> List[List[Dict[str, Any]]]:
+    """Aggregations for a relevance-ranked search: the score is computed after $match,
+    and $sort + $limit keep only the top rows, so the page is ranked server-side.
+
+    Cursor pages compare their position against the score inside the pipeline.
+    """
+    score = plan.relevance_score
+    if plan.cursor_position is not None:
+        base_filter = plan.relaxed_query_filter if plan.cursor_relaxed else plan.query_filter
+        after = keyset_filter(plan.sort_criteria, plan.cursor_position)
+        return [build_facet_pipeline(base_filter, None, plan.sort_criteria, 0, plan.limit, score, after)]
+    if plan.relaxed_query_filter is not None and "$text" in plan.query_filter:
+        # $text cannot sit inside the shared $or, so strict and relaxed run as separate aggregations
+        return [build_facet_pipeline(plan.query_filter, None, plan.sort_criteria, plan.skip, plan.limit, score),
+                build_facet_pipeline(plan.relaxed_query_filter, None, plan.sort_criteria, plan.skip, plan.limit, score)]
+    return [build_facet_pipeline(plan.query_filter, plan.relaxed_query_filter, plan.sort_criteria,
+                                 plan.skip, plan.limit, score)]
+
+async def execute_ranked_search(backend: MotorBackend, plan: "SearchPlan") -> Dict[str, Any]:
+    """Relevance-ranked count and page (see ranked_search_pipelines)"""
+    collection = backend.collection
+
+    async def aggregate(pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+        rows = await collection.aggregate(pipeline, allowDiskUse=True, collation=backend.collation).to_list(length=1)
+        return rows[0] if rows else {}
+
+    pipelines = ranked_search_pipelines(plan)
+    total_count, *results = await asyncio.gather(
+        metrics.timed("total_count", backend.estimated_count()),
+        *(metrics.timed("ranked_aggregate", aggregate(pipeline)) for pipeline in pipelines),
+    )
+
+    def count_of(result: Dict[str, Any], name: str) -> int:
+        rows = result.get(name) or []
+        return rows[0]["n"] if rows else 0
+
+    strict = results[0]
+    relaxed = results[1] if len(results) > 1 else strict
+    relaxed_name = "count" if len(results) > 1 else "relaxedCount"
+    has_relaxed = plan.cursor_position is None and plan.relaxed_query_filter is not None
+    return {
+        "filtered_count": count_of(strict, "count"),
+        "page": strict.get("page") or [],
+        "relaxed_count": count_of(relaxed, relaxed_name) if has_relaxed else 0,
+        "relaxed_page": (relaxed.get("page" if len(results) > 1 else "relaxedPage") or []) if has_relaxed else [],
+        "total_count": total_count,
+    }
+
+def keyset_page_filter(plan: "SearchPlan") -> Dict[str, Any]:
+    """The (strict or relaxed) filter a cursor continues, narrowed to the rows after its position"""
+    base_filter = plan.relaxed_query_filter if plan.cursor_relaxed else plan.query_filter
+    return {"$and": [base_filter, keyset_filter(plan.sort_criteria, plan.cursor_position)]}
+
+async def execute_keyset_search(backend: HomestayBackend, plan: "SearchPlan") -> Dict[str, Any]:
+    """Next page after a cursor: a range predicate on the sort keys instead of skip, gathered with the count"""
+    base_filter = plan.relaxed_query_filter if plan.cursor_relaxed else plan.query_filter
+    filtered_count, total_count, page = await asyncio.gather(
+        metrics.timed("count_documents", backend.count(base_filter)),
+        metrics.timed("total_count", backend.estimated_count()),
+        metrics.timed("find", backend.find_page(keyset_page_filter(plan), plan.sort_criteria, 0, plan.limit)),
+    )
+    return {
+        "filtered_count": filtered_count,
+        "page": page,
+        "relaxed_count": 0,
+        "relaxed_page": [],
+        "total_count": total_count,
+    }
+
+def execute_columnar_search(plan: "SearchPlan") -> Optional[Dict[str, Any]]:
+    """Answer from the in-process columnar snapshot; None when it is stale or cannot evaluate the filter.
+
+    The snapshot evaluates the logical filters itself, so it gets them before the
+    feature index rewrite.
+    """
+    if not columnar_index.available:
+        return None
+    with metrics.stage("columnar"):
+        if plan.mode == "keyset":
+            base_filter = plan.relaxed_filter if plan.cursor_relaxed else plan.mongo_filter
+            page_filter = {"$and": [base_filter, keyset_filter(plan.sort_criteria, plan.cursor_position)]}
+            return columnar_index.keyset_search(base_filter, page_filter, plan.sort_criteria, plan.limit,
+                                                SEARCH_COLLATION)
+        return columnar_index.search(plan.mongo_filter, plan.relaxed_filter, plan.sort_criteria,
+                                     plan.skip, plan.limit, SEARCH_COLLATION)
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Winning plan and execution stats from a find or aggregate explain"""
+    # Aggregations report the $match part of the pipeline under the first stage's $cursor
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            explain = stage["$cursor"]
+            break
+    nodes = plan_nodes(explain.get("queryPlanner", {}).get("winningPlan", {}))
+    stages = [node["stage"] for node in nodes]
+    stats = explain.get("executionStats", {})
+    return {
+        "winning_stage": stages[0] if stages else None,
+        "stages": stages,
+        "indexes": [node["indexName"] for node in nodes if node.get("indexName")],
+        "collscan": "COLLSCAN" in stages,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_time_ms": stats.get("executionTimeMillis"),
+    }
+
+def _printable_filter(mongo_filter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Filter with the feature index's `_id` list collapsed to its size"""
+    if not mongo_filter:
+        return mongo_filter
+    printable = {}
+    for key, value in mongo_filter.items():
+        if key == "_id" and isinstance(value, dict) and isinstance(value.get("$in"), list):
+            printable[key] = {"$in": f"<{len(value['$in'])} ids from the feature index>"}
+        elif key == "$and" and isinstance(value, list):
+            printable[key] = [_printable_filter(part) for part in value]
+        else:
+            printable[key] = value
+    return printable
+
+async def explain_search(filter_request: HomestayFilterRequest, dry_run: bool = False) -> Dict[str, Any]:
+    """Explain the query a search would run.
+
+    With `dry_run` only the query planner is consulted (nothing is executed) and the
+    cost is estimated from the plan; otherwise the query runs under
+    explain("executionStats") and the normal search response is included.
+    """
+    plan = await prepare_search(filter_request)
+    if not isinstance(plan.backend, MotorBackend):
+        raise ValueError(f"explain_search needs the MongoDB backend (HOMESTAY_SEARCH_BACKEND={plan.backend.name})")
+    collection = db_instance.homestays
+    if plan.mode == "ranked":
+        command = {
+            "aggregate": collection.name,
+            "pipeline": ranked_search_pipelines(plan)[0],
+            "cursor": {},
+            "allowDiskUse": True,
+            "collation": SEARCH_COLLATION,
+        }
+    elif plan.mode == "keyset":
+        command = {
+            "find": collection.name,
+            "filter": keyset_page_filter(plan),
+            "sort": dict(plan.sort_criteria),
+            "limit": plan.limit,
+            "projection": search_projection(plan.sort_criteria),
+            "collation": SEARCH_COLLATION,
+        }
+    elif plan.mode == "facet":
+        command = {
+            "aggregate": collection.name,
+            "pipeline": build_facet_pipeline(plan.query_filter, plan.relaxed_query_filter,
+                                             plan.sort_criteria, plan.skip, plan.limit),
+            "cursor": {},
+            "allowDiskUse": True,
+            "collation": SEARCH_COLLATION,
+        }
+    else:
+        command = {
+            "find": collection.name,
+            "filter": plan.query_filter,
+            "sort": dict(plan.sort_criteria),
+            "skip": plan.skip,
+            "limit": plan.limit,
+            "projection": search_projection(plan.sort_criteria),
+            "collation": SEARCH_COLLATION,
+        }
+    verbosity = "queryPlanner" if dry_run else "executionStats"
+    explain, total_count = await asyncio.gather(
+        db_instance.db.command({"explain": command, "verbosity": verbosity}),
+        collection.estimated_document_count(),
+    )
+    summary = summarize_explain(explain)
+
+    regex_clauses = count_regex_clauses(plan.query_filter)
+    result = {
+        "dry_run": dry_run,
+        "execution": plan.mode,
+        "applied_filters": plan.mongo_filter,
+        "query_filter": _printable_filter(plan.query_filter),
+        "relaxed_filter": _printable_filter(plan.relaxed_query_filter),
+        "regex_clauses": regex_clauses,
+        "relaxed_regex_clauses": count_regex_clauses(plan.relaxed_query_filter) if plan.relaxed_query_filter else 0,
+        "plan": summary,
+    }
+    if dry_run:
+        # Without executing, a collection scan is bounded by the collection size
+        # and every scanned document may evaluate every regex clause
+        result["estimated_cost"] = {
+            "collection_documents": total_count,
+            "docs_examined_upper_bound": total_count if summary["collscan"] else None,
+            "regex_evaluations_upper_bound": total_count * regex_clauses if summary["collscan"] else None,
+        }
+    else:
+        response = await execute_filter_homestays(filter_request)
+        result["response"] = response.dict()
+    return result
+
+class SearchPlan:
+    """Everything needed to execute (or explain) one search request"""
+
+    def __init__(self, filter_request: HomestayFilterRequest, mongo_filter: Dict[str, Any],
+                 relaxed_request: Optional[HomestayFilterRequest], relaxed_filter: Optional[Dict[str, Any]],
+                 backend: Optional[HomestayBackend] = None):
+        self.filter_request = filter_request
+        self.backend = backend if backend is not None else search_backend()
+        # Logical filter, reported in appliedFilters
+        self.mongo_filter = mongo_filter
+        self.relaxed_request = relaxed_request
+        self.relaxed_filter = relaxed_filter
+        if self.backend.uses_feature_index:
+            # Feature regexes become indexed integer predicates once featureIds are backfilled;
+            # until then the bitset index resolves feature logic in-process when it is warm
+            rewrite = feature_catalog.rewrite if feature_catalog.ready else feature_index.rewrite
+            self.query_filter = rewrite(mongo_filter)
+            self.relaxed_query_filter = rewrite(relaxed_filter) if relaxed_filter is not None else None
+        else:
+            self.query_filter, self.relaxed_query_filter = mongo_filter, relaxed_filter
+        # Relevance scores are computed in the aggregation pipeline; other backends keep the rating order
+        self.relevance_score: Optional[Dict[str, Any]] = None
+        if filter_request.sort_by == RELEVANCE_SORT and self.backend.supports_facet:
+            self.relevance_score = build_relevance_score(filter_request)
+            self.sort_criteria = build_sort_criteria(filter_request)
+        else:
+            self.sort_criteria = build_sort_criteria(
+                filter_request.copy(update={"sort_by": None}) if filter_request.sort_by == RELEVANCE_SORT
+                else filter_request)
+        self.skip = filter_request.skip or 0
+        self.limit = filter_request.limit or 100
+        self.search_key = pagination_key(filter_request)
+        self.cursor_position: Optional[List[Any]] = None
+        self.cursor_relaxed = False
+        if filter_request.cursor:
+            # Continue where a previous page stopped; the strict/relaxed choice was made on page one
+            self.cursor_position, self.cursor_relaxed = decode_cursor(
+                filter_request.cursor, self.sort_criteria, self.search_key)
+            if self.cursor_relaxed and relaxed_filter is None:
+                raise InvalidCursorError("Cursor refers to a relaxed search this request does not have")
+        if self.relevance_score is not None:
+            # First and cursor pages alike: the score only exists inside the pipeline
+            self.mode = "ranked"
+        elif self.cursor_position is not None:
+            self.mode = "keyset"
+        elif "$text" in mongo_filter or not self.backend.supports_facet:
+            # $text must be the first stage of a pipeline, so it cannot live inside $facet
+            self.mode = "classic"
+        else:
+            self.mode = search_execution_mode()
+
+    def relaxed_only(self) -> "SearchPlan":
+        """This plan with the relaxed filter as its only filter (the strict one is known to match nothing)"""
+        plan = copy.copy(self)
+        plan.mongo_filter, plan.query_filter = self.relaxed_filter, self.relaxed_query_filter
+        plan.relaxed_request = plan.relaxed_filter = plan.relaxed_query_filter = None
+        return plan
+
+async def prepare_search(filter_request: HomestayFilterRequest) -> SearchPlan:
+    """Build the strict filter and, up front, the relaxed fallback so both can run in one round trip"""
+    mongo_filter = await build_enhanced_mongodb_filter(filter_request)
+    relaxed_request = build_relaxed_request(filter_request)
+    relaxed_filter = await build_enhanced_mongodb_filter(relaxed_request)
+    if relaxed_filter == mongo_filter:
+        relaxed_request = relaxed_filter = None
+    return SearchPlan(filter_request, mongo_filter, relaxed_request, relaxed_filter)
+
 async def enhanced_filter_homestays(filter_request: HomestayFilterRequest) -> HomestayFilterResponse:
+    """Cached entry point: identical (canonicalized) requests share one execution and its result"""
+    if not search_cache_enabled():
+        return await execute_filter_homestays(filter_request)
+    return await search_cache.get_or_compute(
+        canonical_request_key(filter_request),
+        lambda: execute_filter_homestays(filter_request),
+    )
+
+def search_batch_concurrency() -> int:
+    return max(1, int(os.getenv("HOMESTAY_BATCH_CONCURRENCY", "4")))
+
+async def execute_search_batch(filter_requests: List[HomestayFilterRequest]) -> List[HomestayFilterResponse]:
+    """Run several searches concurrently (bounded by HOMESTAY_BATCH_CONCURRENCY), once per distinct request.
+
+    Results come back in input order. A failing search yields an empty response
+    whose suggestions carry the error instead of failing the whole batch.
+    """
+    semaphore = asyncio.Semaphore(search_batch_concurrency())
+    keys = [canonical_request_key(filter_request) for filter_request in filter_requests]
+    distinct = dict(zip(keys, filter_requests))
+
+    async def run(filter_request: HomestayFilterRequest) -> HomestayFilterResponse:
+        async with semaphore:
+            try:
+                return await enhanced_filter_homestays(filter_request)
+            except Exception as e:
+                return HomestayFilterResponse(
+                    homestayUsernames=[],
+                    homestayNames=[],
+                    totalCount=0,
+                    filteredCount=0,
+                    appliedFilters={},
+                    suggestions=[f"Search failed: {e}"],
+                )
+
+    results = await asyncio.gather(*(run(filter_request) for filter_request in distinct.values()))
+    by_key = dict(zip(distinct, results))
+    log.info("search.batch", searches=len(filter_requests), distinct=len(distinct))
+    return [by_key[key] for key in keys]
+
+async def execute_plan(plan: SearchPlan) -> Tuple[Dict[str, Any], str]:
+    """Counts and page(s) for a plan, from the columnar snapshot when it can answer; returns (result, engine)"""
+    result = execute_columnar_search(plan) if plan.mode != "ranked" else None
+    if result is not None:
+        return result, "columnar"
+    backend = plan.backend
+    if plan.mode == "ranked":
+        result = await execute_ranked_search(backend, plan)
+    elif plan.mode == "keyset":
+        result = await execute_keyset_search(backend, plan)
+    elif plan.mode == "facet":
+        result = await execute_facet_search(backend, plan.query_filter, plan.relaxed_query_filter,
+                                            plan.sort_criteria, plan.skip, plan.limit)
+    else:
+        result = await execute_classic_search(backend, plan.query_filter, plan.relaxed_query_filter,
+                                              plan.sort_criteria, plan.skip, plan.limit)
+    return result, backend.name
+
+async def execute_known_empty(plan: SearchPlan) -> Optional[Tuple[Dict[str, Any], str]]:
+    """First page of a search whose strict filter the negative cache knows to be empty (else None).
+
+    Only the relaxed filter is executed, and not even that when it is known empty too.
+    """
+    scope = plan.backend.name
+    total_count = negative_cache.lookup(scope, plan.mongo_filter)
+    if total_count is None:
+        return None
+    result = {"filtered_count": 0, "page": [], "relaxed_count": 0, "relaxed_page": [], "total_count": total_count}
+    if plan.relaxed_filter is None or negative_cache.lookup(scope, plan.relaxed_filter) is not None:
+        return result, "negative_cache"
+    relaxed, engine = await execute_plan(plan.relaxed_only())
+    result.update(relaxed_count=relaxed["filtered_count"], relaxed_page=relaxed["page"],
+                  total_count=relaxed["total_count"])
+    return result, engine
+
+async def execute_filter_homestays(filter_request: HomestayFilterRequest) -> HomestayFilterResponse:
     """Enhanced homestay filtering with DETAILED DEBUGGING"""
     try:
-        print(f"🔍 INPUT - Filter Request: {filter_request.dict(exclude_none=True)}")
-        
-        # Build MongoDB filter
-        mongo_filter = await build_enhanced_mongodb_filter(filter_request)
-        print(f"🔍 MONGODB - Generated Filter: {mongo_filter}")
-        
-        collection = db_instance.homestays
-
-        # Test individual components
-        if mongo_filter.get("$or"):
-            print(f"🔍 OR CONDITIONS - Count: {len(mongo_filter['$or'])}")
-            for i, condition in enumerate(mongo_filter["$or"]):
-                test_count = await collection.count_documents(condition)
-                print(f"🔍 OR[{i}] - {condition} → Count: {test_count}")
-        
-        # Execute main query
-        filtered_count = await collection.count_documents(mongo_filter)
-        print(f"🔍 RESULT - Filtered count: {filtered_count}")
+        log.debug("search.input", request=lambda: filter_request.dict(exclude_none=True))
+
+        with metrics.stage("filter_build"):
+            plan = await prepare_search(filter_request)
+        mongo_filter = plan.mongo_filter
+        relaxed_request, relaxed_filter = plan.relaxed_request, plan.relaxed_filter
+        log.debug("search.filter", filter=lambda: str(mongo_filter))
+
+        backend = plan.backend
+        mode = plan.mode
+        first_page = plan.cursor_position is None
+        use_negative_cache = first_page and negative_cache_enabled()
+        generation = negative_cache.generation
+        known_empty = await execute_known_empty(plan) if use_negative_cache else None
+        if known_empty is not None:
+            result, engine = known_empty
+        else:
+            result, engine = await execute_plan(plan)
+
+        filtered_count = result["filtered_count"]
+        homestays = result["page"]
+        total_count = result["total_count"]
+        log.info("search.result", filtered=filtered_count, execution=mode, engine=engine,
+                 strict_skipped=known_empty is not None)
+
+        if use_negative_cache and filtered_count == 0:
+            # Remember empty filters so the next search with the same one skips straight past it
+            negative_cache.add(backend.name, mongo_filter, total_count, generation)
+            if relaxed_filter is not None and result["relaxed_count"] == 0:
+                negative_cache.add(backend.name, relaxed_filter, total_count, generation)
         
-        # If no results, run diagnostic queries
-        if filtered_count == 0:
-            await run_diagnostic_queries(filter_request, mongo_filter)
+        relaxed_applied = False
+        if plan.cursor_relaxed:
+            # Later pages of a search that fell back to the relaxed filter on page one
+            filter_request = relaxed_request
+            mongo_filter = relaxed_filter
+            relaxed_applied = True
+
+        # If no results, a sampled background task logs why (the columnar engine never goes to the
+        # database, and a filter already known to be empty has been seen before)
+        if filtered_count == 0 and first_page and engine != "columnar" and known_empty is None:
+            zero_result_diagnostics.maybe_schedule(filter_request, mongo_filter, backend)
         
         # --- RELAXED FALLBACK: Broaden search if no results ---
-        relaxed_applied = False
-        if filtered_count == 0:
-            # Prepare a relaxed version of the request
-            relaxed_request = HomestayFilterRequest(**filter_request.dict())
-
-            # Determine present categories
-            has_attractions = bool(relaxed_request.local_attractions or relaxed_request.any_local_attractions)
-            has_infrastructure = bool(relaxed_request.infrastructure or relaxed_request.any_infrastructure)
-            has_tourism = bool(relaxed_request.tourism_services or relaxed_request.any_tourism_services)
-
-            # Move must-have features to optional to broaden results
-            def move_to_optional(any_field: str, must_field: str):
-                must_vals = getattr(relaxed_request, must_field)
-                if must_vals:
-                    existing_any = getattr(relaxed_request, any_field) or []
-                    # Merge and deduplicate while preserving order
-                    merged = []
-                    for v in existing_any + must_vals:
-                        if v and v not in merged:
-                            merged.append(v)
-                    setattr(relaxed_request, any_field, merged)
-                    setattr(relaxed_request, must_field, None)
-
-            move_to_optional('any_local_attractions', 'local_attractions')
-            move_to_optional('any_infrastructure', 'infrastructure')
-            move_to_optional('any_tourism_services', 'tourism_services')
-
-            # Re-evaluate categories after moving
-            has_attractions = bool(relaxed_request.local_attractions or relaxed_request.any_local_attractions)
-            has_infrastructure = bool(relaxed_request.infrastructure or relaxed_request.any_infrastructure)
-            has_tourism = bool(relaxed_request.tourism_services or relaxed_request.any_tourism_services)
-            feature_type_count = sum([has_attractions, has_infrastructure, has_tourism])
-
-            # Choose a more permissive operator
-            relaxed_request.logical_operator = "MIXED" if feature_type_count > 1 else "OR"
-
-            # Build and test relaxed filter
-            relaxed_filter = await build_enhanced_mongodb_filter(relaxed_request)
-            print(f"🔍 RELAXED - Generated Filter: {relaxed_filter}")
-            relaxed_count = await collection.count_documents(relaxed_filter)
-            print(f"🔍 RELAXED - Filtered count: {relaxed_count}")
-
-            if relaxed_count > 0:
+        if filtered_count == 0 and relaxed_filter is not None and first_page:
+            log.debug("search.relaxed", filter=lambda: str(relaxed_filter), filtered=result["relaxed_count"])
+
+            if result["relaxed_count"] > 0:
                 # Adopt relaxed results
                 filter_request = relaxed_request
                 mongo_filter = relaxed_filter
-                filtered_count = relaxed_count
+                filtered_count = result["relaxed_count"]
+                homestays = result["relaxed_page"]
                 relaxed_applied = True
-                print("🔧 Applied relaxed search: converted must-have features to optional and switched logical operator for broader results")
-        
-        # Get total count
-        total_count = await collection.count_documents({})
-
-        # Execute query with sorting
-        sort_criteria = []
-        if filter_request.sort_by:
-            sort_direction = 1 if filter_request.sort_order == "asc" else -1
-            sort_criteria.append((filter_request.sort_by, sort_direction))
-        else:
-            # Default sorting by average rating (descending) and creation date
-            sort_criteria = [("averageRating", -1), ("createdAt", -1)]
-        
-        cursor = collection.find(
-            mongo_filter,
-            {"homestayId": 1, "homeStayName": 1, "_id": 0}
-        ).sort(sort_criteria).skip(filter_request.skip or 0).limit(filter_request.limit or 100)
+                log.info("search.relaxed_applied", filtered=filtered_count, operator=filter_request.logical_operator)
         
         # Extract usernames
-        homestays = await cursor.to_list(length=None)
         usernames = [homestay.get("homestayId") for homestay in homestays if homestay.get("homestayId")]
         homestay_names = [homestay.get("homeStayName") for homestay in homestays if homestay.get("homeStayName")]
         
+        # A full page may have a successor: hand out a keyset cursor positioned after its last row
+        next_cursor = None
+        if homestays and len(homestays) >= plan.limit:
+            next_cursor = encode_cursor(plan.sort_criteria, homestays[-1], plan.search_key, relaxed_applied)
+
         # Generate suggestions for better filtering
-        suggestions = await generate_filter_suggestions(filter_request, filtered_count)
-        if 'relaxed_applied' in locals() and relaxed_applied:
+        suggestions = await metrics.timed("suggestions", generate_filter_suggestions(filter_request, filtered_count))
+        if relaxed_applied:
             suggestions.insert(0, f"Applied relaxed search automatically (operator={filter_request.logical_operator}). Consider specifying fewer must-have features or using any_* lists.")
         
         return HomestayFilterResponse(
@@ -922,46 +1393,16 @@ async def enhanced_filter_homestays(filter_request: HomestayFilterRequest) -> Ho
             totalCount=total_count,
             filteredCount=filtered_count,
             appliedFilters=mongo_filter,
-            suggestions=suggestions
+            suggestions=suggestions,
+            nextCursor=next_cursor
         )
         
+    except InvalidCursorError:
+        raise
     except Exception as e:
-        # Add more detailed error logging
-        import traceback
-        print(f"💥 ERROR in enhanced_filter_homestays: {e}")
-        print(traceback.format_exc())
+        log.error("search.failed", error=str(e), exc_info=True)
         raise Exception(f"Error filtering homestays: {str(e)}")
 
-async def run_diagnostic_queries(filter_request, mongo_filter):
-    """Run diagnostic queries to understand why no results found"""
-    collection = db_instance.homestays
-    
-    # Test without status filter
-    no_status_filter = {k: v for k, v in mongo_filter.items() if k != 'status'}
-    if no_status_filter:
-        count = await collection.count_documents(no_status_filter)
-        print(f"🔍 DIAGNOSTIC - Without status filter: {count}")
-    
-    # Test with broader regex patterns
-    if filter_request.any_local_attractions:
-        for attraction in filter_request.any_local_attractions:
-            if isinstance(attraction, str) and attraction.strip():
-                # Get the first word properly - FIXED
-                words = attraction.strip().split()
-                first_word = words[0] if words else attraction.strip()
-                
-                try:
-                    broad_filter = {
-                        "features.localAttractions": {
-                            "$regex": re.escape(first_word),  # ✅ Now first_word is guaranteed to be a string
-                            "$options": "i"
-                        }
-                    }
-                    count = await collection.count_documents(broad_filter)
-                    print(f"🔍 DIAGNOSTIC - Broad match '{first_word}': {count}")
-                except Exception as e:
-                    print(f"🔍 DIAGNOSTIC - Error testing '{attraction}': {e}")
-
 async def generate_filter_suggestions(filter_request: HomestayFilterRequest, filtered_count: int) -> List[str]:
     """Generate helpful suggestions for improving filter results"""
     suggestions = []
@@ -982,77 +1423,106 @@ async def generate_filter_suggestions(filter_request: HomestayFilterRequest, fil
 async def get_homestay_stats() -> Dict[str, Any]:
     """
     Get basic statistics about homestays in the database.
+
+    Served from the materialized counters in stats.py when they are loaded;
+    otherwise computed by the search backend with one aggregation.
     
     Returns:
         Dictionary containing homestay statistics
     """
+    if homestay_stats.ready:
+        with metrics.stage("stats_snapshot"):
+            return homestay_stats.snapshot()
     try:
-        # Use existing database connection
-        collection = db_instance.homestays
-        
-        # Validate collection availability
-        if collection is None or not db_instance.is_connected:
-            raise Exception("Database not connected. Please ensure the server is properly initialized.")
-        
-        # Aggregate statistics
-        pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "total_homestays": {"$sum": 1},
-                    "approved_homestays": {
-                        "$sum": {"$cond": [{"$eq": ["$status", "approved"]}, 1, 0]}
-                    },
-                    "pending_homestays": {
-                        "$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}
-                    },
-                    "rejected_homestays": {
-                        "$sum": {"$cond": [{"$eq": ["$status", "rejected"]}, 1, 0]}
-                    },
-                    "community_homestays": {
-                        "$sum": {"$cond": [{"$eq": ["$homeStayType", "community"]}, 1, 0]}
-                    },
-                    "private_homestays": {
-                        "$sum": {"$cond": [{"$eq": ["$homeStayType", "private"]}, 1, 0]}
-                    },
-                    "verified_homestays": {
-                        "$sum": {"$cond": [{"$eq": ["$isVerified", True]}, 1, 0]}
-                    },
-                    "featured_homestays": {
-                        "$sum": {"$cond": [{"$eq": ["$isFeatured", True]}, 1, 0]}
-                    },
-                    "avg_rating": {"$avg": "$averageRating"},
-                    "avg_rooms": {"$avg": "$roomCount"},
-                    "avg_beds": {"$avg": "$bedCount"}
-                }
-            }
-        ]
-        
-        result = await collection.aggregate(pipeline).to_list(length=1)
-        
-        if result:
-            stats = result[0]
-            stats.pop("_id", None)  # Remove the _id field
-            return stats
-        else:
-            return {
-                "total_homestays": 0,
-                "approved_homestays": 0,
-                "pending_homestays": 0,
-                "rejected_homestays": 0,
-                "community_homestays": 0,
-                "private_homestays": 0,
-                "verified_homestays": 0,
-                "featured_homestays": 0,
-                "avg_rating": 0,
-                "avg_rooms": 0,
-                "avg_beds": 0
-            }
+        # One aggregation (or the replica's equivalent SQL) over the whole collection
+        stats = await metrics.timed("stats_aggregate", search_backend().aggregate_stats())
+        stats["as_of"] = datetime.now(timezone.utc).isoformat()
+        stats["last_reconciled_at"] = stats["as_of"]
+        stats["live"] = False
+        return stats
             
     except Exception as e:
         raise Exception(f"Error getting homestay statistics: {str(e)}")
 
 
+# Public listing fields get_homestays_by_ids may return; anything else (owner contact and registration
+# details, credentials, internal bookkeeping) stays server-side
+DETAIL_FIELDS = ("homestayId", "homeStayName", "villageName", "homeStayType", "address", "averageRating", "features")
+DEFAULT_DETAIL_FIELDS = DETAIL_FIELDS
+
+
+def detail_fields(fields: Optional[List[str]]) -> List[str]:
+    """Validated projection paths (dotted sub-fields allowed); homestayId is always included"""
+    requested = [f.strip() for f in fields or DEFAULT_DETAIL_FIELDS if isinstance(f, str) and f.strip()]
+    unknown = [f for f in requested if f.split(".", 1)[0] not in DETAIL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown or restricted fields: {unknown}. Allowed: {list(DETAIL_FIELDS)}")
+    return list(dict.fromkeys(["homestayId", *requested]))
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def project_document(document: Dict[str, Any], paths: List[str]) -> Dict[str, Any]:
+    """The requested (possibly dotted) paths of a cached document, nested as in the document"""
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        parts = path.split(".")
+        value: Any = document
+        for part in parts:
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is None:
+            continue
+        target = projected
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = _jsonable(value)
+    return projected
+
+
+def max_detail_ids() -> int:
+    return max(1, int(os.getenv("HOMESTAY_DETAILS_MAX_IDS", "100")))
+
+
+def detail_statuses() -> List[str]:
+    """Listing statuses get_homestays_by_ids serves; other homestays are reported as not found"""
+    statuses = [s.strip() for s in os.getenv("HOMESTAY_DETAILS_STATUSES", "approved").split(",") if s.strip()]
+    return statuses or ["approved"]
+
+
+async def get_homestays_by_ids(homestay_ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Details of the given homestays, in input order, with a caller-selected projection.
+
+    Documents (all DETAIL_FIELDS) come from the per-homestay cache; the misses are
+    loaded with a single `$in` query and cached until a change stream touches them.
+    Only approved homestays are served unless HOMESTAY_DETAILS_STATUSES allows more.
+    """
+    paths = detail_fields(fields)
+    ids = [str(homestay_id).strip() for homestay_id in homestay_ids or [] if str(homestay_id or "").strip()]
+    if len(ids) > max_detail_ids():
+        raise ValueError(f"At most {max_detail_ids()} homestay IDs per call (got {len(ids)})")
+    distinct = list(dict.fromkeys(ids))
+    backend = search_backend()
+
+    async def fetch(missing: List[str]) -> Dict[str, Any]:
+        documents = await metrics.timed("find_by_ids", backend.find_documents(
+            {"homestayId": {"$in": missing}, "status": {"$in": detail_statuses()}}, list(DETAIL_FIELDS)))
+        return {document["homestayId"]: document for document in documents if document.get("homestayId") in missing}
+
+    documents = await homestay_cache.get_many(distinct, fetch)
+    return {
+        "homestays": [project_document(documents[homestay_id], paths) for homestay_id in ids if homestay_id in documents],
+        "not_found": [homestay_id for homestay_id in distinct if homestay_id not in documents],
+    }
+
+
 async def validate_address_relationships(filter_request: HomestayFilterRequest) -> Dict[str, str]:
     """Validate and suggest corrections for address relationships"""
     suggestions = {}
@@ -1110,42 +1580,6 @@ async def verify_collection_structure():
     except Exception as e:
         print(f"🔍 Error verifying collection: {e}")
 
-async def test_queries():
-    """Test function to validate fixes"""
-    collection = db_instance.homestays
-    if not collection:
-        print("❌ Database not connected, cannot run tests.")
-        return
-
-    # Test 1: Basic connection and data
-    total = await collection.count_documents({})
-    print(f"✅ Total homestays: {total}")
-    
-    # Test 2: Sample documents
-    sample = await collection.find_one()
-    if sample:
-        print(f"✅ Sample doc features keys: {sample.get('features', {}).keys()}")
-    else:
-        print("❌ No sample document found.")
-
-    # Test 3: Exact attraction matching
-    exact_match_count = await collection.count_documents({
-        "features.localAttractions": "Trekking, Climbing & Hiking Routes/ट्रेकिङ, आरोहण तथा हाइकिङ मार्गहरू"
-    })
-    print(f"✅ Exact match count for 'Trekking...': {exact_match_count}")
-    
-    # Test 4: Partial matching
-    partial_match_count = await collection.count_documents({
-        "features.localAttractions": {"$regex": "Trekking", "$options": "i"}
-    })
-    print(f"✅ Partial match count for 'Trekking': {partial_match_count}")
-
-    # Test 5: Partial matching for Nepali
-    partial_match_nepali = await collection.count_documents({
-        "features.localAttractions": {"$regex": "ट्रेकिङ", "$options": "i"}
-    })
-    print(f"✅ Partial match count for 'ट्रेकिङ': {partial_match_nepali}")
-
 async def test_queries():
     """Test function to validate fixes"""
     collection = db_instance.homestays
@@ -1261,7 +1695,6 @@ async def test_fuzzy_patterns():
 
 # Call the test functions if this module is run directly
 if __name__ == "__main__":
-    import asyncio
     async def run_tests():
         await test_fuzzy_patterns()
         await test_queries()
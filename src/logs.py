@@ -0,0 +1,184 @@
+"""Structured, non-blocking logging for the request path.
+
+`log.info("search.result", filtered=3, engine="mongo")` emits one record with an
+event name and fields. Records go through a `QueueHandler`; a `QueueListener`
+thread formats them (text or JSON lines) and writes stdout, so the event loop
+never waits on I/O or on serializing a large filter.
+
+- Level gating: records below LOG_LEVEL are dropped before any field is built.
+- Lazy fields: a callable field value (`dump=lambda: request.dict()`) is only
+  called when the record is emitted.
+- Sampling: `sample=0.1` at the call site, or LOG_SAMPLE="search.result=0.1,...",
+  keeps that fraction of an event's records.
+- Per-request debug: LOG_DEBUG_SAMPLE is the fraction of tool calls whose debug
+  records are emitted regardless of LOG_LEVEL (see `request_context`).
+"""
+import os
+import sys
+import json
+import atexit
+import queue
+import random
+import logging
+import itertools
+import logging.handlers
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+ROOT_LOGGER = "homestay_mcp"
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({})))
+
+_request_id: ContextVar[Optional[str]] = ContextVar("log_request_id", default=None)
+_request_tool: ContextVar[Optional[str]] = ContextVar("log_request_tool", default=None)
+_request_debug: ContextVar[bool] = ContextVar("log_request_debug", default=False)
+_request_ids = itertools.count(1)
+
+
+def _parse_samples(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        event, _, rate = item.partition("=")
+        try:
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+_sample_rates = _parse_samples(os.getenv("LOG_SAMPLE", ""))
+
+
+@contextmanager
+def request_context(tool: str) -> Iterator[None]:
+    """Tag records logged during one tool call, and decide whether that call logs at debug"""
+    debug_rate = float(os.getenv("LOG_DEBUG_SAMPLE", "0"))
+    tokens = (
+        _request_id.set(f"{os.getpid():x}-{next(_request_ids):x}"),
+        _request_tool.set(tool),
+        _request_debug.set(debug_rate > 0 and random.random() < debug_rate),
+    )
+    try:
+        yield
+    finally:
+        for var, token in zip((_request_id, _request_tool, _request_debug), tokens):
+            var.reset(token)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class _Formatter(logging.Formatter):
+    """`ts level logger event key=value ...` or one JSON object per line"""
+
+    def __init__(self, as_json: bool):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {k: v for k, v in vars(record).items() if k not in _STANDARD_ATTRS and k != "event"}
+        timestamp = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+        event = getattr(record, "event", None) or record.getMessage()
+        if self.as_json:
+            payload = {"ts": timestamp, "level": record.levelname.lower(), "logger": record.name, "event": event}
+            payload.update(fields)
+            if record.exc_text:
+                payload["exc"] = record.exc_text
+            return json.dumps(payload, ensure_ascii=False, default=_jsonable)
+        parts = [timestamp, record.levelname, record.name, event]
+        for key, value in fields.items():
+            text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=_jsonable)
+            parts.append(f"{key}={text}")
+        line = " ".join(parts)
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record as is; formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Render the traceback now: its frames may be gone by the time the writer runs
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging():
+    """Route the `homestay_mcp` loggers through a background writer (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(_Formatter(as_json=os.getenv("LOG_FORMAT", "text").lower() == "json"))
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.propagate = False
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class StructuredLogger:
+    """Event + fields front end over a stdlib logger (see module docstring)"""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+    def enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level) or (level == logging.DEBUG and _request_debug.get())
+
+    def log(self, level: int, event: str, sample: Optional[float] = None, exc_info: bool = False, **fields: Any):
+        if not self.enabled(level):
+            return
+        rate = _sample_rates.get(event, sample)
+        if rate is not None and rate < 1.0 and random.random() >= rate:
+            return
+        extra = {key: value() if callable(value) else value for key, value in fields.items()}
+        extra["event"] = event
+        request_id = _request_id.get()
+        if request_id is not None:
+            extra.setdefault("request_id", request_id)
+            extra.setdefault("tool", _request_tool.get())
+        record = self._logger.makeRecord(self._logger.name, level, "(structured)", 0, event, (),
+                                         sys.exc_info() if exc_info else None, extra=extra)
+        # handle() skips the level check, so per-request debug gets through an INFO logger
+        self._logger.handle(record)
+
+    def debug(self, event: str, **fields: Any):
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any):
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields: Any):
+        self.log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields: Any):
+        self.log(logging.ERROR, event, **fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
@@ -0,0 +1,232 @@
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from pymongo import monitoring
+from .logs import get_logger, request_context
+
+log = get_logger("metrics")
+
+# Latency buckets in seconds (Prometheus convention)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Mongo round trips per tool call
+ROUNDTRIP_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _ToolCall:
+    """Per-call state carried in a context variable (also visible from Motor's executor threads)"""
+    __slots__ = ("tool", "mongo_roundtrips")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.mongo_roundtrips = 0
+
+
+_current_call: ContextVar[Optional[_ToolCall]] = ContextVar("mcp_tool_call", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsRegistry:
+    """Process-wide counters and latency histograms, rendered in the Prometheus text format.
+
+    Tool calls are wrapped with `instrumented(tool)`; code on the hot path times
+    its stages with `stage(name)` / `timed(name, awaitable)`, which are attributed
+    to the tool call running in the current context. Mongo commands are counted
+    per call through `command_listener`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._bounds: Dict[str, Tuple[float, ...]] = {}
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+        self.command_listener = MongoCommandListener(self)
+
+        self.describe("mcp_tool_calls_total", "counter", "MCP tool calls by outcome")
+        self.describe("mcp_tool_duration_seconds", "histogram", "MCP tool call latency", LATENCY_BUCKETS)
+        self.describe("mcp_stage_duration_seconds", "histogram", "Latency of one stage inside a tool call", LATENCY_BUCKETS)
+        self.describe("mcp_tool_mongo_roundtrips", "histogram", "MongoDB commands issued per tool call", ROUNDTRIP_BUCKETS)
+        self.describe("mongo_commands_total", "counter", "MongoDB commands by name and outcome")
+        self.describe("mongo_command_duration_seconds", "histogram", "MongoDB command latency", LATENCY_BUCKETS)
+
+    # ------------------------------------------------------------------ recording
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self._help[name] = (kind, help_text)
+        if kind == "histogram":
+            self._bounds[name] = buckets
+            self._histograms.setdefault(name, {})
+        else:
+            self._counters.setdefault(name, {})
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._bounds.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def add_collector(self, prefix: str, collect: Callable[[], Dict[str, Any]]):
+        """Expose the numeric values of `collect()` as `<prefix>_<key>` gauges at scrape time"""
+        self._collectors.append((prefix, collect))
+
+    # ------------------------------------------------------------------ instrumentation
+
+    @staticmethod
+    def current_tool() -> str:
+        call = _current_call.get()
+        return call.tool if call is not None else "background"
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block as one stage of the current tool call"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("mcp_stage_duration_seconds", time.perf_counter() - started,
+                         tool=self.current_tool(), stage=name)
+
+    async def timed(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """Await `awaitable` as one stage (usable inside asyncio.gather)"""
+        with self.stage(name):
+            return await awaitable
+
+    def instrumented(self, tool: str):
+        """Decorator for an async MCP tool: call count/outcome, latency and Mongo round trips"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                call = _ToolCall(tool)
+                token = _current_call.set(call)
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    with request_context(tool):
+                        result = await fn(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    _current_call.reset(token)
+                    self.observe("mcp_tool_duration_seconds", time.perf_counter() - started, tool=tool)
+                    self.observe("mcp_tool_mongo_roundtrips", call.mongo_roundtrips, tool=tool)
+                    self.inc("mcp_tool_calls_total", tool=tool, outcome=outcome)
+            return wrapper
+        return decorate
+
+    # ------------------------------------------------------------------ exposition
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in self._counters.items():
+                kind, help_text = self._help.get(name, ("counter", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name, series in self._histograms.items():
+                _, help_text = self._help.get(name, ("histogram", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.bounds, histogram.counts):
+                        cumulative += count
+                        bucket = _format_labels(labels, 'le="%s"' % bound)
+                        lines.append(f"{name}_bucket{bucket} {cumulative}")
+                    bucket = _format_labels(labels, 'le="+Inf"')
+                    lines.append(f"{name}_bucket{bucket} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for prefix, collect in self._collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                log.warning("metrics.collector_failed", collector=prefix, error=str(e))
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(float(value))}")
+        return "\n".join(lines) + "\n"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Counts MongoDB round trips per tool call and times every command"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self._registry = registry
+
+    def started(self, event):
+        call = _current_call.get()
+        if call is not None:
+            with self._registry._lock:
+                call.mongo_roundtrips += 1
+
+    def _finished(self, event, outcome: str):
+        self._registry.inc("mongo_commands_total", command=event.command_name, outcome=outcome)
+        self._registry.observe("mongo_command_duration_seconds", event.duration_micros / 1e6,
+                               command=event.command_name)
+
+    def succeeded(self, event):
+        self._finished(event, "ok")
+
+    def failed(self, event):
+        self._finished(event, "error")
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
@@ -1 +1,2 @@
-from .server import mcp as officer_mcp
\ No newline at end of file
+from .server import mcp as officer_mcp
+from .http_client import officer_api
\ No newline at end of file
@@ -0,0 +1,166 @@
+import os
+import time
+import asyncio
+import httpx
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from pathlib import Path
+from typing import Optional, Dict, Any
+from dotenv import load_dotenv
+from ..metrics import metrics
+from ..logs import get_logger
+
+log = get_logger("officer.http_client")
+
+env_path = Path(__file__).resolve().parent.parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+
+class _NoPersistCookiePolicy(DefaultCookiePolicy):
+    """Never store response cookies on the shared client.
+
+    The client is shared by every admin, so a Set-Cookie from one call must not
+    be replayed on another admin's request. The auth token is sent per request.
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class OfficerApiClient:
+    """Process-wide pooled HTTP client for the Next.js officer API.
+
+    Created and closed by the FastAPI lifespan in ``main.py`` so that every
+    officer tool call reuses keep-alive (and, when available, HTTP/2) connections.
+    """
+    _instance: Optional['OfficerApiClient'] = None
+    _client: Optional[httpx.AsyncClient] = None
+    _lock: Optional[asyncio.Lock] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._reset_counters()
+        return cls._instance
+
+    def _reset_counters(self):
+        self.requests_total = 0
+        self.requests_failed = 0
+        self.in_flight = 0
+        self.in_flight_max = 0
+        self.latency_total = 0.0
+
+    @staticmethod
+    def _settings() -> Dict[str, Any]:
+        """Pool limits and per-phase timeouts, configurable through the environment"""
+        return {
+            "http2": os.getenv("NEXT_API_HTTP2", "true").lower() in ("1", "true", "yes"),
+            "max_connections": int(os.getenv("NEXT_API_MAX_CONNECTIONS", "100")),
+            "max_keepalive_connections": int(os.getenv("NEXT_API_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            "keepalive_expiry": float(os.getenv("NEXT_API_KEEPALIVE_EXPIRY", "30")),
+            "connect_timeout": float(os.getenv("NEXT_API_CONNECT_TIMEOUT", "5")),
+            "read_timeout": float(os.getenv("NEXT_API_READ_TIMEOUT", "30")),
+            "write_timeout": float(os.getenv("NEXT_API_WRITE_TIMEOUT", "10")),
+            "pool_timeout": float(os.getenv("NEXT_API_POOL_TIMEOUT", "5")),
+        }
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            OfficerApiClient._lock = asyncio.Lock()
+        return self._lock
+
+    async def start(self) -> httpx.AsyncClient:
+        """Create the shared client (idempotent)"""
+        if self._client is not None and not self._client.is_closed:
+            return self._client
+
+        async with self._get_lock():
+            if self._client is not None and not self._client.is_closed:
+                return self._client
+
+            settings = self._settings()
+            http2 = settings["http2"] and _http2_available()
+            if settings["http2"] and not http2:
+                log.warning("officer_api.http2_unavailable", reason="the 'h2' package is not installed",
+                            fallback="HTTP/1.1")
+
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings["max_connections"],
+                    max_keepalive_connections=settings["max_keepalive_connections"],
+                    keepalive_expiry=settings["keepalive_expiry"],
+                ),
+                timeout=httpx.Timeout(
+                    connect=settings["connect_timeout"],
+                    read=settings["read_timeout"],
+                    write=settings["write_timeout"],
+                    pool=settings["pool_timeout"],
+                ),
+                cookies=httpx.Cookies(CookieJar(policy=_NoPersistCookiePolicy())),
+            )
+            return self._client
+
+    async def close(self):
+        """Close the shared client and its pooled connections"""
+        async with self._get_lock():
+            if self._client is not None:
+                await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, url: str, auth_token: str, **kwargs) -> httpx.Response:
+        """Send a request on the shared client with the admin's auth token as cookie"""
+        client = await self.start()
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Cookie"] = f"auth_token={auth_token}"
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.in_flight_max = max(self.in_flight_max, self.in_flight)
+        started = time.perf_counter()
+        try:
+            with metrics.stage("next_api"):
+                return await client.request(method, url, headers=headers, **kwargs)
+        except httpx.RequestError:
+            self.requests_failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.latency_total += time.perf_counter() - started
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        """Pool utilization for the shared client"""
+        settings = self._settings()
+        connections = []
+        if self._client is not None:
+            # httpcore does not expose pool stats publicly; read them defensively
+            pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+
+        idle = sum(1 for conn in connections if conn.is_idle())
+        http2_conns = sum(1 for conn in connections if "HTTP/2" in conn.info())
+        return {
+            "started": self._client is not None and not self._client.is_closed,
+            "open_connections": len(connections),
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle,
+            "http2_connections": http2_conns,
+            "max_connections": settings["max_connections"],
+            "utilization": round((len(connections) - idle) / settings["max_connections"], 4) if settings["max_connections"] else 0.0,
+            "in_flight": self.in_flight,
+            "in_flight_max": self.in_flight_max,
+            "requests_total": self.requests_total,
+            "requests_failed": self.requests_failed,
+            "latency_avg_ms": round(self.latency_total * 1000 / self.requests_total, 3) if self.requests_total else 0.0,
+        }
+
+
+# Global client instance
+officer_api = OfficerApiClient()
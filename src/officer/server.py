@@ -2,11 +2,13 @@ from mcp.server.fastmcp import FastMCP
 from .tools import create_officer, list_officers, update_officer_status, delete_officer, update_officer_permissions
 from .models import CreateOfficerData, Officer
 from typing import Dict, Any
+from ..metrics import metrics
 
 mcp = FastMCP(name="Admin_Officer_manager_server", stateless_http=True)
 
 
 @mcp.tool(name="create_officer")
+@metrics.instrumented("create_officer")
 async def create_officer_tool(
     officer_data: CreateOfficerData,
     admin_username: str,
@@ -26,6 +28,7 @@ async def create_officer_tool(
     return await create_officer(officer_data, admin_username, auth_token)
 
 @mcp.tool(name="list_officers")
+@metrics.instrumented("list_officers")
 async def list_officers_tool(
     admin_username: str,
     auth_token: str,
@@ -43,6 +46,7 @@ async def list_officers_tool(
     return await list_officers(admin_username, auth_token)
 
 @mcp.tool(name="update_officer_status")
+@metrics.instrumented("update_officer_status")
 async def update_officer_status_tool(
     officer_id: str,
     is_active: bool,
@@ -64,6 +68,7 @@ async def update_officer_status_tool(
     return await update_officer_status(officer_id, is_active, admin_username, auth_token)
 
 @mcp.tool(name="delete_officer")
+@metrics.instrumented("delete_officer")
 async def delete_officer_tool(
     
     officer_id: str,
@@ -84,6 +89,7 @@ async def delete_officer_tool(
     return await delete_officer(officer_id, admin_username, auth_token)
 
 @mcp.tool(name="update_officer_permissions")
+@metrics.instrumented("update_officer_permissions")
 async def update_officer_permissions_tool(
     officer_id: str,
     permissions: Dict[str, bool],
@@ -1,13 +1,15 @@
 import httpx,os
-from mcp.server.fastmcp import FastMCP
 from .models import CreateOfficerData, Officer
+from .http_client import officer_api
 from typing import Dict, Any
 from pathlib import Path
 from dotenv import load_dotenv
+from ..logs import get_logger
 
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path) 
 API_BASE_URL =  os.getenv("NEXT_API_BASE") 
+log = get_logger("officer.tools")
 
 async def create_officer(
     officer_data: CreateOfficerData,
@@ -26,34 +28,30 @@ async def create_officer(
         The created officer.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            payload = officer_data.dict(by_alias=True)
-            payload["adminUsername"] = admin_username
-            
-            # Send auth token as cookie, not Bearer header
-            cookies = {"auth_token": auth_token}
-            
-            response = await client.post(
-                f"{API_BASE_URL}/api/admin/officer/create",
-                json=payload,
-                cookies=cookies,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except:
-                    pass
-                raise Exception(f"Failed to create officer: {error_detail}")
-            
-            result = response.json()
-            if not result.get('success'):
-                raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
-            
-            return Officer(**result["officer"])
+        payload = officer_data.dict(by_alias=True)
+        payload["adminUsername"] = admin_username
+        
+        response = await officer_api.request(
+            "POST",
+            f"{API_BASE_URL}/api/admin/officer/create",
+            auth_token,
+            json=payload,
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except:
+                pass
+            raise Exception(f"Failed to create officer: {error_detail}")
+        
+        result = response.json()
+        if not result.get('success'):
+            raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
+        
+        return Officer(**result["officer"])
     except httpx.RequestError as e:
         raise Exception(f"Network error while creating officer: {str(e)}")
     except Exception as e:
@@ -74,30 +72,27 @@ async def list_officers(
         A list of officers.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            cookies = {"auth_token": auth_token}
-            
-            response = await client.get(
-                f"{API_BASE_URL}/api/admin/officer/list?adminUsername={admin_username}",
-                cookies=cookies,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except:
-                    pass
-                raise Exception(f"Failed to list officers: {error_detail}")
-            
-            print(response.text)  # Debugging line to see the response
-            result = response.json()
-            if not result.get('success'):
-                raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
-            
-            return [Officer(**officer) for officer in result["officers"]]
+        response = await officer_api.request(
+            "GET",
+            f"{API_BASE_URL}/api/admin/officer/list?adminUsername={admin_username}",
+            auth_token,
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except:
+                pass
+            raise Exception(f"Failed to list officers: {error_detail}")
+        
+        log.debug("officer.list_response", status=response.status_code, body=lambda: response.text)
+        result = response.json()
+        if not result.get('success'):
+            raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
+        
+        return [Officer(**officer) for officer in result["officers"]]
     except httpx.RequestError as e:
         raise Exception(f"Network error while listing officers: {str(e)}")
     except Exception as e:
@@ -123,34 +118,31 @@ async def update_officer_status(
         A confirmation message.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            cookies = {"auth_token": auth_token}
-            
-            response = await client.post(
-                f"{API_BASE_URL}/api/admin/officer/update-status",
-                json={
-                    "officerId": officer_id,
-                    "isActive": is_active,
-                    "adminUsername": admin_username,
-                },
-                cookies=cookies,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except:
-                    pass
-                raise Exception(f"Failed to update officer status: {error_detail}")
-            
-            result = response.json()
-            if not result.get('success'):
-                raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
-            
-            return result
+        response = await officer_api.request(
+            "POST",
+            f"{API_BASE_URL}/api/admin/officer/update-status",
+            auth_token,
+            json={
+                "officerId": officer_id,
+                "isActive": is_active,
+                "adminUsername": admin_username,
+            },
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except:
+                pass
+            raise Exception(f"Failed to update officer status: {error_detail}")
+        
+        result = response.json()
+        if not result.get('success'):
+            raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
+        
+        return result
     except httpx.RequestError as e:
         raise Exception(f"Network error while updating officer status: {str(e)}")
     except Exception as e:
@@ -173,30 +165,27 @@ async def delete_officer(
         A confirmation message.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            cookies = {"auth_token": auth_token}
-            
-            response = await client.post(
-                f"{API_BASE_URL}/api/admin/officer/delete",
-                json={"officerId": officer_id, "adminUsername": admin_username},
-                cookies=cookies,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except:
-                    pass
-                raise Exception(f"Failed to delete officer: {error_detail}")
-            
-            result = response.json()
-            if not result.get('success'):
-                raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
-            
-            return result
+        response = await officer_api.request(
+            "POST",
+            f"{API_BASE_URL}/api/admin/officer/delete",
+            auth_token,
+            json={"officerId": officer_id, "adminUsername": admin_username},
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except:
+                pass
+            raise Exception(f"Failed to delete officer: {error_detail}")
+        
+        result = response.json()
+        if not result.get('success'):
+            raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
+        
+        return result
     except httpx.RequestError as e:
         raise Exception(f"Network error while deleting officer: {str(e)}")
     except Exception as e:
@@ -221,37 +210,33 @@ async def update_officer_permissions(
         The updated officer object.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            payload = {
-                "officerId": officer_id,
-                "permissions": permissions,
-                "adminUsername": admin_username
-            }
-            
-            # Send auth token as cookie
-            cookies = {"auth_token": auth_token}
-            
-            response = await client.put(
-                f"{API_BASE_URL}/api/admin/officer/update-permissions",
-                json=payload,
-                cookies=cookies,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', error_detail)
-                except:
-                    pass
-                raise Exception(f"Failed to update officer permissions: {error_detail}")
-            
-            result = response.json()
-            if not result.get('success'):
-                raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
-            
-            return Officer(**result["officer"])
+        payload = {
+            "officerId": officer_id,
+            "permissions": permissions,
+            "adminUsername": admin_username
+        }
+        
+        response = await officer_api.request(
+            "PUT",
+            f"{API_BASE_URL}/api/admin/officer/update-permissions",
+            auth_token,
+            json=payload,
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            try:
+                error_json = response.json()
+                error_detail = error_json.get('message', error_detail)
+            except:
+                pass
+            raise Exception(f"Failed to update officer permissions: {error_detail}")
+        
+        result = response.json()
+        if not result.get('success'):
+            raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
+        
+        return Officer(**result["officer"])
     except httpx.RequestError as e:
         raise Exception(f"Network error while updating officer permissions: {str(e)}")
     except Exception as e:
@@ -0,0 +1,74 @@
+"""The optimizer must never change which homestays a search filter matches.
+
+A small, fixed version of benchmarks/diff_filter_optimizer.py: generated
+requests (and their relaxed variants) are built with and without the optimizer
+and both filters run against the same synthetic documents in mongomock.
+"""
+import asyncio
+import contextlib
+import io
+
+import mongomock
+import pytest
+
+from synthetic import generate_filter_requests, generate_homestays
+from src.homestay import tools
+from src.homestay.filter_ast import optimize_mongo_filter
+
+DOCS = 120
+REQUESTS = 60
+
+
+@pytest.fixture(scope="module")
+def collection():
+    collection = mongomock.MongoClient()["HomestayTest"]["Homestays Collection"]
+    collection.insert_many(list(generate_homestays(DOCS, seed=42)))
+    return collection
+
+
+def matched_ids(collection, mongo_filter):
+    try:
+        return sorted(doc["homestayId"] for doc in collection.find(mongo_filter, {"homestayId": 1}))
+    except Exception as e:
+        # Some builder patterns are not valid regexes; the optimizer must not change that
+        return f"error: {type(e).__name__}"
+
+
+async def _built_filters():
+    pairs = []
+    for filter_request in generate_filter_requests(REQUESTS, seed=7):
+        for request in (filter_request, tools.build_relaxed_request(filter_request)):
+            raw = await tools.build_enhanced_mongodb_filter(request, optimize=False)
+            optimized = await tools.build_enhanced_mongodb_filter(request, optimize=True)
+            pairs.append((request, raw, optimized))
+    return pairs
+
+
+def test_generated_filters_match_the_same_homestays(collection):
+    with contextlib.redirect_stdout(io.StringIO()):
+        pairs = asyncio.run(_built_filters())
+    compared = 0
+    for request, raw, optimized in pairs:
+        expected, actual = matched_ids(collection, raw), matched_ids(collection, optimized)
+        assert expected == actual, request.dict(exclude_none=True)
+        compared += isinstance(expected, list)
+    # Guard against a corpus that silently stops exercising anything
+    assert compared > REQUESTS
+
+
+@pytest.mark.parametrize("mongo_filter", [
+    # Regexes on one field inside a disjunction become one alternation
+    {"$or": [{"features.localAttractions": {"$regex": "birdwatching", "$options": "i"}},
+             {"features.localAttractions": {"$regex": "fishing", "$options": "i"}},
+             {"status": "pending"}]},
+    # Equalities on one field inside a disjunction fold into $in
+    {"$or": [{"homeStayType": "community"}, {"homeStayType": "private"}, {"averageRating": {"$gte": 4.5}}]},
+    # Nested conjunctions flatten and duplicates drop
+    {"$and": [{"status": "approved"}, {"$and": [{"status": "approved"}, {"averageRating": {"$gte": 4.0}}]}]},
+    # A branch that matches everything makes the disjunction a no-op
+    {"status": "approved", "$or": [{}, {"homeStayType": "private"}]},
+    # Null equality also matches missing fields; folding must keep that
+    {"$or": [{"averageRating": None}, {"averageRating": 5.0}]},
+])
+def test_rewrites_preserve_matches(collection, mongo_filter):
+    assert matched_ids(collection, optimize_mongo_filter(mongo_filter)) == matched_ids(collection, mongo_filter)
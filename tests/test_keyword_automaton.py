@@ -0,0 +1,68 @@
+"""KeywordAutomaton: word boundaries, plural endings and overlapping keywords."""
+from src.homestay.keyword_automaton import KeywordAutomaton
+from src.homestay.models import EnhancedFeatureSearchHelper
+
+GUEST_ROOM = "Guest Room, Toilet, Bathroom/पाहुना कोठा, शौचालय, स्नानघर"
+DRINKING_WATER = "Drinking Water and Solar Lighting/खानेपानी तथा सोलार बत्ती"
+LAKES = "Major Rivers & Lakes/प्रमुख नदी तथा तालहरू"
+
+AUTOMATON = KeywordAutomaton({
+    "infrastructure": {"room": ["Room"], "guest room": ["Guest Room"], "water": ["Water"],
+                       "drinking water": ["Drinking Water"]},
+    "attractions": {"lake": ["Lake"], "lake view": ["Lake View"], "view": ["View"]},
+})
+
+
+def keywords(text):
+    return [(m.keyword, m.start, m.end) for m in AUTOMATON.find(text)]
+
+
+def test_keywords_inside_longer_words_do_not_match():
+    assert keywords("mushroom farming") == []
+    assert keywords("waterfall nearby") == []
+    assert keywords("backroom") == []
+    assert keywords("overview of the lakeside") == []
+
+
+def test_keywords_match_at_word_boundaries_and_punctuation():
+    assert keywords("room") == [("room", 0, 4)]
+    assert keywords("a room, with water.") == [("room", 2, 6), ("water", 13, 18)]
+    assert keywords("Guest-Room") == [("room", 6, 10)]
+
+
+def test_plural_endings_are_accepted():
+    assert [k for k, _, _ in keywords("rooms and lakes")] == ["room", "lake"]
+    assert [k for k, _, _ in keywords("waters")] == ["water"]
+    # Only 's' / 'es', not any suffix
+    assert keywords("roomy lakers") == []
+
+
+def test_longest_keyword_is_found_along_with_the_keywords_inside_it():
+    assert sorted(keywords("guest room")) == [("guest room", 0, 10), ("room", 6, 10)]
+    assert sorted(keywords("clean drinking water")) == [("drinking water", 6, 20), ("water", 15, 20)]
+    # A keyword that is a prefix of a longer one, plus one found through a failure link
+    assert sorted(keywords("lake view")) == [("lake", 0, 4), ("lake view", 0, 9), ("view", 5, 9)]
+    assert AUTOMATON.categorize("lake view") == {"attractions": {"Lake", "Lake View", "View"}}
+
+
+def test_longer_keyword_cut_short_still_yields_the_shorter_one():
+    assert keywords("drinking waterfall") == []
+    assert keywords("guest rooms") == [("guest room", 0, 10), ("room", 6, 10)]
+    assert keywords("lake viewpoint") == [("lake", 0, 4)]
+
+
+def test_categorize_maps_matches_to_database_values():
+    found = EnhancedFeatureSearchHelper.KEYWORD_AUTOMATON.categorize("homestay with lakes and toilets")
+    assert found == {"attractions": {LAKES}, "infrastructure": {GUEST_ROOM}}
+
+
+def test_natural_queries_no_longer_match_inside_words():
+    process = EnhancedFeatureSearchHelper.enhanced_natural_query_processing
+    for query in ("homestay near mushroom farming", "homestay with a waterfall nearby"):
+        filters = process(query)
+        values = [v for key in ("infrastructure", "any_infrastructure") for v in filters.get(key, [])]
+        assert GUEST_ROOM not in values, query
+        assert DRINKING_WATER not in values, query
+
+    filters = process("homestay with clean drinking water")
+    assert filters.get("infrastructure") == [DRINKING_WATER]
@@ -0,0 +1,66 @@
+"""NegativeResultCache: generation guard, invalidation, TTL and bounds."""
+from src.homestay import cache
+from src.homestay.cache import NegativeResultCache
+
+EMPTY = {"status": "approved", "features.localAttractions": {"$regex": "glacier", "$options": "i"}}
+OTHER = {"status": "approved", "homeStayType": "private"}
+
+
+def make_cache(max_entries=100, ttl=None):
+    return NegativeResultCache(max_entries=max_entries, ttl_provider=lambda: ttl)
+
+
+def test_records_and_answers_known_empty_filters():
+    negative = make_cache()
+    assert negative.lookup("mongo", EMPTY) is None
+    negative.add("mongo", EMPTY, total_count=250, generation=negative.generation)
+    assert negative.lookup("mongo", EMPTY) == 250
+    # Same filter with keys in another order is the same entry; other backends are not
+    assert negative.lookup("mongo", dict(reversed(list(EMPTY.items())))) == 250
+    assert negative.lookup("sqlite", EMPTY) is None
+    assert negative.lookup("mongo", OTHER) is None
+    assert (negative.hits, negative.misses, negative.stores) == (2, 3, 1)
+
+
+def test_result_computed_across_a_change_is_not_recorded():
+    negative = make_cache()
+    generation = negative.generation
+    negative.on_change({"operationType": "insert"})
+    negative.add("mongo", EMPTY, total_count=250, generation=generation)
+    assert negative.lookup("mongo", EMPTY) is None
+    assert negative.stores == 0
+
+
+def test_any_change_clears_every_entry():
+    negative = make_cache()
+    negative.add("mongo", EMPTY, total_count=250, generation=negative.generation)
+    negative.add("mongo", OTHER, total_count=250, generation=negative.generation)
+    before = negative.generation
+    negative.on_change({"operationType": "update", "documentKey": {"_id": 1}})
+    assert negative.generation == before + 1
+    assert negative.lookup("mongo", EMPTY) is None and negative.lookup("mongo", OTHER) is None
+    assert negative.metrics()["entries"] == 0 and negative.invalidations == 1
+
+
+def test_entries_expire_when_a_ttl_is_in_effect(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    negative = make_cache(ttl=60.0)
+    negative.add("mongo", EMPTY, total_count=250, generation=negative.generation)
+    now[0] += 59
+    assert negative.lookup("mongo", EMPTY) == 250
+    now[0] += 2
+    assert negative.lookup("mongo", EMPTY) is None
+    assert negative.expirations == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    negative = make_cache(max_entries=2)
+    filters = [{"homestayId": f"homestay{i}"} for i in range(3)]
+    negative.add("mongo", filters[0], total_count=10, generation=negative.generation)
+    negative.add("mongo", filters[1], total_count=10, generation=negative.generation)
+    negative.lookup("mongo", filters[0])
+    negative.add("mongo", filters[2], total_count=10, generation=negative.generation)
+    assert negative.lookup("mongo", filters[1]) is None
+    assert negative.lookup("mongo", filters[0]) == 10 and negative.lookup("mongo", filters[2]) == 10
+    assert negative.evictions == 1
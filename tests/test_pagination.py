@@ -0,0 +1,84 @@
+"""Keyset cursors must walk a sort order exactly once, null and missing sort keys included."""
+import functools
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.homestay.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_filter
+
+RATINGS = [4.5, None, 3.0, 4.5, "missing", 5.0, None, 3.0, "missing", 4.0]
+PAGE_SIZE = 4
+
+
+def _documents():
+    epoch = datetime(2024, 1, 1)
+    docs = []
+    for i in range(60):
+        doc = {"_id": i, "createdAt": epoch + timedelta(days=i % 7)}
+        rating = RATINGS[i % len(RATINGS)]
+        if rating != "missing":
+            doc["averageRating"] = rating
+        docs.append(doc)
+    return docs
+
+
+def _compare(a, b):
+    # BSON order for these fields: null/missing before numbers and dates
+    if a is None or b is None:
+        return (a is not None) - (b is not None)
+    return (a > b) - (a < b)
+
+
+def _expected_order(docs, sort_criteria):
+    def compare(x, y):
+        for field, direction in sort_criteria:
+            result = _compare(x.get(field), y.get(field))
+            if result:
+                return result * direction
+        return 0
+    return [doc["_id"] for doc in sorted(docs, key=functools.cmp_to_key(compare))]
+
+
+@pytest.fixture(scope="module")
+def collection():
+    collection = mongomock.MongoClient()["HomestayTest"]["Homestays Collection"]
+    collection.insert_many(_documents())
+    return collection
+
+
+@pytest.mark.parametrize("sort_criteria", [
+    [("averageRating", -1), ("createdAt", -1), ("_id", -1)],
+    [("averageRating", 1), ("createdAt", 1), ("_id", 1)],
+    [("averageRating", -1), ("createdAt", 1), ("_id", -1)],
+])
+def test_walks_every_document_once(collection, sort_criteria):
+    docs = list(collection.find({}))
+    expected = _expected_order(docs, sort_criteria)
+    walked, position = [], None
+    while True:
+        query = keyset_filter(sort_criteria, position) if position is not None else {}
+        remaining = _expected_order(list(collection.find(query)), sort_criteria)
+        page = remaining[:PAGE_SIZE]
+        if not page:
+            break
+        walked.extend(page)
+        last = collection.find_one({"_id": page[-1]})
+        position = [last.get(field) for field, _ in sort_criteria]
+    assert walked == expected
+
+
+def test_nothing_follows_the_last_position(collection):
+    # Descending on every key, ending on a null: no branch can match
+    assert list(collection.find(keyset_filter([("averageRating", -1)], [None]))) == []
+
+
+def test_cursor_round_trip_keeps_null_positions():
+    sort_criteria = [("averageRating", -1), ("createdAt", -1), ("_id", -1)]
+    last = {"_id": 7, "createdAt": datetime(2024, 1, 3)}
+    token = encode_cursor(sort_criteria, last, "search-key", relaxed=True)
+    position, relaxed = decode_cursor(token, sort_criteria, "search-key")
+    assert position == [None, datetime(2024, 1, 3), 7]
+    assert relaxed is True
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token, sort_criteria, "other-search")
@@ -0,0 +1,62 @@
+"""SpellingIndex: corrections against the keyword vocabulary, and the guards that keep it from guessing."""
+import pytest
+
+import src.homestay.models  # noqa: F401  (registers the feature keyword vocabulary)
+from src.homestay.spelling import SpellingIndex, edit_distance, spelling_index
+
+
+def make_index(*words):
+    index = SpellingIndex()
+    index.add_all(words)
+    return index
+
+
+@pytest.mark.parametrize("typo, expected", [
+    ("treking", "trekking"),
+    ("fshing", "fishing"),
+    ("musium", "museum"),
+    ("natinal", "national"),
+])
+def test_corrects_common_typos(typo, expected):
+    assert spelling_index.correct(typo) == expected
+
+
+def test_corrects_words_inside_a_query():
+    assert spelling_index.correct_text("Natinal Park and treking") == "national park and trekking"
+    # Known words and non-romanized text are left alone
+    assert spelling_index.correct_text("trekking near चितवन") == "trekking near चितवन"
+
+
+def test_short_tokens_are_not_corrected():
+    index = make_index("lake", "hotel")
+    assert index.correct("lakk") == "lakk"
+    assert index.correct("hotl") == "hotl"
+    assert index.correct("hotell") == "hotel"
+
+
+def test_distance_two_needs_seven_letters():
+    index = make_index("national")
+    assert index.correct("natinl") == "natinl"      # 6 letters, distance 2
+    assert index.correct("natinol") == "national"   # 7 letters, distance 2
+    assert index.correct("natinal") == "national"   # distance 1
+
+
+def test_ties_are_left_unchanged():
+    index = make_index("hotel", "hovel")
+    assert index.correct("hoxel") == "hoxel"
+    # A strictly closer word still wins
+    assert index.correct("hotex") == "hotel"
+
+
+def test_corrections_keep_the_first_letter():
+    index = make_index("washroom", "water")
+    assert index.correct("mushroom") == "mushroom"
+    assert index.correct("later") == "later"
+    assert spelling_index.correct("mushroom") == "mushroom"
+    assert spelling_index.correct("later") == "later"
+
+
+def test_edit_distance_counts_transpositions_and_stops_early():
+    assert edit_distance("fishing", "fsihing", 2) == 1
+    assert edit_distance("museum", "musium", 2) == 1
+    assert edit_distance("lake", "mountain", 2) == 3